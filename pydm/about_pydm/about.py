@@ -3,7 +3,6 @@ from qtpy.QtWidgets import QWidget, QApplication, QTableWidgetItem
 from qtpy.QtCore import Qt, PYQT_VERSION_STR, qVersion
 from .about_ui import Ui_Form
 from numpy import __version__ as numpyver
-from pyqtgraph import __version__ as pyqtgraphver
 import pydm
 import sys
 from os import path
@@ -13,6 +12,8 @@ import inspect
 class AboutWindow(QWidget):
     def __init__(self, parent=None):
         super(AboutWindow, self).__init__(parent, Qt.Window)
+        # pyqtgraph is slow to import and only needed by the plots
+        from pyqtgraph import __version__ as pyqtgraphver
         self.ui = Ui_Form()
         self.ui.setupUi(self)
         self.ui.pydmVersionLabel.setText(str(self.ui.pydmVersionLabel.text()).format(version=pydm.__version__))
@@ -14,18 +14,21 @@ import json
 import inspect
 import logging
 import warnings
+import functools
+from contextlib import contextmanager
 from .display_module import Display
 from qtpy.QtCore import Qt, QTimer, Slot
 from qtpy.QtWidgets import QApplication, QWidget
 from qtpy.QtGui import QColor
-from qtpy import uic
 from .main_window import PyDMMainWindow
 
-from .utilities import macro, which, path_info, find_display_in_path
+from .utilities import which, path_info, find_display_in_path
 from .utilities.stylesheet import apply_stylesheet
+from .utilities import ui_cache
 from .utilities import connection
 from . import data_plugins
 from .widgets.rules import RulesDispatcher
+from pydm_launcher import zygote
 
 logger = logging.getLogger(__name__)
 
@@ -73,6 +76,10 @@ class PyDMApplication(QApplication):
         create a PyDMMainWindow in the initialization (Default is True).
     fullscreen : bool, optional
         Whether or not to launch PyDM in a full screen mode.
+    single_process : bool, optional
+        Whether or not to open the new windows in this process instead of
+        spawning a new PyDM process for each of them. The windows then share
+        the connections to the channels.
     """
     # Instantiate our plugins.
     plugins = data_plugins.plugin_modules
@@ -80,7 +87,8 @@ class PyDMApplication(QApplication):
     def __init__(self, ui_file=None, command_line_args=[], display_args=[],
                  perfmon=False, hide_nav_bar=False, hide_menu_bar=False,
                  hide_status_bar=False, read_only=False, macros=None,
-                 use_main_window=True, stylesheet_path=None, fullscreen=False):
+                 use_main_window=True, stylesheet_path=None, fullscreen=False,
+                 single_process=False):
         super(PyDMApplication, self).__init__(command_line_args)
         # Enable High DPI display, if available.
         if hasattr(Qt, 'AA_UseHighDpiPixmaps'):
@@ -95,9 +103,14 @@ class PyDMApplication(QApplication):
         # multi-threaded way, for example, this system will fail.
         data_plugins.set_read_only(read_only)
         self.main_window = None
-        self.directory_stack = ['']
-        self.macro_stack = [{}]
+        # Stacks used while loading a display outside of a window. Windows
+        # have stacks of their own, see `loading_window`.
+        self._directory_stack = ['']
+        self._macro_stack = [{}]
+        self._loading_window = None
         self.windows = {}
+        self.single_process = single_process
+        self.stylesheet_path = stylesheet_path
         self.display_args = display_args
         self.hide_nav_bar = hide_nav_bar
         self.hide_menu_bar = hide_menu_bar
@@ -124,6 +137,44 @@ class PyDMApplication(QApplication):
             self.perf_timer.timeout.connect(self.get_CPU_usage)
             self.perf_timer.start()
 
+    @property
+    def directory_stack(self):
+        if self._loading_window is not None:
+            return self._loading_window.directory_stack
+        return self._directory_stack
+
+    @directory_stack.setter
+    def directory_stack(self, stack):
+        self._directory_stack = stack
+
+    @property
+    def macro_stack(self):
+        if self._loading_window is not None:
+            return self._loading_window.macro_stack
+        return self._macro_stack
+
+    @macro_stack.setter
+    def macro_stack(self, stack):
+        self._macro_stack = stack
+
+    @contextmanager
+    def loading_window(self, window):
+        """
+        Use the directory and macro stacks of a window while loading a
+        display into it, so that the windows of a single process do not
+        share their stacks.
+
+        Parameters
+        ----------
+        window : PyDMMainWindow
+        """
+        previous = self._loading_window
+        self._loading_window = window
+        try:
+            yield
+        finally:
+            self._loading_window = previous
+
     def get_string_encoding(self):
         return os.getenv("PYDM_STRING_ENCODING", "utf_8")
 
@@ -154,7 +205,8 @@ class PyDMApplication(QApplication):
         Spawn a new PyDM process and open the supplied file.  Commands to open
         new windows in PyDM typically actually spawn an entirely new PyDM process.
         This keeps each window isolated, so that one window cannot slow
-        down or crash another.
+        down or crash another.  When a launcher server started with
+        ``pydm --server`` is running, the process is forked by it instead.
 
         Parameters
         ----------
@@ -200,12 +252,15 @@ class PyDMApplication(QApplication):
         args.extend(filepath_args)
         if command_line_args is not None:
             args.extend(command_line_args)
-        subprocess.Popen(args, shell=False)
+        # A launcher server forks the new process from a warm interpreter.
+        if zygote.launch(args[1:]) is None:
+            subprocess.Popen(args, shell=False)
 
     def new_window(self, ui_file, macros=None, command_line_args=None):
         """
         Make a new window and open the supplied file.
-        Currently, this method just calls `new_pydm_process`.
+        The window is opened in this process if `single_process` is set,
+        otherwise this method calls `new_pydm_process`.
 
         This is an internal method that typically will not be needed by users.
 
@@ -222,23 +277,65 @@ class PyDMApplication(QApplication):
             to pass in extra arguments.  It is probably rare that code you
             write needs to use this argument.
         """
-        # All new windows are spawned as new processes.
-        self.new_pydm_process(ui_file, macros, command_line_args)
+        if self.single_process:
+            self.open_window(ui_file, macros, command_line_args)
+        else:
+            self.new_pydm_process(ui_file, macros, command_line_args)
+
+    def open_window(self, ui_file, macros=None, command_line_args=None):
+        """
+        Open the supplied file in a new PyDMMainWindow of this process.
+        The channels it uses which are already connected by the other
+        windows are shared with them instead of being connected again.
+
+        Parameters
+        ----------
+        ui_file : str
+            The path to a .ui or .py file to open.
+        macros : dict, optional
+            A dictionary of macro variables to supply to the display file
+            to be opened.
+        command_line_args : list, optional
+            A list of command line arguments to pass to the display.
+
+        Returns
+        -------
+        PyDMMainWindow
+        """
+        ui_file = os.path.expanduser(os.path.expandvars(ui_file))
+        args = list(self.display_args)
+        if command_line_args is not None:
+            args.extend(command_line_args)
+        opener = self.activeWindow()
+        window = self._create_window(self.stylesheet_path)
+        # Do not cover the window the new one was opened from.
+        if isinstance(opener, PyDMMainWindow) and not self.fullscreen:
+            window.move(opener.x() + 30, opener.y() + 30)
+        window.open_file(ui_file, macros, args)
+        self.windows[window] = path_info(ui_file)[0]
+        # Only referenced by self.windows, which must keep the window alive
+        # until Qt is done closing it.
+        window.setAttribute(Qt.WA_DeleteOnClose)
+        window.destroyed.connect(functools.partial(self._forget_window,
+                                                   window))
+        return window
 
     def make_main_window(self, stylesheet_path=None):
         """
         Instantiate a new PyDMMainWindow, add it to the application's
         list of windows. Typically, this function is only called as part
-        of starting up a new process, because PyDMApplications only have
-        one window per process.
+        of starting up a new process. The additional windows of a
+        `single_process` application are made by `open_window`.
         """
+        self.main_window = self._create_window(stylesheet_path)
+
+    def _create_window(self, stylesheet_path=None):
         main_window = PyDMMainWindow(hide_nav_bar=self.hide_nav_bar,
                                      hide_menu_bar=self.hide_menu_bar,
                                      hide_status_bar=self.hide_status_bar)
 
-        self.main_window = main_window
-        apply_stylesheet(stylesheet_path, widget=self.main_window)
-        self.main_window.update_tools_menu()
+        apply_stylesheet(stylesheet_path, widget=main_window)
+        main_window.update_tools_menu()
 
         if self.fullscreen:
             main_window.enter_fullscreen()
@@ -248,6 +345,7 @@ class PyDMApplication(QApplication):
         # If we are launching a new window, we don't want it to sit right on top of an existing window.
         if len(self.windows) > 1:
             main_window.move(main_window.x() + 10, main_window.y() + 10)
+        return main_window
 
     def make_window(self, ui_file, macros=None, command_line_args=None):
         """
@@ -271,6 +369,9 @@ class PyDMApplication(QApplication):
             self.windows[self.main_window] = path_info(ui_file)[0]
 
     def close_window(self, window):
+        if window.testAttribute(Qt.WA_DeleteOnClose):
+            # Forgotten once destroyed, see open_window
+            return
         try:
             del self.windows[window]
         except KeyError:
@@ -278,9 +379,13 @@ class PyDMApplication(QApplication):
             # it means that we already closed it.
             pass
 
+    def _forget_window(self, window, *args):
+        self.windows.pop(window, None)
+
     def load_ui_file(self, uifile, macros=None):
         """
         Load a .ui file, perform macro substitution, then return the resulting QWidget.
+        The file is compiled once and cached, see :mod:`pydm.utilities.ui_cache`.
 
         This is an internal method, users will usually want to use `open_file` instead.
 
@@ -296,11 +401,7 @@ class PyDMApplication(QApplication):
         -------
         QWidget
         """
-        if macros is not None and len(macros) > 0:
-            f = macro.substitute_in_file(uifile, macros)
-        else:
-            f = uifile
-        return uic.loadUi(f)
+        return ui_cache.load_ui(uifile, macros or None)
 
     def load_py_file(self, pyfile, args=None, macros=None):
         """
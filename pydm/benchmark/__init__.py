@@ -0,0 +1,5 @@
+"""
+Benchmarks for the PyDM data path. They are not part of the test suite,
+run them as modules, e.g. ``python -m pydm.benchmark.listeners``, or use the
+``pydm-bench`` entry point to measure the bundled reference displays.
+"""
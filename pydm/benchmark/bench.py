@@ -0,0 +1,365 @@
+"""
+Headless benchmark of reference displays, reporting the delivered update
+rate, the event backlog, the callback-to-paint latency, the memory and the
+CPU used by every thread as JSON.
+
+Usage::
+
+    pydm-bench [--duration 10] [--warmup 2] [--rate 10] [display ...]
+
+The displays are the ones bundled in ``pydm.benchmark.displays``, fed by the
+``sim://`` plugin, or paths to any other display file.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import defaultdict
+
+import numpy as np
+from qtpy.QtCore import QObject, QEvent, QEventLoop, QTimer
+from qtpy.QtWidgets import QWidget
+
+DISPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'displays')
+DISPLAYS = ('label_grid', 'timeplot', 'image', 'rules')
+
+
+def wait(seconds):
+    """
+    Run the event loop for a while.
+
+    Parameters
+    ----------
+    seconds : float
+    """
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec_()
+
+
+def percentiles(samples):
+    """
+    Summarize a list of durations.
+
+    Parameters
+    ----------
+    samples : list of float
+
+    Returns
+    -------
+    dict
+        The number of samples and their p50 and p99, None if there are no
+        samples.
+    """
+    if not samples:
+        return dict(samples=0, p50=None, p99=None)
+    p50, p99 = np.percentile(samples, [50, 99])
+    return dict(samples=len(samples), p50=float(p50), p99=float(p99))
+
+
+class LatencyProbe(QObject):
+    """
+    Measure the time between the delivery of a value to a widget and the
+    next time the widget is painted.
+
+    The probe listens to the connections of the widgets in a display and
+    watches the paint events of the widgets and of their children, e.g. the
+    viewport of a plot. The latest value delivered before a paint is the one
+    timed, values replaced before being painted are not accounted for.
+
+    Parameters
+    ----------
+    display : QWidget
+    """
+    def __init__(self, display, parent=None):
+        super(LatencyProbe, self).__init__(parent)
+        from pydm import data_plugins
+        self.latencies = []
+        self.deliveries = 0
+        self._pending = {}
+        self._owners = {}
+        self._listening = []
+        widgets_by_connection = defaultdict(set)
+        widgets = [display] + display.findChildren(QWidget)
+        for widget in widgets:
+            channels = getattr(widget, 'channels', None)
+            channels = channels() if callable(channels) else None
+            for channel in channels or []:
+                if not channel or not channel.address:
+                    continue
+                plugin = data_plugins.plugin_for_address(channel.address)
+                if plugin is None:
+                    continue
+                connection = plugin.connections.get(
+                    plugin.get_address(channel))
+                if connection is not None:
+                    widgets_by_connection[connection].add(widget)
+        for connection, owners in widgets_by_connection.items():
+            slot = self._make_slot(tuple(owners))
+            connection.new_data_signal.connect(slot)
+            self._listening.append((connection, slot))
+            for owner in owners:
+                for child in [owner] + owner.findChildren(QWidget):
+                    self._owners[child] = owner
+                    child.installEventFilter(self)
+
+    def _make_slot(self, owners):
+        def data_received(data):
+            self.deliveries += len(owners)
+            timestamp = data.timestamp
+            for owner in owners:
+                self._pending[owner] = timestamp
+        return data_received
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            owner = self._owners.get(obj)
+            timestamp = self._pending.pop(owner, None)
+            if timestamp is not None:
+                self.latencies.append(time.time() - timestamp)
+        return False
+
+    def reset(self):
+        """Forget the measurements done so far."""
+        self.latencies = []
+        self.deliveries = 0
+        self._pending.clear()
+
+    def close(self):
+        """Stop listening to the connections and widgets."""
+        for connection, slot in self._listening:
+            try:
+                connection.new_data_signal.disconnect(slot)
+            except (TypeError, RuntimeError):
+                pass
+        for child in self._owners:
+            try:
+                child.removeEventFilter(self)
+            except RuntimeError:
+                pass
+        self._listening = []
+        self._owners = {}
+
+
+class LagProbe(QObject):
+    """
+    Measure how late a periodic timer fires, as a proxy of the number of
+    events queued ahead of it, and sample the updates waiting in the
+    :class:`~pydm.data_plugins.plugin.UpdateDispatcher`.
+
+    Parameters
+    ----------
+    interval : float
+        Seconds between the samples.
+    """
+    def __init__(self, interval=0.01, parent=None):
+        super(LagProbe, self).__init__(parent)
+        from pydm.data_plugins.plugin import update_dispatcher
+        self.interval = interval
+        self.lags = []
+        self.dispatcher_backlog = []
+        self._dispatcher = update_dispatcher()
+        self._expected = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._sample)
+
+    def start(self):
+        self._expected = time.time() + self.interval
+        self._timer.start(int(self.interval * 1000))
+
+    def stop(self):
+        self._timer.stop()
+
+    def _sample(self):
+        now = time.time()
+        self.lags.append(max(now - self._expected, 0.0))
+        if self._dispatcher is not None:
+            self.dispatcher_backlog.append(self._dispatcher.backlog)
+        self.start()
+
+
+class ThreadUsage(object):
+    """
+    Snapshot of the memory and the CPU time used by each thread, using
+    ``psutil`` if it is installed.
+    """
+    def __init__(self):
+        self.wall = time.time()
+        self.rss = None
+        self.threads = {}
+        try:
+            import psutil
+        except ImportError:
+            times = os.times()
+            self.threads['process'] = times[0] + times[1]
+            return
+        process = psutil.Process()
+        self.rss = process.memory_info().rss
+        for thread in process.threads():
+            self.threads[thread.id] = thread.user_time + thread.system_time
+
+    @staticmethod
+    def thread_name(tid):
+        """
+        Find a readable name for a thread.
+
+        Parameters
+        ----------
+        tid : int or str
+            Native thread id.
+
+        Returns
+        -------
+        str
+        """
+        for thread in threading.enumerate():
+            if getattr(thread, 'native_id', None) == tid:
+                return thread.name
+        try:
+            # Qt names its threads after their class or object name.
+            with open('/proc/self/task/{}/comm'.format(tid)) as f:
+                return "{} ({})".format(f.read().strip(), tid)
+        except (IOError, OSError):
+            return str(tid)
+
+    def cpu_since(self, start):
+        """
+        Percentage of a CPU used by each thread since an earlier snapshot.
+
+        Parameters
+        ----------
+        start : ThreadUsage
+
+        Returns
+        -------
+        dict
+        """
+        elapsed = self.wall - start.wall
+        usage = {}
+        for tid, cpu in self.threads.items():
+            used = cpu - start.threads.get(tid, 0.0)
+            usage[self.thread_name(tid)] = round(100.0 * used / elapsed, 1)
+        return usage
+
+
+def measure(display, duration, warmup=0.0):
+    """
+    Let a display run and measure its performance.
+
+    Parameters
+    ----------
+    display : QWidget
+        A display, already shown and connected.
+    duration : float
+        Seconds to measure for.
+    warmup : float, optional
+        Seconds to wait before measuring, e.g. to let the connections open.
+
+    Returns
+    -------
+    dict
+    """
+    wait(warmup)
+    latency = LatencyProbe(display)
+    lag = LagProbe()
+    start_usage = ThreadUsage()
+    lag.start()
+    wait(duration)
+    lag.stop()
+    usage = ThreadUsage()
+    latency.close()
+    elapsed = usage.wall - start_usage.wall
+    backlog = lag.dispatcher_backlog
+    return dict(
+        duration=elapsed,
+        updates=latency.deliveries,
+        updates_per_second=latency.deliveries / elapsed,
+        backlog=dict(
+            event_loop_lag=percentiles(lag.lags),
+            dispatcher_pending_max=max(backlog) if backlog else None),
+        callback_to_paint_latency=percentiles(latency.latencies),
+        rss_bytes=usage.rss,
+        cpu_percent_per_thread=usage.cpu_since(start_usage))
+
+
+def run(app, display_file, duration, warmup, macros=None):
+    """
+    Open a display in the main window of the application and measure it.
+
+    Parameters
+    ----------
+    app : PyDMApplication
+    display_file : str
+    duration : float
+    warmup : float
+    macros : dict, optional
+
+    Returns
+    -------
+    dict
+    """
+    display = app.open_file(display_file, macros)
+    app.main_window.set_display_widget(display)
+    try:
+        return measure(display, duration, warmup)
+    finally:
+        app.main_window.clear_display_widget()
+        # Let the display be deleted and its connections closed.
+        wait(0.5)
+
+
+def display_path(name):
+    if os.path.exists(name):
+        return os.path.abspath(name)
+    return os.path.join(DISPLAY_DIR, name + '.py')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        'displays', nargs='*', default=list(DISPLAYS),
+        help='Displays to run, among {} or display files. '
+             'Default: all of the bundled displays.'.format(
+                 ', '.join(DISPLAYS)))
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help='Seconds to measure each display for.')
+    parser.add_argument('--warmup', type=float, default=2.0,
+                        help='Seconds to wait before measuring.')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Updates per second of each channel, instead '
+                             'of the default of each display.')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Write the JSON report to a file.')
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    import pydm
+    from pydm import config
+
+    app = pydm.PyDMApplication(hide_nav_bar=True, hide_menu_bar=True,
+                               hide_status_bar=True)
+    macros = {}
+    if args.rate is not None:
+        macros['RATE'] = str(args.rate)
+    report = dict(pydm=pydm.__version__,
+                  platform=os.environ.get('QT_QPA_PLATFORM'),
+                  frame_rate=config.FRAME_RATE,
+                  python=sys.version.split()[0],
+                  displays={})
+    for name in args.displays:
+        report['displays'][name] = run(app, display_path(name),
+                                       args.duration, args.warmup, macros)
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
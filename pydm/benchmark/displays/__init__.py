@@ -0,0 +1,5 @@
+"""
+Reference displays loaded by ``pydm-bench``. They are plain Python displays
+fed by the ``sim://`` plugin, the update rates and sizes can be changed with
+macros, e.g. ``pydm -m "RATE=50" label_grid.py``.
+"""
@@ -0,0 +1,31 @@
+from pydm import Display
+from pydm.widgets import PyDMImageView
+from qtpy.QtWidgets import QVBoxLayout
+
+
+class ImageView(Display):
+    """
+    Large image, refreshed with noise.
+
+    Macros
+    ------
+    SIZE : width and height of the image, 2000 by default.
+    RATE : images per second, 10 by default.
+    """
+    def __init__(self, parent=None, args=None, macros=None):
+        super(ImageView, self).__init__(parent=parent, args=args)
+        macros = macros or {}
+        size = int(macros.get('SIZE', 2000))
+        rate = float(macros.get('RATE', 10))
+        layout = QVBoxLayout(self)
+        self.image = PyDMImageView(
+            self, image_channel='sim://noise?rate={},shape={}x{},'
+                                'dtype=uint16,amplitude=65535'.format(
+                                    rate, size, size))
+        layout.addWidget(self.image)
+
+    def ui_filename(self):
+        return None
+
+    def ui_filepath(self):
+        return None
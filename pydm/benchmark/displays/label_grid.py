@@ -0,0 +1,34 @@
+from pydm import Display
+from pydm.widgets import PyDMLabel
+from qtpy.QtWidgets import QGridLayout
+
+
+class LabelGrid(Display):
+    """
+    Grid of labels, each one showing a different channel.
+
+    Macros
+    ------
+    COUNT : number of labels, 2000 by default.
+    RATE : updates per second of each channel, 10 by default.
+    """
+    def __init__(self, parent=None, args=None, macros=None):
+        super(LabelGrid, self).__init__(parent=parent, args=args)
+        macros = macros or {}
+        count = int(macros.get('COUNT', 2000))
+        rate = float(macros.get('RATE', 10))
+        layout = QGridLayout(self)
+        layout.setSpacing(1)
+        columns = 40
+        for i in range(count):
+            label = PyDMLabel(
+                self, init_channel='sim://sine:{}?rate={}'.format(i, rate))
+            label.precisionFromPV = False
+            label.precision = 3
+            layout.addWidget(label, i // columns, i % columns)
+
+    def ui_filename(self):
+        return None
+
+    def ui_filepath(self):
+        return None
@@ -0,0 +1,49 @@
+import json
+
+from pydm import Display
+from pydm.widgets import PyDMLabel
+from qtpy.QtWidgets import QGridLayout
+
+
+class Rules(Display):
+    """
+    Labels driven by rules evaluated on other channels.
+
+    Macros
+    ------
+    COUNT : number of labels, 500 by default.
+    RATE : updates per second of each channel, 10 by default.
+    """
+    def __init__(self, parent=None, args=None, macros=None):
+        super(Rules, self).__init__(parent=parent, args=args)
+        macros = macros or {}
+        count = int(macros.get('COUNT', 500))
+        rate = float(macros.get('RATE', 10))
+        layout = QGridLayout(self)
+        columns = 20
+        for i in range(count):
+            label = PyDMLabel(
+                self, init_channel='sim://ramp:{}?rate={}'.format(i, rate))
+            label.precisionFromPV = False
+            label.precision = 3
+            trigger = 'sim://step:{}?rate={},period=1'.format(i % 50, rate)
+            level = 'sim://sine:{}?rate={}'.format(i % 50, rate)
+            label.rules = json.dumps([
+                {'name': 'visible', 'property': 'Visible',
+                 'expression': 'ch[0] > 0.5 or ch[1] > 0',
+                 'channels': [{'channel': trigger, 'trigger': True},
+                              {'channel': level, 'trigger': False}]},
+                {'name': 'opacity', 'property': 'Opacity',
+                 'expression': 'abs(ch[0])',
+                 'channels': [{'channel': level, 'trigger': True}]},
+                {'name': 'enable', 'property': 'Enable',
+                 'expression': 'ch[0] < 0.5',
+                 'channels': [{'channel': label.channel, 'trigger': True}]},
+            ])
+            layout.addWidget(label, i // columns, i % columns)
+
+    def ui_filename(self):
+        return None
+
+    def ui_filepath(self):
+        return None
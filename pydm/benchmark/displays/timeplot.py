@@ -0,0 +1,33 @@
+from pydm import Display
+from pydm.widgets import PyDMTimePlot
+from qtpy.QtWidgets import QVBoxLayout
+
+
+class TimePlot(Display):
+    """
+    Time plot with many curves.
+
+    Macros
+    ------
+    CURVES : number of curves, 20 by default.
+    RATE : updates per second of each curve, 50 by default.
+    """
+    def __init__(self, parent=None, args=None, macros=None):
+        super(TimePlot, self).__init__(parent=parent, args=args)
+        macros = macros or {}
+        curves = int(macros.get('CURVES', 20))
+        rate = float(macros.get('RATE', 50))
+        layout = QVBoxLayout(self)
+        self.plot = PyDMTimePlot(self)
+        self.plot.setTimeSpan(60)
+        for i in range(curves):
+            self.plot.addYChannel(
+                y_channel='sim://sine:{}?rate={},period={}'.format(
+                    i, rate, 2 + i))
+        layout.addWidget(self.plot)
+
+    def ui_filename(self):
+        return None
+
+    def ui_filepath(self):
+        return None
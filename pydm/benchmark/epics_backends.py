@@ -0,0 +1,197 @@
+"""
+Compare the Channel Access backends of the ca:// plugin, pyepics and caproto.
+
+A caproto IOC serving PVs updated at a fixed rate is started in a separate
+process, then every backend is run in its own process against it. The
+updates delivered to the listeners and the CPU used by the client are
+reported as JSON.
+
+Usage::
+
+    python -m pydm.benchmark.epics_backends [--pvs 1000] [--rate 10]
+        [--count 1] [--duration 10] [--backends pyepics caproto]
+
+Use ``--prefix`` to run the clients against PVs served by an IOC which is
+already running, named ``<prefix>0`` to ``<prefix><pvs - 1>``.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+BACKENDS = ('pyepics', 'caproto')
+PREFIX = 'PYDMBENCH:'
+
+
+def serve(prefix, pvs, rate, count):
+    """
+    Serve PVs updated `rate` times per second, until interrupted.
+
+    Parameters
+    ----------
+    prefix : str
+    pvs : int
+        Number of PVs.
+    rate : float
+    count : int
+        Number of elements of each PV.
+    """
+    import asyncio
+    import numpy as np
+    from caproto import ChannelDouble
+    from caproto.asyncio.server import run
+
+    def initial(i):
+        return float(i) if count == 1 else np.zeros(count).tolist()
+
+    pvdb = {'{}{}'.format(prefix, i): ChannelDouble(value=initial(i))
+            for i in range(pvs)}
+    channels = list(pvdb.values())
+
+    async def update(async_lib):
+        step = 0
+        while True:
+            await asyncio.sleep(1.0 / rate)
+            step += 1
+            for i, channel in enumerate(channels):
+                if count == 1:
+                    value = float(i + step)
+                else:
+                    value = (np.arange(count) + step).tolist()
+                await channel.write(value)
+
+    async def startup_hook(async_lib):
+        asyncio.get_event_loop().create_task(update(async_lib))
+
+    run(pvdb, interfaces=['127.0.0.1'], startup_hook=startup_hook)
+
+
+def measure(backend, prefix, pvs, duration, warmup):
+    """
+    Connect to the PVs with a backend and count the updates delivered.
+
+    Parameters
+    ----------
+    backend : str
+        One of ``BACKENDS``.
+    prefix : str
+    pvs : int
+    duration : float
+    warmup : float
+
+    Returns
+    -------
+    dict
+    """
+    os.environ['PYDM_EPICS_LIB'] = backend.upper()
+    from qtpy.QtWidgets import QApplication
+    from pydm.benchmark.bench import wait, ThreadUsage
+    from pydm.data_plugins.epics_plugin import EPICSPlugin
+    from pydm.widgets.channel import PyDMChannel
+
+    app = QApplication.instance() or QApplication([])
+    received = [0]
+    connected = [0]
+
+    def data_received(data):
+        received[0] += 1
+
+    def connection_changed(conn):
+        connected[0] += 1 if conn else -1
+
+    channels = [PyDMChannel(address='ca://{}{}'.format(prefix, i),
+                            data_slot=data_received,
+                            connection_slot=connection_changed)
+                for i in range(pvs)]
+    plugin = EPICSPlugin()
+    start = time.time()
+    plugin.add_connections(channels)
+    while connected[0] < pvs and time.time() - start < warmup + 30:
+        wait(0.1)
+    connect_time = time.time() - start
+    wait(warmup)
+
+    received[0] = 0
+    start_usage = ThreadUsage()
+    wait(duration)
+    usage = ThreadUsage()
+    elapsed = usage.wall - start_usage.wall
+    cpu = sum(usage.threads.values()) - sum(start_usage.threads.values())
+    updates = received[0]
+    plugin.remove_connections(channels)
+    app.processEvents()
+    return dict(
+        connected=connected[0],
+        connect_time=connect_time,
+        updates=updates,
+        updates_per_second=updates / elapsed,
+        cpu_percent=100.0 * cpu / elapsed,
+        cpu_per_update_us=1e6 * cpu / updates if updates else None,
+        rss_bytes=usage.rss,
+        cpu_percent_per_thread=usage.cpu_since(start_usage))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pvs', type=int, default=1000,
+                        help='Number of PVs.')
+    parser.add_argument('--rate', type=float, default=10.0,
+                        help='Updates per second of each PV.')
+    parser.add_argument('--count', type=int, default=1,
+                        help='Number of elements of each PV.')
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help='Seconds to measure each backend for.')
+    parser.add_argument('--warmup', type=float, default=2.0,
+                        help='Seconds to wait before measuring.')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS),
+                        choices=BACKENDS)
+    parser.add_argument('--prefix', default=None,
+                        help='Prefix of the PVs of a running IOC. By default '
+                             'an IOC is started.')
+    parser.add_argument('--serve', action='store_true',
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--client', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    prefix = args.prefix or PREFIX
+
+    if args.serve:
+        serve(prefix, args.pvs, args.rate, args.count)
+        return
+    if args.client:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        result = measure(args.client, prefix, args.pvs, args.duration,
+                         args.warmup)
+        print(json.dumps(result))
+        return
+
+    common = ['--pvs', str(args.pvs), '--prefix', prefix]
+    env = dict(os.environ)
+    ioc = None
+    if args.prefix is None:
+        env.update(EPICS_CA_ADDR_LIST='127.0.0.1',
+                   EPICS_CA_AUTO_ADDR_LIST='NO')
+        ioc = subprocess.Popen(
+            [sys.executable, '-m', 'pydm.benchmark.epics_backends',
+             '--serve', '--rate', str(args.rate), '--count', str(args.count)]
+            + common, env=env)
+    report = dict(pvs=args.pvs, rate=args.rate, count=args.count,
+                  duration=args.duration, backends={})
+    try:
+        for backend in args.backends:
+            output = subprocess.check_output(
+                [sys.executable, '-m', 'pydm.benchmark.epics_backends',
+                 '--client', backend, '--duration', str(args.duration),
+                 '--warmup', str(args.warmup)] + common, env=env)
+            report['backends'][backend] = json.loads(
+                output.decode().strip().splitlines()[-1])
+    finally:
+        if ioc is not None:
+            ioc.terminate()
+            ioc.wait()
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
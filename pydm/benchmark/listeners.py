@@ -0,0 +1,114 @@
+"""
+Measure the cost of connecting, updating and tearing down many listeners of
+a single PyDMConnection, comparing the per-overload ``value_slot`` path with
+the single ``data_slot`` envelope path.
+
+Usage::
+
+    python -m pydm.benchmark.listeners [--listeners 10000] [--updates 10]
+"""
+import argparse
+import time
+
+import numpy as np
+from qtpy.QtCore import QObject, Slot
+from qtpy.QtWidgets import QApplication
+
+from pydm.data_plugins.plugin import PyDMConnection
+from pydm.widgets.channel import PyDMChannel
+
+
+class Receiver(QObject):
+    """Listener with the same slot signatures used by PyDMWidget."""
+
+    def __init__(self, parent=None):
+        super(Receiver, self).__init__(parent)
+        self.count = 0
+
+    @Slot(int)
+    @Slot(float)
+    @Slot(str)
+    @Slot(bool)
+    @Slot(np.ndarray)
+    def value_changed(self, new_val):
+        self.count += 1
+
+    @Slot(object)
+    def data_changed(self, data):
+        self.count += 1
+
+
+def run(listeners, updates, envelope):
+    """
+    Run the benchmark for one transport.
+
+    Parameters
+    ----------
+    listeners : int
+        Number of listeners of the connection.
+    updates : int
+        Number of value updates to deliver to every listener.
+    envelope : bool
+        True to use the data_slot envelope, False for the value_slot path.
+
+    Returns
+    -------
+    dict
+        Seconds spent connecting, emitting and delivering, and tearing down
+        one listener at a time and all listeners at once.
+    """
+    app = QApplication.instance()
+    receivers = [Receiver() for _ in range(listeners)]
+    if envelope:
+        channels = [PyDMChannel(address='bench://pv', data_slot=r.data_changed)
+                    for r in receivers]
+    else:
+        channels = [PyDMChannel(address='bench://pv', value_slot=r.value_changed)
+                    for r in receivers]
+    connection = PyDMConnection(channels[0], 'pv')
+    connection.dispatcher = None
+
+    start = time.perf_counter()
+    for channel in channels:
+        connection.add_listener(channel)
+    connect_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(updates):
+        connection.publish('value', float(i))
+    emit_time = time.perf_counter() - start
+    app.processEvents()
+    deliver_time = time.perf_counter() - start
+    assert all(r.count == updates for r in receivers)
+
+    start = time.perf_counter()
+    for channel in channels:
+        connection.remove_listener(channel)
+    teardown_time = time.perf_counter() - start
+
+    for channel in channels:
+        connection.add_listener(channel)
+    start = time.perf_counter()
+    connection.remove_listeners(channels)
+    bulk_teardown_time = time.perf_counter() - start
+    return dict(connect=connect_time, emit=emit_time, deliver=deliver_time,
+                teardown=teardown_time, bulk_teardown=bulk_teardown_time)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--listeners', type=int, default=10000)
+    parser.add_argument('--updates', type=int, default=10)
+    args = parser.parse_args()
+    app = QApplication.instance() or QApplication([])
+    print("{} listeners, {} updates".format(args.listeners, args.updates))
+    print("{:<12}{:>10}{:>10}{:>10}{:>10}{:>10}".format(
+        "transport", "connect", "emit", "deliver", "teardown", "bulk"))
+    for name, envelope in (("value_slot", False), ("data_slot", True)):
+        result = run(args.listeners, args.updates, envelope)
+        print("{:<12}{connect:>9.3f}s{emit:>9.3f}s{deliver:>9.3f}s"
+              "{teardown:>9.3f}s{bulk_teardown:>9.3f}s".format(name, **result))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,27 @@
 import os
 
 __all__ = ['DEFAULT_PROTOCOL',
-           'DESIGNER_ONLINE'
+           'DESIGNER_ONLINE',
+           'FRAME_RATE',
+           'CHANGE_DETECTION',
+           'LARGE_ARRAY_SIZE',
+           'ARCHIVER_WORKERS',
+           'ARCHIVER_CHUNK_SIZE',
+           'ARCHIVER_CACHE_DIR',
+           'ARCHIVER_CACHE_SIZE',
+           'LOCAL_WORKERS',
+           'LOCAL_TIMEOUT',
+           'ARRAY_BANDWIDTH',
+           'ARRAY_FRAME_RATE',
+           'PUT_WINDOW',
+           'PUT_CALLBACK',
+           'PUT_WORKERS',
+           'GATEWAY_PROTOCOLS',
+           'GATEWAY_SOCKET',
+           'GATEWAY_AUTOSTART',
+           'GATEWAY_SHM_SIZE',
+           'UI_CACHE_DIR',
+           'UI_CACHE_SIZE'
            ]
 
 
@@ -11,3 +31,69 @@ if DEFAULT_PROTOCOL is not None:
     DEFAULT_PROTOCOL = DEFAULT_PROTOCOL.split("://")[0]
 
 DESIGNER_ONLINE = os.getenv("PYDM_DESIGNER_ONLINE", None) is not None
+
+# Rate, in Hz, at which coalesced channel updates are delivered to the widgets.
+# Zero disables the coalescing and every update is delivered right away.
+FRAME_RATE = float(os.getenv("PYDM_FRAME_RATE", 0))
+
+# How the EPICS plugins decide whether a large array changed since the last
+# update: "compare", "sampled", "timestamp" or "always". Arrays with at most
+# LARGE_ARRAY_SIZE elements, and scalars, are always compared in full.
+# "sampled" may miss a change between the elements it checks.
+CHANGE_DETECTION = os.getenv("PYDM_CHANGE_DETECTION", "timestamp").lower()
+LARGE_ARRAY_SIZE = int(os.getenv("PYDM_LARGE_ARRAY_SIZE", 16384))
+
+# Number of threads sending requests to the Archiver Appliance, and the
+# longest time range, in seconds, retrieved by a single request. Longer
+# ranges are split and retrieved in parallel. Zero disables the splitting.
+ARCHIVER_WORKERS = int(os.getenv("PYDM_ARCHIVER_WORKERS", 4))
+ARCHIVER_CHUNK_SIZE = float(os.getenv("PYDM_ARCHIVER_CHUNK_SIZE", 86400))
+
+# Directory where the data retrieved from the Archiver Appliance is cached,
+# and the maximum size of the cache in megabytes. Zero disables the cache.
+ARCHIVER_CACHE_DIR = os.getenv(
+    "PYDM_ARCHIVER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "pydm", "archiver"))
+ARCHIVER_CACHE_SIZE = float(os.getenv("PYDM_ARCHIVER_CACHE_SIZE", 512))
+
+# Number of threads evaluating the getters of the LocalPlugin connections, and
+# the seconds after which a getter still running marks its connection as
+# disconnected. Zero disables the timeout.
+LOCAL_WORKERS = int(os.getenv("PYDM_LOCAL_WORKERS", 4))
+LOCAL_TIMEOUT = float(os.getenv("PYDM_LOCAL_TIMEOUT", 5))
+
+# Budget shared by the connections delivering arrays, in bytes per second and
+# in arrays per second. Zero disables the corresponding limit.
+ARRAY_BANDWIDTH = float(os.getenv("PYDM_ARRAY_BANDWIDTH", 0))
+ARRAY_FRAME_RATE = float(os.getenv("PYDM_ARRAY_FRAME_RATE", 0))
+
+# Minimum number of seconds between two writes of the values sent by the
+# widgets to a channel. Values sent meanwhile are dropped, except for the
+# latest one. PUT_CALLBACK makes each write wait for the completion reported
+# by the data source before the next one. The writes are done by PUT_WORKERS
+# threads.
+PUT_WINDOW = float(os.getenv("PYDM_PUT_WINDOW", 0))
+PUT_CALLBACK = os.getenv("PYDM_PUT_CALLBACK", "0").lower() in ("1", "true", "yes")
+PUT_WORKERS = int(os.getenv("PYDM_PUT_WORKERS", 2))
+
+# Protocols whose channels go through the gateway shared by the PyDM processes
+# of the host, e.g. "ca,sim", the path of its socket and whether to start it
+# when it is not running. Arrays of at least GATEWAY_SHM_SIZE bytes are
+# handed over in shared memory, zero sends them over the socket.
+GATEWAY_PROTOCOLS = tuple(
+    protocol.strip().split("://")[0]
+    for protocol in os.getenv("PYDM_GATEWAY_PROTOCOLS", "").split(",")
+    if protocol.strip())
+# GATEWAY_SOCKET is None for the socket in the private runtime directory of
+# the user, see pydm.gateway.protocol.socket_path.
+GATEWAY_SOCKET = os.getenv("PYDM_GATEWAY_SOCKET") or None
+GATEWAY_AUTOSTART = os.getenv("PYDM_GATEWAY_AUTOSTART", "1").lower() in ("1", "true", "yes")
+GATEWAY_SHM_SIZE = int(os.getenv("PYDM_GATEWAY_SHM_SIZE", 65536))
+
+# Directory where the .ui files compiled to Python are cached, shared by the
+# PyDM processes, and the maximum size of the cache in megabytes. Empty or
+# zero keeps the compiled files in memory only.
+UI_CACHE_DIR = os.getenv(
+    "PYDM_UI_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "pydm", "ui"))
+UI_CACHE_SIZE = float(os.getenv("PYDM_UI_CACHE_SIZE", 64))
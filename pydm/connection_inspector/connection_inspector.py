@@ -62,7 +62,7 @@ class ConnectionTableView(QTableView):
         super(ConnectionTableView, self).__init__(parent)
         self.setSizeAdjustPolicy(
             QAbstractScrollArea.AdjustToContentsOnFirstShow)
-        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.horizontalHeader().setStretchLastSection(True)
         self.setSelectionMode(QAbstractItemView.SingleSelection)
         self.setSelectionBehavior(QAbstractItemView.SelectRows)
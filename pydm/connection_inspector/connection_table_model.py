@@ -2,23 +2,54 @@ from qtpy.QtCore import QAbstractTableModel, Qt, QModelIndex, QVariant, QTimer,
 from qtpy.QtGui import QBrush
 from operator import attrgetter
 
+
 class ConnectionTableModel(QAbstractTableModel):
     def __init__(self, connections=[], parent=None):
         super(ConnectionTableModel, self).__init__(parent=parent)
-        self._column_names = ("protocol", "address", "connected")
+        self._column_names = ("protocol", "address", "connected",
+                              "listener_count", "update_count", "update_rate",
+                              "peak_update_rate", "governed_rate",
+                              "bytes_received",
+                              "time_since_last_update", "latency",
+                              "put_count", "put_dropped", "put_latency")
+        self._column_headers = {"listener_count": "Listeners",
+                                "update_count": "Updates",
+                                "update_rate": "Rate (Hz)",
+                                "peak_update_rate": "Peak Rate (Hz)",
+                                "governed_rate": "Allocated (Hz)",
+                                "bytes_received": "Bytes Received",
+                                "time_since_last_update": "Last Update (s)",
+                                "latency": "Latency (s)",
+                                "put_count": "Puts",
+                                "put_dropped": "Puts Dropped",
+                                "put_latency": "Put Latency (s)"}
+        self._sort_column = None
+        self._sort_order = Qt.AscendingOrder
         self.update_timer = QTimer(self)
         self.update_timer.setInterval(1000)
         self.update_timer.timeout.connect(self.update_values)
         self.connections = connections
-        
+
     def sort(self, col, order=Qt.AscendingOrder):
         if self._column_names[col] == "value":
             return
+        self._sort_column = col
+        self._sort_order = order
         self.layoutAboutToBeChanged.emit()
-        sort_reversed = (order == Qt.AscendingOrder)
-        self._connections.sort(key=attrgetter(self._column_names[col]), reverse=sort_reversed)
+        self._sort_connections()
         self.layoutChanged.emit()
 
+    def _sort_connections(self):
+        if self._sort_column is None:
+            return
+        sort_reversed = (self._sort_order == Qt.AscendingOrder)
+        getter = attrgetter(self._column_names[self._sort_column])
+        # Connections missing the value (None) are placed last in both orders.
+        missing = [conn for conn in self._connections if getter(conn) is None]
+        present = [conn for conn in self._connections if getter(conn) is not None]
+        present.sort(key=getter, reverse=sort_reversed)
+        self._connections[:] = present + missing
+
     @property
     def connections(self):
         return self._connections
@@ -27,6 +58,8 @@ class ConnectionTableModel(QAbstractTableModel):
     def connections(self, new_connections):
         self.beginResetModel()
         self._connections = new_connections
+        # Keep the user selected ordering when the list is refreshed.
+        self._sort_connections()
         self.endResetModel()
         if len(self._connections) > 0:
             self.update_timer.start()
@@ -55,7 +88,10 @@ class ConnectionTableModel(QAbstractTableModel):
         column_name = self._column_names[index.column()]
         conn = self.connections[index.row()]
         if role == Qt.DisplayRole or role == Qt.EditRole:
-            return str(getattr(conn, column_name))
+            value = getattr(conn, column_name, None)
+            if isinstance(value, float):
+                return "{:.1f}".format(value)
+            return str(value)
         else:
             return QVariant()
 
@@ -64,11 +100,21 @@ class ConnectionTableModel(QAbstractTableModel):
             return super(ConnectionTableModel, self).headerData(
                                                 section, orientation, role)
         if orientation == Qt.Horizontal and section < self.columnCount():
-            return str(self._column_names[section]).capitalize()
+            column_name = self._column_names[section]
+            return self._column_headers.get(column_name,
+                                            str(column_name).capitalize())
         elif orientation == Qt.Vertical and section < self.rowCount():
             return section
     # End QAbstractItemModel implementation.
 
     @Slot()
     def update_values(self):
-        self.dataChanged.emit(self.index(0,2), self.index(self.rowCount(),2))
\ No newline at end of file
+        if self.rowCount() == 0:
+            return
+        if self._sort_column is not None:
+            # The statistics change constantly, keep the rows ordered.
+            self.layoutAboutToBeChanged.emit()
+            self._sort_connections()
+            self.layoutChanged.emit()
+        self.dataChanged.emit(self.index(0, 2),
+                              self.index(self.rowCount() - 1, self.columnCount() - 1))
@@ -1,14 +1,20 @@
 """
-Loads all the data plugins available at the given PYDM_DATA_PLUGINS_PATH
-environment variable and subfolders that follows the *_plugin.py and have
-classes that inherits from the pydm.data_plugins.PyDMPlugin class.
+Registry of the data plugins available to PyDM.
+
+Plugins are registered by protocol name and only imported and instantiated
+the first time a channel using that protocol is requested. The built-in
+plugins are listed in ``BUILTIN_PLUGINS``, other packages can advertise
+plugins with a ``pydm.data_plugins`` entry point and, finally, files following
+the *_plugin.py pattern at the given PYDM_DATA_PLUGINS_PATH environment
+variable are loaded if they have classes that inherits from the
+pydm.data_plugins.PyDMPlugin class.
 """
 import os
 import sys
 import inspect
 import logging
-import imp
-import uuid
+import threading
+import zlib
 from .plugin import PyDMPlugin
 from ..utilities import protocol_and_address
 from .. import config
@@ -17,6 +23,25 @@ logger = logging.getLogger(__name__)
 plugin_modules = {}
 __read_only = False
 
+# Protocol vs. "module:class" for the plugins shipped with PyDM.
+BUILTIN_PLUGINS = {
+    'ca': 'pydm.data_plugins.epics_plugin:EPICSPlugin',
+    'archiver': 'pydm.data_plugins.archiver_plugin:ArchiverPlugin',
+    'fake': 'pydm.data_plugins.fake_plugin:FakePlugin',
+    'sim': 'pydm.data_plugins.sim_plugin:SimPlugin',
+    'gw': 'pydm.data_plugins.gateway_plugin:GatewayPlugin',
+}
+ENTRY_POINT_GROUP = 'pydm.data_plugins'
+DATA_PLUGIN_TOKEN = "_plugin.py"
+
+# Protocol vs. PyDMPlugin class or "module:class" reference of the plugins
+# which were registered but not instantiated yet.
+_registry = dict(BUILTIN_PLUGINS)
+_failed_protocols = set()
+_registry_lock = threading.RLock()
+_entry_points_loaded = False
+_path_plugins_loaded = False
+
 
 def plugin_for_address(address):
     """
@@ -31,12 +56,16 @@ def plugin_for_address(address):
         # If no protocol was specified, and the default protocol
         # environment variable is specified, try to use that instead.
         protocol = config.DEFAULT_PROTOCOL
+    # Channels shared through the gateway keep their address, the gateway
+    # plugin passes it on.
+    if protocol in config.GATEWAY_PROTOCOLS:
+        protocol = 'gw'
     # Load proper plugin module
     if protocol:
-        try:
-            return plugin_modules[str(protocol)]
-        except KeyError as exc:
-            logger.exception("Could not find protocol for %r", address)
+        plugin = plugin_for_protocol(str(protocol))
+        if plugin is not None:
+            return plugin
+        logger.error("Could not find protocol for %r", address)
     # Catch all in case of improper plugin specification
     logger.error("Channel {addr} did not specify a valid protocol "
                  "and no default protocol is defined. This channel "
@@ -46,6 +75,173 @@ def plugin_for_address(address):
     return None
 
 
+def plugin_for_protocol(protocol):
+    """
+    Return the PyDMPlugin instance for a protocol, importing and instantiating
+    it if this is the first time the protocol is used.
+
+    Parameters
+    ----------
+    protocol : str
+
+    Returns
+    -------
+    PyDMPlugin or None
+        None if no plugin is registered for the protocol or if the plugin
+        could not be loaded.
+    """
+    try:
+        return plugin_modules[protocol]
+    except KeyError:
+        pass
+    with _registry_lock:
+        _load_path_plugins()
+        if protocol in plugin_modules:
+            return plugin_modules[protocol]
+        if protocol not in _registry:
+            _load_entry_points()
+        if protocol not in _registry or protocol in _failed_protocols:
+            return None
+        try:
+            plugin = _resolve(_registry[protocol])
+        except Exception:
+            _failed_protocols.add(protocol)
+            logger.exception("Unable to load the data plugin for protocol "
+                             "%s. Channels using it will receive no data.",
+                             protocol)
+            return None
+        # Plugins such as the EPICS one only get their protocol once loaded.
+        if plugin.protocol is None:
+            plugin.protocol = protocol
+        plugin_modules[protocol] = plugin()
+        del _registry[protocol]
+        return plugin_modules[protocol]
+
+
+def registered_protocols():
+    """
+    List the protocols for which a plugin is available, whether it was
+    already loaded or not.
+
+    Returns
+    -------
+    list
+    """
+    with _registry_lock:
+        _load_path_plugins()
+        _load_entry_points()
+        return sorted(set(plugin_modules) | set(_registry))
+
+
+def register_plugin(protocol, plugin):
+    """
+    Register a plugin for a protocol without importing or instantiating it.
+
+    Parameters
+    ----------
+    protocol : str
+        The protocol handled by the plugin.
+    plugin : PyDMPlugin or str
+        The plugin class or a reference to it in the "module:class" format.
+        The plugin is only loaded once a channel uses the protocol.
+        If a plugin was already loaded for the protocol it is replaced.
+    """
+    with _registry_lock:
+        if protocol in plugin_modules:
+            logger.warning("Replacing %s plugin with %s for use with "
+                           "protocol %s", plugin_modules[protocol], plugin,
+                           protocol)
+            del plugin_modules[protocol]
+        _registry[protocol] = plugin
+        _failed_protocols.discard(protocol)
+
+
+def _resolve(reference):
+    """
+    Import the plugin class behind a "module:class" reference.
+    """
+    if not isinstance(reference, str):
+        return reference
+    module_name, _, class_name = reference.partition(':')
+    module = __import__(module_name, fromlist=[class_name])
+    return getattr(module, class_name)
+
+
+def _load_entry_points():
+    """
+    Register the plugins advertised by installed packages with the
+    ``pydm.data_plugins`` entry point. This is only done once.
+    """
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    try:
+        from importlib import metadata
+        eps = metadata.entry_points()
+        if hasattr(eps, 'select'):
+            eps = eps.select(group=ENTRY_POINT_GROUP)
+        else:
+            eps = eps.get(ENTRY_POINT_GROUP, [])
+    except ImportError:
+        try:
+            import pkg_resources
+        except ImportError:
+            return
+        eps = pkg_resources.iter_entry_points(ENTRY_POINT_GROUP)
+    for ep in eps:
+        if ep.name in plugin_modules or ep.name in _registry:
+            continue
+        value = getattr(ep, 'value', None)
+        if value is None:
+            value = "{}:{}".format(ep.module_name, ".".join(ep.attrs))
+        logger.debug("Registering data plugin %s for protocol %s", value,
+                     ep.name)
+        _registry[ep.name] = value
+
+
+def _load_path_plugins():
+    """
+    Load the plugins found at the PYDM_DATA_PLUGINS_PATH locations. This is
+    done once, when the first channel is connected.
+    """
+    global _path_plugins_loaded
+    if _path_plugins_loaded:
+        return
+    _path_plugins_loaded = True
+    path = os.getenv("PYDM_DATA_PLUGINS_PATH", None)
+    if path:
+        logger.debug("*"*80)
+        logger.debug("* Loading PyDM Data Plugins")
+        logger.debug("*"*80)
+        load_plugins_from_path(path.split(os.pathsep), DATA_PLUGIN_TOKEN)
+
+
+def _load_source(root, name):
+    """
+    Import a python file by path. A stable module name is used so that the
+    cached bytecode is reused in between sessions.
+    """
+    path = os.path.join(root, name)
+    root_hash = zlib.crc32(os.path.realpath(root).encode('utf-8'))
+    module_name = "pydm_data_plugin_{}_{:x}".format(
+        os.path.splitext(name)[0], root_hash & 0xffffffff)
+    try:
+        from importlib.util import spec_from_file_location, module_from_spec
+    except ImportError:
+        import imp
+        return imp.load_source(module_name, path)
+    spec = spec_from_file_location(module_name, path)
+    module = module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[module_name]
+        raise
+    return module
+
+
 def add_plugin(plugin):
     """
     Add a PyDM plugin to the global registry of protocol vs. plugins
@@ -60,7 +256,9 @@ def add_plugin(plugin):
         logger.warning("Replacing %s plugin with %s for use with protocol %s",
                        plugin, plugin_modules[plugin.protocol],
                        plugin.protocol)
-    plugin_modules[plugin.protocol] = plugin()
+    with _registry_lock:
+        _registry.pop(plugin.protocol, None)
+        plugin_modules[plugin.protocol] = plugin()
 
 
 def load_plugins_from_path(locations, token):
@@ -94,9 +292,7 @@ def load_plugins_from_path(locations, token):
                     try:
                         logger.debug("Trying to load %s...", name)
                         sys.path.append(root)
-                        temp_name = str(uuid.uuid4())
-                        module = imp.load_source(temp_name,
-                                                 os.path.join(root, name))
+                        module = _load_source(root, name)
                     except Exception as e:
                         logger.exception("Unable to import plugin file %s."
                                          "This plugin will be skipped."
@@ -142,22 +338,3 @@ def set_read_only(read_only):
     __read_only = read_only
     if read_only:
         logger.info("Running PyDM in Read Only mode.")
-
-
-# Load the data plugins from PYDM_DATA_PLUGINS_PATH
-logger.debug("*"*80)
-logger.debug("* Loading PyDM Data Plugins")
-logger.debug("*"*80)
-
-DATA_PLUGIN_TOKEN = "_plugin.py"
-path = os.getenv("PYDM_DATA_PLUGINS_PATH", None)
-if path is None:
-    locations = []
-else:
-    locations = path.split(os.pathsep)
-
-# Ensure that we first visit the local data_plugins location
-plugin_dir = os.path.dirname(os.path.realpath(__file__))
-locations.insert(0, plugin_dir)
-
-load_plugins_from_path(locations, DATA_PLUGIN_TOKEN)
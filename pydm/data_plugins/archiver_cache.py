@@ -0,0 +1,302 @@
+"""
+On-disk cache of the data retrieved from the Archiver Appliance.
+
+The samples retrieved for a time range are stored as a segment, an ``.npz``
+file holding the timestamps and the values, in a directory per PV and
+request parameters. The name of a segment gives the time range it covers,
+so a request overlapping cached segments only needs to retrieve the parts
+of its range that are not covered yet.
+
+The least recently used segments are removed when the size of the cache
+exceeds ``config.ARCHIVER_CACHE_SIZE`` megabytes.
+"""
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+
+import six
+import numpy as np
+from six.moves.urllib.parse import urlencode
+
+from .. import config
+
+logger = logging.getLogger(__name__)
+
+# Samples newer than this many seconds are not cached, the appliance may
+# still receive data for that period.
+SETTLING_TIME = 60.0
+SEGMENT_SUFFIX = '.npz'
+
+_lock = threading.RLock()
+
+
+def cache():
+    """
+    Get the cache configured by ``config.ARCHIVER_CACHE_DIR`` and
+    ``config.ARCHIVER_CACHE_SIZE``.
+
+    Returns
+    -------
+    ArchiverCache or None
+        None if the cache is disabled.
+    """
+    if not config.ARCHIVER_CACHE_DIR or config.ARCHIVER_CACHE_SIZE <= 0:
+        return None
+    return ArchiverCache(config.ARCHIVER_CACHE_DIR,
+                         int(config.ARCHIVER_CACHE_SIZE * 1024 * 1024))
+
+
+def request_key(params):
+    """
+    Identify the data requested, regardless of its time range.
+
+    Parameters
+    ----------
+    params : list of tuple
+        The parameters of the request.
+
+    Returns
+    -------
+    str
+    """
+    return urlencode(sorted((key, value) for key, value in params
+                            if key not in ('from', 'to')))
+
+
+def storable(values):
+    """
+    Get values in a form saved without pickling, which ``np.load`` reads
+    back by default.
+
+    Parameters
+    ----------
+    values : np.ndarray
+
+    Returns
+    -------
+    np.ndarray or None
+        None if the values can only be pickled, e.g. waveforms of varying
+        lengths.
+    """
+    if values.dtype != object:
+        return values
+    if all(isinstance(value, six.string_types) for value in values.flat):
+        return values.astype(six.text_type)
+    return None
+
+
+def missing_intervals(covered, start, end):
+    """
+    Find the parts of a time range which are not covered.
+
+    Parameters
+    ----------
+    covered : list of tuple
+        Start and end of the covered intervals.
+    start : float
+    end : float
+
+    Returns
+    -------
+    list of tuple
+        Start and end of each gap, in chronological order.
+    """
+    missing = []
+    position = start
+    for interval_start, interval_end in sorted(covered):
+        if interval_end <= position:
+            continue
+        if interval_start >= end:
+            break
+        if interval_start > position:
+            missing.append((position, interval_start))
+        position = interval_end
+        if position >= end:
+            break
+    if position < end:
+        missing.append((position, end))
+    return missing
+
+
+class ArchiverCache(object):
+    """
+    Segments of archived data stored in a directory.
+
+    Parameters
+    ----------
+    directory : str
+    max_size : int
+        Maximum size of the cache, in bytes.
+    """
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    def key_directory(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest)
+
+    def segments(self, key):
+        """
+        List the segments cached for a request.
+
+        Parameters
+        ----------
+        key : str
+            As given by :func:`request_key`.
+
+        Returns
+        -------
+        list of tuple
+            Start, end and path of each segment, sorted by start.
+        """
+        directory = self.key_directory(key)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return []
+        segments = []
+        for name in names:
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            try:
+                start, end = name[:-len(SEGMENT_SUFFIX)].split('_')
+                segments.append((float(start), float(end),
+                                 os.path.join(directory, name)))
+            except ValueError:
+                continue
+        return sorted(segments)
+
+    def lookup(self, key, start, end):
+        """
+        Read the cached samples of a time range.
+
+        Parameters
+        ----------
+        key : str
+        start : float
+        end : float
+
+        Returns
+        -------
+        tuple
+            The cached pieces, as (start, timestamps, values) tuples, and
+            the (start, end) intervals that still have to be retrieved.
+        """
+        pieces = []
+        covered = []
+        with _lock:
+            for segment_start, segment_end, path in self.segments(key):
+                if segment_end <= start or segment_start >= end:
+                    continue
+                try:
+                    with np.load(path) as data:
+                        times = data['times']
+                        values = data['values']
+                    os.utime(path, None)
+                except Exception:
+                    logger.warning("Unable to read the cached segment %s",
+                                   path)
+                    continue
+                piece_start = max(start, segment_start)
+                piece_end = min(end, segment_end)
+                # Like the appliance, include the sample preceding the start.
+                first = max(np.searchsorted(times, piece_start, 'right') - 1,
+                            0)
+                last = np.searchsorted(times, piece_end, 'right')
+                pieces.append((piece_start, times[first:last],
+                               values[first:last]))
+                covered.append((segment_start, segment_end))
+        return pieces, missing_intervals(covered, start, end)
+
+    def store(self, key, start, end, times, values):
+        """
+        Cache the samples of a time range. The samples too recent to be
+        final are left out, and the segments included in the new one are
+        removed.
+
+        Parameters
+        ----------
+        key : str
+        start : float
+        end : float
+        times : np.ndarray
+        values : np.ndarray
+        """
+        end = min(end, time.time() - SETTLING_TIME)
+        if end <= start:
+            return
+        values = storable(values)
+        if values is None:
+            logger.debug("Not caching %s, its values need pickling", key)
+            return
+        keep = times <= end
+        directory = self.key_directory(key)
+        path = os.path.join(directory, '{:.3f}_{:.3f}{}'.format(
+            start, end, SEGMENT_SUFFIX))
+        with _lock:
+            try:
+                if not os.path.isdir(directory):
+                    os.makedirs(directory)
+                handle, temp_path = tempfile.mkstemp(dir=directory,
+                                                     suffix='.tmp')
+                with os.fdopen(handle, 'wb') as f:
+                    np.savez(f, times=times[keep], values=values[keep])
+                os.rename(temp_path, path)
+            except (OSError, IOError):
+                logger.exception("Unable to cache archiver data in %s",
+                                 directory)
+                return
+            for segment_start, segment_end, segment_path in self.segments(key):
+                if (segment_path != path and segment_start >= start and
+                        segment_end <= end):
+                    self._remove(segment_path)
+            self.evict()
+
+    def size(self):
+        """
+        The size of the cached segments, in bytes.
+
+        Returns
+        -------
+        int
+        """
+        return sum(size for _, size, _ in self._files())
+
+    def evict(self):
+        """
+        Remove the least recently used segments until the cache fits in
+        `max_size`.
+        """
+        with _lock:
+            files = sorted(self._files())
+            total = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if total <= self.max_size:
+                    break
+                self._remove(path)
+                total -= size
+
+    def _files(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(SEGMENT_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -1,25 +1,456 @@
-from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection
+"""
+Plugin retrieving the history of a PV from an Archiver Appliance.
+
+Addresses are the parameters of the appliance's ``getData.json`` retrieval
+request, e.g. ``archiver://pv=PV:NAME&from=2018-01-01T00:00:00Z&to=2018-01-08T00:00:00Z``.
+The base URL of the appliance is given by the ``PYDM_ARCHIVER_URL``
+environment variable.
+
+The requests are sent from a pool of worker threads, so the GUI is never
+blocked while waiting for the appliance. Time ranges longer than
+``config.ARCHIVER_CHUNK_SIZE`` seconds are split into chunks which are
+retrieved in parallel and joined in order. The samples are decoded into
+arrays of timestamps and values before being published, and stored in the
+cache of :mod:`pydm.data_plugins.archiver_cache` so that only the parts of a
+time range that were never retrieved are requested again.
+"""
+import os
+import time
+import logging
+import calendar
+import threading
+from datetime import datetime
+
 import requests
 import numpy as np
-import os
+from six.moves import map
+from six.moves.urllib.parse import parse_qsl, urlencode
+from qtpy.QtCore import QRunnable, QThreadPool
+
+from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection
+from pydm.data_plugins import archiver_cache
+from pydm import config
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the appliance to answer a request.
+TIMEOUT = 30.0
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+_pool = None
+_sessions = threading.local()
+
+
+def worker_pool():
+    """
+    Get the pool of threads sending the archiver requests.
+
+    Returns
+    -------
+    QThreadPool
+    """
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(max(config.ARCHIVER_WORKERS, 1))
+    return _pool
+
+
+def session():
+    """
+    Get the HTTP session of the current worker thread, which keeps its
+    connections to the appliance open in between requests.
+
+    Returns
+    -------
+    requests.Session
+    """
+    if getattr(_sessions, 'session', None) is None:
+        _sessions.session = requests.Session()
+    return _sessions.session
+
+
+def parse_time(text):
+    """
+    Convert an ISO 8601 time, as used by the appliance, to seconds since the
+    epoch.
+
+    Parameters
+    ----------
+    text : str
+        E.g. ``2018-01-01T00:00:00.000Z`` or ``2018-01-01T00:00:00-08:00``.
+
+    Returns
+    -------
+    float
+    """
+    text = text.strip()
+    offset = 0
+    if text.endswith('Z'):
+        text = text[:-1]
+    elif len(text) > 6 and text[-6] in '+-' and text[-3] == ':':
+        sign = 1 if text[-6] == '+' else -1
+        offset = sign * (int(text[-5:-3]) * 3600 + int(text[-2:]) * 60)
+        text = text[:-6]
+    text, _, fraction = text.partition('.')
+    stamp = datetime.strptime(text, TIME_FORMAT)
+    seconds = calendar.timegm(stamp.timetuple()) - offset
+    if fraction:
+        seconds += float('0.' + fraction)
+    return float(seconds)
+
+
+def format_time(seconds):
+    """
+    Convert seconds since the epoch to an ISO 8601 time in UTC.
+
+    Parameters
+    ----------
+    seconds : float
+
+    Returns
+    -------
+    str
+    """
+    whole = int(seconds // 1)
+    millis = int(round((seconds - whole) * 1000))
+    if millis == 1000:
+        whole += 1
+        millis = 0
+    return '{}.{:03d}Z'.format(
+        time.strftime(TIME_FORMAT, time.gmtime(whole)), millis)
+
+
+def time_range(params):
+    """
+    Get the time range of a request.
+
+    Parameters
+    ----------
+    params : list of tuple
+        The parameters of the request.
+
+    Returns
+    -------
+    tuple or None
+        The start and end, in seconds since the epoch, or None if the
+        request has no valid time range.
+    """
+    values = dict(params)
+    if 'from' not in values or 'to' not in values:
+        return None
+    try:
+        return parse_time(values['from']), parse_time(values['to'])
+    except ValueError:
+        logger.warning("Unable to parse the time range of %r",
+                       urlencode(params))
+        return None
+
+
+def with_time_range(params, start, end):
+    """
+    Change the time range of a request.
+
+    Parameters
+    ----------
+    params : list of tuple
+    start : float
+    end : float
+
+    Returns
+    -------
+    str
+        The parameters of the new request.
+    """
+    return urlencode([(key, format_time(start) if key == 'from' else
+                       format_time(end) if key == 'to' else value)
+                      for key, value in params])
+
+
+def split_request(address, chunk_size):
+    """
+    Split the time range of a request into consecutive chunks.
+
+    Parameters
+    ----------
+    address : str
+        The parameters of the request.
+    chunk_size : float
+        Maximum duration, in seconds, of a chunk. Zero or less disables the
+        chunking.
+
+    Returns
+    -------
+    list of str
+        The parameters of the request of each chunk, in chronological
+        order. The address itself if the request has no time range.
+    """
+    params = parse_qsl(address, keep_blank_values=True)
+    interval = time_range(params)
+    if chunk_size <= 0 or interval is None:
+        return [address]
+    start, end = interval
+    if end - start <= chunk_size:
+        return [address]
+    chunks = []
+    while start < end:
+        stop = min(start + chunk_size, end)
+        chunks.append(with_time_range(params, start, stop))
+        start = stop
+    return chunks
+
+
+def decode_samples(samples):
+    """
+    Convert the samples of a JSON response to arrays.
+
+    Parameters
+    ----------
+    samples : list of dict
+        The ``data`` of a response, each sample has ``secs``, ``nanos`` and
+        ``val`` entries.
+
+    Returns
+    -------
+    tuple
+        The timestamps, in seconds since the epoch, and the values.
+    """
+    if not samples:
+        return np.zeros(0), np.zeros(0)
+    # One column at a time: a tight comprehension per column and the
+    # conversion done by NumPy in bulk.
+    if 'nanos' in samples[0]:
+        stamps = np.asarray([(sample['secs'], sample['nanos'])
+                             for sample in samples], dtype=np.float64)
+        secs = stamps[:, 0] + 1e-9 * stamps[:, 1]
+    else:
+        secs = np.asarray([sample['secs'] for sample in samples],
+                          dtype=np.float64)
+    values = [sample['val'] for sample in samples]
+    try:
+        values = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Strings
+        values = np.array(values)
+    return secs, values
+
+
+def join_samples(chunks):
+    """
+    Join the samples of consecutive chunks. The appliance may answer a
+    request with a sample preceding its start, which duplicates the last
+    sample of the previous chunk, so the samples not after the end of the
+    previous chunk are dropped.
+
+    Parameters
+    ----------
+    chunks : list of tuple
+        Timestamps and values of each chunk, in chronological order.
+
+    Returns
+    -------
+    tuple
+        The timestamps and the values.
+    """
+    times = []
+    values = []
+    last = None
+    for chunk_times, chunk_values in chunks:
+        if last is not None:
+            keep = chunk_times > last
+            chunk_times = chunk_times[keep]
+            chunk_values = chunk_values[keep]
+        if not len(chunk_times):
+            continue
+        times.append(chunk_times)
+        values.append(chunk_values)
+        last = chunk_times[-1]
+    if not times:
+        return np.array([], dtype=np.float64), np.array([], dtype=np.float64)
+    if len(times) == 1:
+        return times[0], values[0]
+    return np.concatenate(times), np.concatenate(values)
+
+
+class Task(QRunnable):
+    """
+    Call a function in a thread of the worker pool.
+    """
+    def __init__(self, function, *args):
+        super(Task, self).__init__()
+        self.function = function
+        self.args = args
+
+    def run(self):
+        try:
+            self.function(*self.args)
+        except Exception:
+            logger.exception("Error in an archiver worker")
+
+
+class Fetch(object):
+    """
+    Retrieve the data of a connection from the worker pool.
+
+    The parts of the time range found in the archiver cache are read from
+    it. The others are retrieved in chunks, which are joined with the cached
+    data and stored in the cache once every chunk was received.
+
+    Parameters
+    ----------
+    connection : Connection
+    base_url : str
+        Base URL of the appliance.
+    address : str
+        The parameters of the request.
+    """
+    def __init__(self, connection, base_url, address):
+        self.connection = connection
+        self.base_url = base_url
+        self.address = address
+        self.cancelled = False
+        self._cache = None
+        self._key = None
+        self._range = None
+        self._pieces = []
+        self._starts = []
+        self._results = []
+        self._remaining = 0
+        self._lock = threading.Lock()
+
+    def url(self, params):
+        return "{base}/retrieval/data/getData.json?{params}".format(
+            base=self.base_url, params=params)
+
+    def start(self):
+        worker_pool().start(Task(self.plan))
+
+    def plan(self):
+        """
+        Read the cached data and send the requests for the rest, from a
+        worker thread.
+        """
+        if self.cancelled:
+            return
+        params = parse_qsl(self.address, keep_blank_values=True)
+        self._range = time_range(params)
+        self._cache = archiver_cache.cache()
+        if self._range is None or self._cache is None:
+            self._cache = None
+            chunks = split_request(self.address, config.ARCHIVER_CHUNK_SIZE)
+        else:
+            self._key = archiver_cache.request_key(params)
+            self._pieces, missing = self._cache.lookup(self._key,
+                                                       *self._range)
+            chunks = []
+            for start, end in missing:
+                for chunk in split_request(with_time_range(params, start, end),
+                                           config.ARCHIVER_CHUNK_SIZE):
+                    chunks.append(chunk)
+                    self._starts.append(time_range(parse_qsl(chunk))[0])
+        self._results = [None] * len(chunks)
+        self._remaining = len(chunks)
+        if not chunks:
+            self.finish()
+            return
+        pool = worker_pool()
+        for index, chunk in enumerate(chunks):
+            pool.start(Task(self.fetch_chunk, index, self.url(chunk)))
+
+    def fetch_chunk(self, index, url):
+        """
+        Retrieve one chunk of the request, from a worker thread.
+
+        Parameters
+        ----------
+        index : int
+            Position of the chunk in the request.
+        url : str
+        """
+        result = None
+        if not self.cancelled:
+            try:
+                r = session().get(url, timeout=TIMEOUT)
+                if (r.status_code == 200 and r.headers.get(
+                        'content-type', '').startswith('application/json')):
+                    data = r.json()
+                    result = decode_samples(data[0]['data'] if data else [])
+                else:
+                    logger.error("Archiver request %s failed with status %s",
+                                 url, r.status_code)
+            except Exception:
+                logger.exception("Archiver request %s failed", url)
+        with self._lock:
+            self._results[index] = result
+            self._remaining -= 1
+            if self._remaining > 0:
+                return
+        self.finish()
+
+    def finish(self):
+        """
+        Join the cached and the retrieved data and publish them.
+        """
+        if self.cancelled:
+            return
+        if any(result is None for result in self._results):
+            self.connection.fetch_failed()
+            return
+        if self._cache is None:
+            times, values = join_samples(self._results)
+        else:
+            # Put the retrieved chunks in between the cached pieces
+            pieces = [(start, (times, values))
+                      for start, times, values in self._pieces]
+            pieces.extend(zip(self._starts, self._results))
+            pieces.sort(key=lambda piece: piece[0])
+            times, values = join_samples([samples for _, samples in pieces])
+        if self._cache is not None and self._results:
+            self._cache.store(self._key, self._range[0], self._range[1],
+                              times, values)
+        self.connection.receive(times, values)
 
 
 class Connection(PyDMConnection):
 
     def __init__(self, channel, address, protocol=None, parent=None):
         super(Connection, self).__init__(channel, address, protocol, parent)
+        self.timestamps = None
         self.add_listener(channel)
         base_url = os.getenv("PYDM_ARCHIVER_URL", "http://lcls-archapp.slac.stanford.edu")
-        url_string = "{base}/retrieval/data/getData.json?{params}".format(base=base_url, params=address)
-        r = requests.get(url_string)  # blocking.  BAD!
-        if r.status_code == 200 and r.headers['content-type'] == 'application/json':
-            self.connected = True
-            self.connection_state_signal.emit(True)
-            data_dict = r.json()
-            # x_data not used so commented out... maybe return it with y_data?
-            # x_data = np.array([point["secs"] for point in data_dict[0]["data"]])
-            y_data = np.array([point["val"] for point in data_dict[0]["data"]])
-            self.new_waveform_signal.emit(y_data)
+        self.fetch = Fetch(self, base_url, address)
+        self.fetch.start()
+
+    def receive(self, timestamps, values):
+        """
+        Publish the samples retrieved, called from a worker thread.
+
+        Parameters
+        ----------
+        timestamps : np.ndarray
+        values : np.ndarray
+        """
+        self.timestamps = timestamps
+        self.connected = True
+        self.connection_state_signal.emit(True)
+        if len(timestamps):
+            self.publish('timestamp', float(timestamps[-1]))
+        self.publish('value', values)
+
+    def fetch_failed(self):
+        """
+        Called from a worker thread if the request could not be completed.
+        """
+        self.connected = False
+        self.connection_state_signal.emit(False)
+
+    def add_listener(self, channel):
+        super(Connection, self).add_listener(channel)
+        if self.connected:
+            self.replay(channel)
+
+    def close(self):
+        self.fetch.cancelled = True
 
 
 class ArchiverPlugin(PyDMPlugin):
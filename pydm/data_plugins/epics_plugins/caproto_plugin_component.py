@@ -1,29 +1,89 @@
-import caproto.threading.pyepics_compat as epics
-from caproto import SubscriptionType
+"""
+Channel Access plugin built directly on the caproto threading client.
+
+Values are monitored with the TIME form of the channel type, which carries
+the value, the alarm severity and the timestamp only. The control metadata
+(units, precision, limits and enum strings) is read once with the CTRL form
+whenever a DBE_PROPERTY event is received, which is also the case right
+after the channel connects. Numeric values are published as the NumPy
+arrays decoded by caproto, without copying them.
+"""
 import logging
+import threading
 import numpy as np
-from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection
+import caproto
+from caproto import ChannelType, SubscriptionType, AccessRights
+from caproto.threading.client import Context
+from pydm.data_plugins.plugin import (PyDMPlugin, PyDMConnection,
+                                     ChangeDetector, parse_address_options)
 from qtpy.QtCore import Slot, Qt
-from qtpy.QtWidgets import QApplication
 from pydm.data_plugins import is_read_only
 
 logger = logging.getLogger(__name__)
 
-int_types = set((epics.ChannelType.INT, epics.ChannelType.CTRL_INT, epics.ChannelType.TIME_INT,
-                 epics.ChannelType.ENUM, epics.ChannelType.CTRL_ENUM, epics.ChannelType.TIME_ENUM,
-                 epics.ChannelType.TIME_LONG, epics.ChannelType.LONG, epics.ChannelType.CTRL_LONG,
-                 epics.ChannelType.CHAR, epics.ChannelType.TIME_CHAR, epics.ChannelType.CTRL_CHAR))
+int_types = set((ChannelType.INT, ChannelType.ENUM, ChannelType.LONG,
+                 ChannelType.CHAR))
+
+float_types = set((ChannelType.FLOAT, ChannelType.DOUBLE))
+
+VALUE_MASK = SubscriptionType.DBE_VALUE | SubscriptionType.DBE_ALARM
+
+_context = None
+_context_lock = threading.Lock()
+# PVs of the context vs. number of connections using them, as the
+# connections to the same PV with different address options share it.
+_pv_users = {}
+
+
+def context():
+    """
+    Get the caproto client context shared by every connection.
+
+    Returns
+    -------
+    caproto.threading.client.Context
+    """
+    global _context
+    with _context_lock:
+        if _context is None:
+            _context = Context()
+        return _context
+
 
-float_types = set((epics.ChannelType.CTRL_FLOAT, epics.ChannelType.FLOAT, epics.ChannelType.TIME_FLOAT,
-                   epics.ChannelType.CTRL_DOUBLE, epics.ChannelType.DOUBLE, epics.ChannelType.TIME_DOUBLE))
+def _use_pv(pv):
+    with _context_lock:
+        _pv_users[pv] = _pv_users.get(pv, 0) + 1
+
+
+def _release_pv(pv):
+    """
+    Stop using a PV, and tell whether no other connection uses it.
+    """
+    with _context_lock:
+        users = _pv_users.pop(pv, 1) - 1
+        if users > 0:
+            _pv_users[pv] = users
+        return users == 0
+
+
+def _response(args):
+    # Depending on the caproto version the callbacks are called with the
+    # subscription and the response, or with the response only.
+    return args[-1]
+
+
+def _decode(text):
+    if isinstance(text, bytes):
+        return text.decode(caproto.STRING_ENCODING)
+    return text
 
 
 class Connection(PyDMConnection):
+    put_callback = True
 
-    def __init__(self, channel, pv, protocol=None, parent=None):
+    def __init__(self, channel, pv, protocol=None, parent=None, caproto_pv=None):
         super(Connection, self).__init__(channel, pv, protocol, parent)
-        self.app = QApplication.instance()
-        self._value = None
+        self._value_changes = ChangeDetector()
         self._severity = None
         self._precision = None
         self._enum_strs = None
@@ -31,12 +91,28 @@ class Connection(PyDMConnection):
         self._upper_ctrl_limit = None
         self._lower_ctrl_limit = None
 
-        self.pv = epics.get_pv(pv, connection_callback=self.send_connection_state, form='ctrl', auto_monitor=SubscriptionType.DBE_VALUE|SubscriptionType.DBE_ALARM|SubscriptionType.DBE_PROPERTY, access_callback=self.send_access_state)
-        self.pv.add_callback(self.send_new_value, with_ctrlvars=True)
+        if caproto_pv is None:
+            caproto_pv, = context().get_pvs(pv)
+        self.pv = caproto_pv
+        _use_pv(self.pv)
+        self._connection_cb = self.pv.connection_state_callback.add_callback(
+            self.send_connection_state)
+        self._access_cb = self.pv.access_rights_callback.add_callback(
+            self.send_access_state)
+        self.value_sub = self.pv.subscribe(data_type='time', mask=VALUE_MASK)
+        self.value_sub.add_callback(self.send_new_value)
+        self.property_sub = self.pv.subscribe(
+            data_type='native', data_count=1,
+            mask=SubscriptionType.DBE_PROPERTY)
+        self.property_sub.add_callback(self.read_ctrl_vars)
         self.add_listener(channel)
+        if self.pv.connected:
+            self.send_connection_state(self.pv, 'connected')
+        else:
+            self.connection_state_signal.emit(False)
 
     def clear_cache(self):
-        self._value = None
+        self._value_changes.reset()
         self._severity = None
         self._precision = None
         self._enum_strs = None
@@ -44,120 +120,154 @@ class Connection(PyDMConnection):
         self._upper_ctrl_limit = None
         self._lower_ctrl_limit = None
 
-    def send_new_value(self, value=None, char_value=None, count=None, typefull=None, type=None, *args, **kws):
-        self.update_ctrl_vars(**kws)
-
-        if value is not None and not np.array_equal(value, self._value):
-            self._value = value
-            if isinstance(value, np.ndarray):
-                self.new_value_signal[np.ndarray].emit(value)
-            else:
-                if typefull in int_types:
-                    try:
-                        self.new_value_signal[int].emit(int(value))
-                    except ValueError:  # This happens when a string is empty
-                        # HACK since looks like for PyEpics a 1 element array
-                        # is in fact a scalar. =( I will try to address this
-                        # with Matt Newville
-                        self.new_value_signal[str].emit(char_value)
-                elif typefull in float_types:
-                    self.new_value_signal[float].emit(float(value))
-                else:
-                    self.new_value_signal[str].emit(char_value)
-
-    def update_ctrl_vars(self, units=None, enum_strs=None, severity=None, upper_ctrl_limit=None, lower_ctrl_limit=None, precision=None, *args, **kws):
+    def convert_value(self, data):
+        """
+        Convert the data of a response to the type published to the widgets.
+
+        Parameters
+        ----------
+        data : np.ndarray or list of bytes
+
+        Returns
+        -------
+        int, float, str or np.ndarray
+        """
+        native_type = self.pv.channel.native_data_type
+        if native_type == ChannelType.STRING:
+            if len(data) == 1:
+                return _decode(data[0])
+            return np.array([_decode(item) for item in data])
+        if len(data) != 1:
+            # A view of the buffer received by caproto
+            return data
+        if native_type in int_types:
+            return int(data[0])
+        if native_type in float_types:
+            return float(data[0])
+        return data
+
+    def send_new_value(self, *args):
+        response = _response(args)
+        metadata = response.metadata
+        severity = getattr(metadata, 'severity', None)
         if severity is not None and self._severity != severity:
             self._severity = severity
-            self.new_severity_signal.emit(int(severity))
+            self.publish('severity', int(severity))
+        timestamp = getattr(metadata, 'timestamp', None)
+        data = response.data
+        if data is None or not len(data):
+            return
+        if self._value_changes.changed(data, timestamp):
+            if timestamp:
+                self.publish('timestamp', float(timestamp))
+            self.publish('value', self.convert_value(data))
+
+    def read_ctrl_vars(self, *args):
+        """
+        Read the control metadata of the channel, without waiting for it.
+        Called whenever a DBE_PROPERTY event is received.
+        """
+        try:
+            self.pv.read(data_type='control', wait=False,
+                         callback=self.update_ctrl_vars)
+        except Exception:
+            logger.exception("Unable to read the metadata of %s",
+                             self.pv.name)
+
+    def update_ctrl_vars(self, *args):
+        metadata = _response(args).metadata
+        precision = getattr(metadata, 'precision', None)
         if precision is not None and self._precision != precision:
             self._precision = precision
-            self.prec_signal.emit(precision)
-        if enum_strs is not None and self._enum_strs != enum_strs:
-            self._enum_strs = enum_strs
-            try:
-                enum_strs = tuple(b.decode(encoding='ascii') for b in enum_strs)
-            except AttributeError:
-                pass
-            self.enum_strings_signal.emit(enum_strs)
-        if units is not None and len(units) > 0 and self._unit != units:
-            if type(units) == bytes:
-                units = units.decode()
-            self._unit = units
-            self.unit_signal.emit(units)
+            self.publish('prec', int(precision))
+        enum_strs = getattr(metadata, 'enum_strings', None)
+        if enum_strs is not None:
+            enum_strs = tuple(_decode(b) for b in enum_strs)
+            if self._enum_strs != enum_strs:
+                self._enum_strs = enum_strs
+                self.publish('enum_strings', enum_strs)
+        units = getattr(metadata, 'units', None)
+        if units is not None:
+            units = _decode(units)
+            if len(units) > 0 and self._unit != units:
+                self._unit = units
+                self.publish('unit', units)
+        upper_ctrl_limit = getattr(metadata, 'upper_ctrl_limit', None)
         if upper_ctrl_limit is not None and self._upper_ctrl_limit != upper_ctrl_limit:
             self._upper_ctrl_limit = upper_ctrl_limit
-            self.upper_ctrl_limit_signal.emit(upper_ctrl_limit)
+            self.publish('upper_ctrl_limit', upper_ctrl_limit)
+        lower_ctrl_limit = getattr(metadata, 'lower_ctrl_limit', None)
         if lower_ctrl_limit is not None and self._lower_ctrl_limit != lower_ctrl_limit:
             self._lower_ctrl_limit = lower_ctrl_limit
-            self.lower_ctrl_limit_signal.emit(lower_ctrl_limit)
+            self.publish('lower_ctrl_limit', lower_ctrl_limit)
 
-    def send_access_state(self, read_access, write_access, *args, **kws):
+    def send_access_state(self, pv, access_rights, *args, **kws):
         if is_read_only():
+            self.write_access = False
             self.write_access_signal.emit(False)
             return
 
-        if write_access is not None:
-            self.write_access_signal.emit(write_access)
+        if access_rights is not None:
+            self.write_access = AccessRights.WRITE in access_rights
+            self.write_access_signal.emit(self.write_access)
 
-    def reload_access_state(self):
-        read_access = self.pv.read_access
-        write_access = self.pv.write_access
-        self.send_access_state(read_access, write_access)
-
-    def send_connection_state(self, conn=None, *args, **kws):
+    def send_connection_state(self, pv, state, *args, **kws):
+        conn = state == 'connected'
         self.connected = conn
         self.connection_state_signal.emit(conn)
         if conn:
             self.clear_cache()
-            if hasattr(self, 'pv'):
-                self.reload_access_state()
-                self.pv.run_callbacks()
+            self.send_access_state(self.pv, self.pv.channel.access_rights)
 
     @Slot(int)
     @Slot(float)
     @Slot(str)
     @Slot(np.ndarray)
-    def put_value(self, new_val):
+    def put_value(self, new_val, wait=False):
         if is_read_only():
             return
 
-        if self.pv.write_access:
+        if self.write_access:
             try:
-                self.pv.put(new_val)
+                self.pv.write(new_val, wait=wait)
+                self.put_count += 1
             except Exception as e:
                 logger.exception("Unable to put %s to %s.  Exception: %s",
-                                 new_val, self.pv.pvname, str(e))
+                                 new_val, self.pv.name, str(e))
 
     def add_listener(self, channel):
         super(Connection, self).add_listener(channel)
-        # If we are adding a listener to an already existing PV, we need to
-        # manually send the signals indicating that the PV is connected, what the latest value is, etc.
-        if self.pv.connected:
-            self.send_connection_state(conn=True)
-            self.pv.run_callbacks()
-        else:
-            self.send_connection_state(conn=False)
+        # If we are adding a listener to an already existing PV, only the new
+        # listener needs the signals indicating that the PV is connected,
+        # what the latest value is, etc.
+        if self.listener_count > 1:
+            self.replay(channel)
         # If the channel is used for writing to PVs, hook it up to the 'put' methods.
         if channel.value_signal is not None:
             try:
-                channel.value_signal[str].connect(self.put_value, Qt.QueuedConnection)
+                channel.value_signal[str].connect(self.queue_put, Qt.QueuedConnection)
             except KeyError:
                 pass
             try:
-                channel.value_signal[int].connect(self.put_value, Qt.QueuedConnection)
+                channel.value_signal[int].connect(self.queue_put, Qt.QueuedConnection)
             except KeyError:
                 pass
             try:
-                channel.value_signal[float].connect(self.put_value, Qt.QueuedConnection)
+                channel.value_signal[float].connect(self.queue_put, Qt.QueuedConnection)
             except KeyError:
                 pass
             try:
-                channel.value_signal[np.ndarray].connect(self.put_value, Qt.QueuedConnection)
+                channel.value_signal[np.ndarray].connect(self.queue_put, Qt.QueuedConnection)
             except KeyError:
                 pass
 
     def close(self):
-        self.pv.disconnect()
+        self.value_sub.clear()
+        self.property_sub.clear()
+        self.pv.connection_state_callback.remove_callback(self._connection_cb)
+        self.pv.access_rights_callback.remove_callback(self._access_cb)
+        if _release_pv(self.pv):
+            self.pv.go_idle()
 
 
 class CaprotoPlugin(PyDMPlugin):
@@ -166,3 +276,23 @@ class CaprotoPlugin(PyDMPlugin):
     # be properly set before it is used.
     protocol = None
     connection_class = Connection
+
+    def create_connections(self, pending):
+        # Request every channel from the context in a single call so that
+        # the searches go out in one burst, and hand each connection its PV.
+        sources = [parse_address_options(address) for address in pending]
+        pvs = context().get_pvs(*(source for source, _ in sources))
+        for (address, channels), (source, options), pv in zip(
+                pending.items(), sources, pvs):
+            try:
+                connection = self.connection_class(
+                    channels[0], source, self.protocol, caproto_pv=pv)
+            except Exception:
+                logger.exception("Unable to connect to %r", address)
+                for channel in channels:
+                    self.channels.discard(channel)
+                continue
+            connection.set_options(options)
+            for channel in channels[1:]:
+                connection.add_listener(channel)
+            self.connections[address] = connection
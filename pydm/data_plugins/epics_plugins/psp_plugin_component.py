@@ -7,7 +7,8 @@ import pyca
 from psp.Pv import Pv
 from qtpy.QtCore import Slot, Qt, QTimer
 from pydm import data_plugins
-from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection
+from pydm.data_plugins.plugin import (PyDMPlugin, PyDMConnection,
+                                     bandwidth_governor)
 
 # Map how we will interpret EPICS types in python.
 type_map = dict(
@@ -236,13 +237,13 @@ class Connection(PyDMConnection):
 
         if self.pv.severity is not None and self.pv.severity != self.sevr:
             self.sevr = self.pv.severity
-            self.new_severity_signal.emit(self.sevr)
+            self.publish('severity', self.sevr)
 
         try:
             prec = self.pv.data['precision']
             if self.prec != prec:
                 self.prec = prec
-                self.prec_signal.emit(int(self.prec))
+                self.publish('prec', int(self.prec))
         except KeyError:
             pass
 
@@ -250,7 +251,7 @@ class Connection(PyDMConnection):
             units = self.pv.data['units']
             if self.units != units:
                 self.units = units
-                self.unit_signal.emit(self.units.decode(encoding='ascii'))
+                self.publish('unit', self.units.decode(encoding='ascii'))
         except KeyError:
             pass
 
@@ -258,7 +259,7 @@ class Connection(PyDMConnection):
             ctrl_llim = self.pv.data['ctrl_llim']
             if self.ctrl_llim != ctrl_llim:
                 self.ctrl_llim = ctrl_llim
-                self.lower_ctrl_limit_signal.emit(self.ctrl_llim)
+                self.publish('lower_ctrl_limit', self.ctrl_llim)
         except KeyError:
             pass
         
@@ -266,14 +267,17 @@ class Connection(PyDMConnection):
             ctrl_hlim = self.pv.data['ctrl_hlim']
             if self.ctrl_hlim != ctrl_hlim:
                 self.ctrl_hlim = ctrl_hlim
-                self.upper_ctrl_limit_signal.emit(self.ctrl_hlim)
+                self.publish('upper_ctrl_limit', self.ctrl_hlim)
         except KeyError:
             pass
 
+        timestamp = self.timestamp()
+        if timestamp is not None:
+            self.publish('timestamp', timestamp)
         if self.count > 1:
-            self.new_value_signal[np.ndarray].emit(value)
+            self.publish('value', value)
         else:
-            self.new_value_signal[self.python_type].emit(self.python_type(value))
+            self.publish('value', self.python_type(value))
 
     def send_ctrl_vars(self):
         if self.enums is None:
@@ -282,11 +286,11 @@ class Connection(PyDMConnection):
             except KeyError:
                 self.pv.get_enum_strings(-1.0)
         else:
-            self.enum_strings_signal.emit(self.enums)
+            self.publish('enum_strings', self.enums)
 
         if self.pv.severity != self.sevr:
             self.sevr = self.pv.severity
-        self.new_severity_signal.emit(self.sevr)
+        self.publish('severity', self.sevr)
 
         if self.prec is None:
             try:
@@ -294,7 +298,7 @@ class Connection(PyDMConnection):
             except KeyError:
                 pass
         if self.prec:
-            self.prec_signal.emit(int(self.prec))
+            self.publish('prec', int(self.prec))
             
         if self.units is None:
             try:
@@ -302,7 +306,7 @@ class Connection(PyDMConnection):
             except KeyError:
                 pass
         if self.units:
-            self.unit_signal.emit(self.units.decode(encoding='ascii'))
+            self.publish('unit', self.units.decode(encoding='ascii'))
 
         if self.ctrl_llim is None:
             try:
@@ -310,7 +314,7 @@ class Connection(PyDMConnection):
             except KeyError:
                 pass
         if self.ctrl_llim:
-            self.lower_ctrl_limit_signal.emit(self.ctrl_llim)
+            self.publish('lower_ctrl_limit', self.ctrl_llim)
             
         if self.ctrl_hlim is None:
             try:
@@ -318,7 +322,7 @@ class Connection(PyDMConnection):
             except KeyError:
                 pass
         if self.ctrl_hlim:
-            self.upper_ctrl_limit_signal.emit(self.ctrl_hlim)
+            self.publish('upper_ctrl_limit', self.ctrl_hlim)
 
     def send_connection_state(self, conn=None):
         """
@@ -331,8 +335,8 @@ class Connection(PyDMConnection):
 
     def send_access_state(self, read_access, write_access):
         if data_plugins.is_read_only():
-            self.write_access_signal.emit(False)
-            return
+            write_access = False
+        self.write_access = write_access
         self.write_access_signal.emit(write_access)
 
     def update_enums(self):
@@ -343,7 +347,7 @@ class Connection(PyDMConnection):
         if self.epics_type == "DBF_ENUM":
             if self.enums is None:
                 self.enums = tuple(b.decode(encoding='ascii') for b in self.pv.data["enum_set"])
-            self.enum_strings_signal.emit(self.enums)
+            self.publish('enum_strings', self.enums)
 
     @Slot(int)
     @Slot(float)
@@ -359,8 +363,12 @@ class Connection(PyDMConnection):
         """
         if self.count == 1:
             value = self.python_type(value)
+        # The values are written from the put pool, whose threads need to
+        # join the Channel Access context.
+        pyca.attach_context()
         try:
             self.pv.put(value)
+            self.put_count += 1
         except pyca.caexc as e:
             print("pyca error: {}".format(e))
 
@@ -386,7 +394,9 @@ class Connection(PyDMConnection):
         if e is None:
             self.pv.wait_ready()
             count = self.pv.count or 1
-            if count > 1:
+            # With an array budget, the BandwidthGovernor shares the
+            # bandwidth between the connections instead.
+            if count > 1 and bandwidth_governor() is None:
                 max_data_rate = 1000000.  # bytes/s
                 bytes = self.pv.value.itemsize  # bytes
                 throttle = max_data_rate / (bytes * count)  # Hz
@@ -426,27 +436,29 @@ class Connection(PyDMConnection):
         super(Connection, self).add_listener(channel)
         # If we are adding a listener to an already existing PV, we need to
         # manually send the signals indicating that the PV is connected, what
-        # the latest value is, etc.
-        if self.pv.isconnected and self.pv.isinitialized:
+        # the latest value is, etc. Only the new listener needs them.
+        if self.listener_count > 1:
+            self.replay(channel)
+        elif self.pv.isconnected and self.pv.isinitialized:
             self.send_connection_state(conn=True)
             self.monitor_cb()
             self.update_enums()
             self.send_ctrl_vars()
         if channel.value_signal is not None:
             try:
-                channel.value_signal[str].connect(self.put_value, Qt.QueuedConnection)
+                channel.value_signal[str].connect(self.queue_put, Qt.QueuedConnection)
             except KeyError:
                 pass
             try:
-                channel.value_signal[int].connect(self.put_value, Qt.QueuedConnection)
+                channel.value_signal[int].connect(self.queue_put, Qt.QueuedConnection)
             except KeyError:
                 pass
             try:
-                channel.value_signal[float].connect(self.put_value, Qt.QueuedConnection)
+                channel.value_signal[float].connect(self.queue_put, Qt.QueuedConnection)
             except KeyError:
                 pass
             try:
-                channel.value_signal[np.ndarray].connect(self.put_value, Qt.QueuedConnection)
+                channel.value_signal[np.ndarray].connect(self.queue_put, Qt.QueuedConnection)
             except KeyError:
                 pass
 
@@ -470,3 +482,11 @@ class PSPPlugin(PyDMPlugin):
     # be properly set before it is used.
     protocol = None
     connection_class = Connection
+
+    def create_connections(self, pending):
+        """
+        Create the channels for every pending address and flush the search
+        requests to the network once, instead of once per channel.
+        """
+        super(PSPPlugin, self).create_connections(pending)
+        pyca.flush_io()
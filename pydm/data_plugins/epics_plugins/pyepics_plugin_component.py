@@ -1,8 +1,9 @@
 import epics
 import logging
+import threading
 import numpy as np
 from pydm.data_plugins import is_read_only
-from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection
+from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection, ChangeDetector
 from qtpy.QtCore import Slot, Qt
 from qtpy.QtWidgets import QApplication
 
@@ -19,26 +20,39 @@ float_types = set((epics.dbr.CTRL_FLOAT, epics.dbr.FLOAT, epics.dbr.TIME_FLOAT,
 
 
 class Connection(PyDMConnection):
+    """
+    Connection to a PV using pyepics.
+
+    The value is monitored with the TIME form, which only carries the value,
+    the alarm and the timestamp. The control metadata (units, precision,
+    limits and enum strings) comes from a separate CTRL subscription to
+    DBE_PROPERTY events, which is sent once when the channel connects and
+    then only when the metadata changes.
+    """
+    put_callback = True
 
     def __init__(self, channel, pv, protocol=None, parent=None):
         super(Connection, self).__init__(channel, pv, protocol, parent)
+        self._value_changes = ChangeDetector()
         self.app = QApplication.instance()
-        self.pv = epics.PV(pv, connection_callback=self.send_connection_state,
-                           form='ctrl', auto_monitor=epics.dbr.DBE_VALUE|epics.dbr.DBE_ALARM|epics.dbr.DBE_PROPERTY,
-                           access_callback=self.send_access_state)
-        self.pv.add_callback(self.send_new_value, with_ctrlvars=True)
-        self.add_listener(channel)
-
-        self._value = None
+        # Subscription to the DBE_PROPERTY events, created once connected.
+        # The references to its callbacks must be kept as long as it is used.
+        self._property_subscription = None
+        self._subscription_lock = threading.Lock()
         self._severity = None
         self._precision = None
         self._enum_strs = None
         self._unit = None
         self._upper_ctrl_limit = None
         self._lower_ctrl_limit = None
+        self.pv = epics.PV(pv, connection_callback=self.send_connection_state,
+                           form='time', auto_monitor=epics.dbr.DBE_VALUE|epics.dbr.DBE_ALARM,
+                           access_callback=self.send_access_state)
+        self.pv.add_callback(self.send_new_value)
+        self.add_listener(channel)
 
     def clear_cache(self):
-        self._value = None
+        self._value_changes.reset()
         self._severity = None
         self._precision = None
         self._enum_strs = None
@@ -46,59 +60,82 @@ class Connection(PyDMConnection):
         self._upper_ctrl_limit = None
         self._lower_ctrl_limit = None
 
-    def send_new_value(self, value=None, char_value=None, count=None, ftype=None, type=None, *args, **kws):
-        self.update_ctrl_vars(**kws)
+    def send_new_value(self, value=None, char_value=None, count=None, ftype=None, type=None, severity=None, *args, **kws):
+        if severity is not None and self._severity != severity:
+            self._severity = severity
+            self.publish('severity', int(severity))
 
-        if value is not None and not np.array_equal(value, self._value):
-            self._value = value
+        timestamp = kws.get('timestamp')
+        if value is not None and self._value_changes.changed(value, timestamp):
+            if timestamp:
+                self.publish('timestamp', float(timestamp))
             if isinstance(value, np.ndarray):
-                self.new_value_signal[np.ndarray].emit(value)
+                self.publish('value', value)
             else:
                 if ftype in int_types:
                     try:
-                        self.new_value_signal[int].emit(int(value))
+                        self.publish('value', int(value))
                     except ValueError:  # This happens when a string is empty
                         # HACK since looks like for PyEpics a 1 element array
                         # is in fact a scalar. =( I will try to address this
                         # with Matt Newville
-                        self.new_value_signal[str].emit(char_value)
+                        self.publish('value', char_value)
                 elif ftype in float_types:
-                    self.new_value_signal[float].emit(float(value))
+                    self.publish('value', float(value))
                 else:
-                    self.new_value_signal[str].emit(char_value)
+                    self.publish('value', char_value)
+
+    def subscribe_ctrl_vars(self):
+        """
+        Subscribe to the DBE_PROPERTY events with the CTRL form, to receive
+        the control metadata. Channel Access restores the subscription by
+        itself when the channel reconnects.
+        """
+        with self._subscription_lock:
+            if self._property_subscription is not None:
+                return
+            self._property_subscription = epics.ca.create_subscription(
+                self.pv.chid, use_ctrl=True, mask=epics.dbr.DBE_PROPERTY,
+                callback=self.send_ctrl_vars, count=1)
+
+    def send_ctrl_vars(self, value=None, severity=None, *args, **kws):
+        # The value and the alarm are only taken from the value monitor.
+        self.update_ctrl_vars(**kws)
 
     def update_ctrl_vars(self, units=None, enum_strs=None, severity=None, upper_ctrl_limit=None, lower_ctrl_limit=None, precision=None, *args, **kws):
         if severity is not None and self._severity != severity:
             self._severity = severity
-            self.new_severity_signal.emit(int(severity))
+            self.publish('severity', int(severity))
         if precision is not None and self._precision != precision:
             self._precision = precision
-            self.prec_signal.emit(precision)
+            self.publish('prec', precision)
         if enum_strs is not None and self._enum_strs != enum_strs:
             self._enum_strs = enum_strs
             try:
                 enum_strs = tuple(b.decode(encoding='ascii') for b in enum_strs)
             except AttributeError:
                 pass
-            self.enum_strings_signal.emit(enum_strs)
+            self.publish('enum_strings', enum_strs)
         if units is not None and len(units) > 0 and self._unit != units:
             if type(units) == bytes:
                 units = units.decode()
             self._unit = units
-            self.unit_signal.emit(units)
+            self.publish('unit', units)
         if upper_ctrl_limit is not None and self._upper_ctrl_limit != upper_ctrl_limit:
             self._upper_ctrl_limit = upper_ctrl_limit
-            self.upper_ctrl_limit_signal.emit(upper_ctrl_limit)
+            self.publish('upper_ctrl_limit', upper_ctrl_limit)
         if lower_ctrl_limit is not None and self._lower_ctrl_limit != lower_ctrl_limit:
             self._lower_ctrl_limit = lower_ctrl_limit
-            self.lower_ctrl_limit_signal.emit(lower_ctrl_limit)
+            self.publish('lower_ctrl_limit', lower_ctrl_limit)
 
     def send_access_state(self, read_access, write_access, *args, **kws):
         if is_read_only():
+            self.write_access = False
             self.write_access_signal.emit(False)
             return
 
         if write_access is not None:
+            self.write_access = write_access
             self.write_access_signal.emit(write_access)
 
     def reload_access_state(self):
@@ -112,6 +149,7 @@ class Connection(PyDMConnection):
         if conn:
             self.clear_cache()
             if hasattr(self, 'pv'):
+                self.subscribe_ctrl_vars()
                 self.reload_access_state()
                 self.pv.run_callbacks()
 
@@ -119,13 +157,14 @@ class Connection(PyDMConnection):
     @Slot(float)
     @Slot(str)
     @Slot(np.ndarray)
-    def put_value(self, new_val):
+    def put_value(self, new_val, wait=False):
         if is_read_only():
             return
 
         if self.pv.write_access:
             try:
-                self.pv.put(new_val)
+                self.pv.put(new_val, wait=wait)
+                self.put_count += 1
             except Exception as e:
                 logger.exception("Unable to put %s to %s.  Exception: %s",
                                  new_val, self.pv.pvname, str(e))
@@ -133,32 +172,36 @@ class Connection(PyDMConnection):
     def add_listener(self, channel):
         super(Connection, self).add_listener(channel)
         # If we are adding a listener to an already existing PV, we need to
-        # manually send the signals indicating that the PV is connected, what the latest value is, etc.
-        if epics.ca.isConnected(self.pv.chid):
+        # manually send the signals indicating that the PV is connected, what
+        # the latest value is, etc. Only the new listener needs them.
+        if epics.ca.isConnected(self.pv.chid) and self.listener_count == 1:
             self.send_connection_state(conn=True)
-            self.pv.run_callbacks()
         else:
-            self.send_connection_state(conn=False)
+            self.replay(channel)
         # If the channel is used for writing to PVs, hook it up to the 'put' methods.
         if channel.value_signal is not None:
             try:
-                channel.value_signal[str].connect(self.put_value, Qt.QueuedConnection)
+                channel.value_signal[str].connect(self.queue_put, Qt.QueuedConnection)
             except KeyError:
                 pass
             try:
-                channel.value_signal[int].connect(self.put_value, Qt.QueuedConnection)
+                channel.value_signal[int].connect(self.queue_put, Qt.QueuedConnection)
             except KeyError:
                 pass
             try:
-                channel.value_signal[float].connect(self.put_value, Qt.QueuedConnection)
+                channel.value_signal[float].connect(self.queue_put, Qt.QueuedConnection)
             except KeyError:
                 pass
             try:
-                channel.value_signal[np.ndarray].connect(self.put_value, Qt.QueuedConnection)
+                channel.value_signal[np.ndarray].connect(self.queue_put, Qt.QueuedConnection)
             except KeyError:
                 pass
 
     def close(self):
+        with self._subscription_lock:
+            if self._property_subscription is not None:
+                epics.ca.clear_subscription(self._property_subscription[2])
+                self._property_subscription = None
         self.pv.disconnect()
 
 
@@ -168,3 +211,8 @@ class PyEPICSPlugin(PyDMPlugin):
     # be properly set before it is used.
     protocol = None
     connection_class = Connection
+
+    def create_connections(self, pending):
+        super(PyEPICSPlugin, self).create_connections(pending)
+        # Send the requests queued while creating the channels at once.
+        epics.ca.flush_io()
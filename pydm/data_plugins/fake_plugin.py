@@ -17,7 +17,7 @@ class Connection(PyDMConnection):
 
     def send_new_value(self):
         val_to_send = "{0}-{1}".format(self.value, random.randint(0, 9))
-        self.new_value_signal[str].emit(str(val_to_send))
+        self.publish('value', str(val_to_send))
 
     def send_connection_state(self, conn):
         self.connection_state_signal.emit(conn)
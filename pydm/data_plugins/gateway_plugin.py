@@ -0,0 +1,291 @@
+"""
+Plugin receiving the channels through the gateway shared by the PyDM
+processes of the host, see :mod:`pydm.gateway`.
+
+Addresses have the form ``gw://<protocol>://<address>``, e.g.
+``gw://ca://MTEST:Float``. The channels of the protocols listed in
+``PYDM_GATEWAY_PROTOCOLS`` are also routed to this plugin, without changing
+their address.
+"""
+import os
+import sys
+import logging
+import subprocess
+
+import six
+import numpy as np
+from qtpy.QtCore import QObject, QTimer, Slot, Qt
+from qtpy.QtNetwork import QLocalSocket
+
+from .. import config
+from ..utilities.remove_protocol import protocol_and_address
+from ..gateway.protocol import (MessageReader, SharedArrayReader, encode,
+                                pack_value, unpack_value, socket_path)
+from . import is_read_only
+from .plugin import PyDMPlugin, PyDMConnection
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds between the attempts to connect to the gateway.
+RETRY_INTERVAL = 1000
+
+_client = None
+
+
+def client():
+    """
+    Get the link to the gateway shared by every gw:// connection.
+
+    Returns
+    -------
+    GatewayClient
+    """
+    global _client
+    if _client is None:
+        _client = GatewayClient()
+    return _client
+
+
+def start_gateway(path):
+    """
+    Start a gateway serving `path` in the background. It exits by itself
+    once it has no client left.
+
+    Parameters
+    ----------
+    path : str
+    """
+    logger.info("Starting the PyDM gateway on %s", path)
+    # Detached from the session, so that it outlives the terminal
+    if not six.PY2:
+        detach = {'start_new_session': True}
+    elif hasattr(os, 'setsid'):
+        detach = {'preexec_fn': os.setsid}
+    else:
+        detach = {}
+    with open(os.devnull, 'w') as devnull:
+        subprocess.Popen([sys.executable, '-m', 'pydm.gateway.broker',
+                          '--socket', path],
+                         stdin=devnull, stdout=devnull, stderr=devnull,
+                         close_fds=True, **detach)
+
+
+class GatewayClient(QObject):
+    """
+    Socket to the gateway, multiplexing the gw:// connections.
+
+    The client keeps trying to reach the gateway, starting it once if
+    ``PYDM_GATEWAY_AUTOSTART`` is set, and subscribes again to every channel
+    after reconnecting.
+
+    Parameters
+    ----------
+    path : str, optional
+        Path of the socket, see :func:`pydm.gateway.protocol.socket_path`.
+    autostart : bool, optional
+        Whether or not to start the gateway if it is not running,
+        ``PYDM_GATEWAY_AUTOSTART`` by default.
+    parent : QObject, optional
+    """
+
+    def __init__(self, path=None, autostart=None, parent=None):
+        super(GatewayClient, self).__init__(parent)
+        if path is None:
+            try:
+                path = socket_path()
+            except OSError:
+                logger.exception("Not connecting to the PyDM gateway")
+        self.path = path
+        if autostart is None:
+            autostart = config.GATEWAY_AUTOSTART
+        self.autostart = autostart
+        # Source address vs. the connections receiving its updates, which
+        # differ by their options, e.g. maxrate.
+        self.connections = {}
+        self.reader = MessageReader()
+        self.arrays = SharedArrayReader()
+        self.socket = QLocalSocket(self)
+        self.socket.connected.connect(self._connected)
+        self.socket.disconnected.connect(self._disconnected)
+        self.socket.readyRead.connect(self._read)
+        self._retry_timer = QTimer(self)
+        self._retry_timer.setInterval(RETRY_INTERVAL)
+        self._retry_timer.timeout.connect(self.connect_to_gateway)
+        self._retry_timer.start()
+        self.connect_to_gateway()
+
+    def is_connected(self):
+        return self.socket.state() == QLocalSocket.ConnectedState
+
+    def connect_to_gateway(self):
+        """
+        Try to connect to the gateway, if not connected already.
+        """
+        if (self.path is None or
+                self.socket.state() != QLocalSocket.UnconnectedState):
+            return
+        self.socket.connectToServer(self.path)
+        if (self.socket.state() == QLocalSocket.UnconnectedState and
+                self.autostart):
+            self.autostart = False
+            try:
+                start_gateway(self.path)
+            except Exception:
+                logger.exception("Unable to start the PyDM gateway")
+
+    def send(self, header, payload=b''):
+        if self.is_connected():
+            self.socket.write(encode(header, payload))
+
+    def subscribe(self, connection):
+        """
+        Receive the updates of a channel.
+
+        Parameters
+        ----------
+        connection : Connection
+        """
+        connections = self.connections.setdefault(connection.address, [])
+        if connection in connections:
+            return
+        connections.append(connection)
+        if len(connections) == 1:
+            self.send({'op': 'sub', 'address': connection.address})
+
+    def unsubscribe(self, connection):
+        """
+        Stop receiving the updates of a channel.
+
+        Parameters
+        ----------
+        connection : Connection
+        """
+        connections = self.connections.get(connection.address, [])
+        if connection not in connections:
+            return
+        connections.remove(connection)
+        if connections:
+            return
+        del self.connections[connection.address]
+        self.arrays.discard(connection.address)
+        self.send({'op': 'unsub', 'address': connection.address})
+
+    def put(self, address, value):
+        """
+        Write a value to a channel.
+
+        Parameters
+        ----------
+        address : str
+        value : int, float, str or np.ndarray
+        """
+        header, payload = pack_value(value)
+        header.update(op='put', address=address)
+        self.send(header, payload)
+
+    @Slot()
+    def _connected(self):
+        self._retry_timer.stop()
+        for address in self.connections:
+            self.send({'op': 'sub', 'address': address})
+
+    @Slot()
+    def _disconnected(self):
+        self.reader.reset()
+        self.arrays.close()
+        for connections in self.connections.values():
+            for connection in connections:
+                connection.receive('connection', False)
+        self._retry_timer.start()
+
+    @Slot()
+    def _read(self):
+        data = bytes(self.socket.readAll())
+        for header, payload in self.reader.feed(data):
+            connections = self.connections.get(header.get('address'))
+            if not connections or header.get('op') != 'update':
+                continue
+            try:
+                value = unpack_value(header, payload, self.arrays)
+            except Exception:
+                logger.exception("Invalid update for %s", header['address'])
+                continue
+            if value is None and header['kind'] == 'value':
+                # Replaced in shared memory, the newer value follows.
+                continue
+            for connection in list(connections):
+                connection.receive(header['kind'], value)
+
+
+class Connection(PyDMConnection):
+
+    def __init__(self, channel, address, protocol=None, parent=None):
+        super(Connection, self).__init__(channel, address, protocol, parent)
+        self.client = client()
+        self.add_listener(channel)
+        self.client.subscribe(self)
+
+    def receive(self, kind, value):
+        """
+        Handle an update sent by the gateway.
+
+        Parameters
+        ----------
+        kind : str
+            ``connection``, ``write_access`` or a kind of update of
+            :meth:`PyDMConnection.publish`.
+        value : object
+        """
+        if kind == 'connection':
+            self.connected = bool(value)
+            self.connection_state_signal.emit(self.connected)
+        elif kind == 'write_access':
+            self.write_access = bool(value) and not is_read_only()
+            self.write_access_signal.emit(self.write_access)
+        else:
+            self.publish(kind, value)
+
+    @Slot(int)
+    @Slot(float)
+    @Slot(str)
+    @Slot(np.ndarray)
+    def put_value(self, value):
+        if is_read_only():
+            return
+        self.client.put(self.address, value)
+        self.put_count += 1
+
+    def add_listener(self, channel):
+        super(Connection, self).add_listener(channel)
+        if self.listener_count > 1:
+            self.replay(channel)
+        # The socket is used from the GUI thread only, so the values are not
+        # queued to the put pool. The gateway queues them itself.
+        if channel.value_signal is not None:
+            for value_type in (str, int, float, np.ndarray):
+                try:
+                    channel.value_signal[value_type].connect(
+                        self.put_value, Qt.QueuedConnection)
+                except KeyError:
+                    pass
+
+    def close(self):
+        self.client.unsubscribe(self)
+
+
+class GatewayPlugin(PyDMPlugin):
+    protocol = 'gw'
+    connection_class = Connection
+
+    @staticmethod
+    def get_address(channel):
+        """
+        The address of the channel with its protocol, which is what the
+        gateway connects to.
+        """
+        protocol, address = protocol_and_address(channel.address)
+        if protocol == GatewayPlugin.protocol:
+            return address
+        if protocol is None:
+            protocol = config.DEFAULT_PROTOCOL
+        return "{}://{}".format(protocol, address)
@@ -1,13 +1,286 @@
 """
 Plugin to allow users to arbitrarily connect python object attributes to widget
 channels. This handles the polling tasks to update the gui.
+
+The attributes of every LocalPlugin connection are polled by a single
+:class:`PollScheduler`. Connections with the same refresh period are polled
+together, their getters are evaluated in a pool of worker threads and the
+results are delivered to the widgets in one batch.
 """
+import time
 import inspect
+import logging
+import threading
 import numpy as np
 from qtpy.QtWidgets import QWidget
-from qtpy.QtCore import Slot, Qt, QCoreApplication, QTimer
+from qtpy.QtCore import Slot, Signal, Qt, QObject, QTimer, QRunnable, QThreadPool
+from pydm import data_plugins
+from pydm import config
 from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection
 
+logger = logging.getLogger(__name__)
+
+_scheduler = None
+
+
+def scheduler():
+    """
+    Get the scheduler polling every LocalPlugin connection.
+
+    :rtype: :class:`PollScheduler`
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PollScheduler()
+    return _scheduler
+
+
+class PollBatch(object):
+    """
+    Getters evaluated together, whose results are delivered in one go.
+
+    :param connections: Connections polled.
+    :type connections:  iterable
+    """
+
+    def __init__(self, connections):
+        self.pending = set(connections)
+        self.results = []
+        # Set once the results were delivered without waiting for the
+        # pending getters, which are then delivered as they finish.
+        self.expired = False
+        self.lock = threading.Lock()
+
+
+class Poll(QRunnable):
+    """
+    Evaluate the getter of a connection in a worker thread.
+    """
+
+    def __init__(self, scheduler, batch, connection):
+        super(Poll, self).__init__()
+        self.scheduler = scheduler
+        self.batch = batch
+        self.connection = connection
+
+    def run(self):
+        try:
+            value = self.connection.get_value()
+            ok = True
+        except Exception:
+            value = None
+            ok = False
+        self.scheduler.collect(self.batch, self.connection, ok, value)
+
+
+class PollGroup(object):
+    """
+    Connections sharing a refresh period.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.connections = set()
+        self.due = time.time() + period
+        self.batch = None
+
+
+class PollScheduler(QObject):
+    """
+    Single timer polling the LocalPlugin connections.
+
+    Connections are grouped by refresh period. On every tick of a group the
+    getters of its connections are evaluated in a thread pool, so a slow
+    getter does not block the GUI, and their results are delivered in one
+    batch once all of them returned. A getter still running when its group
+    ticks again overran its period: it is reported, the results of the
+    others are delivered and it is not polled again until it returns. A
+    getter still running after ``config.LOCAL_TIMEOUT`` seconds marks its
+    connection as disconnected until it returns.
+    """
+    _batch_signal = Signal(object)
+
+    def __init__(self, parent=None):
+        super(PollScheduler, self).__init__(parent)
+        self._groups = {}
+        self._periods = {}
+        # Connections whose getter is running vs. when it was called
+        self._busy = {}
+        # Connections whose getter is running for too long
+        self._timed_out = set()
+        self.overrun_count = 0
+        self.timeout_count = 0
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(config.LOCAL_WORKERS, 1))
+        self._batch_signal.connect(self._deliver, Qt.QueuedConnection)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+
+    def add(self, connection, period):
+        """
+        Poll a connection every `period` seconds.
+
+        :param connection: The connection to poll.
+        :type connection:  Connection
+        :param period: Seconds between the polls.
+        :type period:  float
+        """
+        self.remove(connection)
+        group = self._groups.get(period)
+        if group is None:
+            group = self._groups[period] = PollGroup(period)
+        group.connections.add(connection)
+        self._periods[connection] = period
+        self._arm()
+
+    def remove(self, connection):
+        """
+        Stop polling a connection.
+
+        :param connection: The connection to stop polling.
+        :type connection:  Connection
+        """
+        period = self._periods.pop(connection, None)
+        if period is None:
+            return
+        group = self._groups[period]
+        group.connections.discard(connection)
+        if not group.connections:
+            del self._groups[period]
+            self._arm()
+
+    def __len__(self):
+        return len(self._periods)
+
+    def poll(self, connections):
+        """
+        Evaluate the getters of some connections now, outside of the
+        periodic polling.
+
+        :param connections: The connections to poll.
+        :type connections:  list
+        """
+        if self._submit(connections) is not None:
+            self._arm()
+
+    def _submit(self, connections):
+        connections = [connection for connection in connections
+                       if connection not in self._busy]
+        if not connections:
+            return None
+        batch = PollBatch(connections)
+        now = time.time()
+        for connection in connections:
+            self._busy[connection] = now
+        for connection in connections:
+            self.pool.start(Poll(self, batch, connection))
+        return batch
+
+    def collect(self, batch, connection, ok, value):
+        """
+        Store the result of a getter, called from the worker threads.
+        """
+        with batch.lock:
+            batch.results.append((connection, ok, value))
+            batch.pending.discard(connection)
+            ready = batch.expired or not batch.pending
+        if ready:
+            self._batch_signal.emit(batch)
+
+    @Slot(object)
+    def _deliver(self, batch):
+        with batch.lock:
+            results = batch.results
+            batch.results = []
+        for connection, ok, value in results:
+            self._busy.pop(connection, None)
+            self._timed_out.discard(connection)
+            if connection.closed:
+                continue
+            try:
+                connection.receive(ok, value)
+            except Exception:
+                logger.exception("Error while updating %s",
+                                 connection.address)
+
+    def _expire(self, group):
+        """
+        Deliver the results of the previous tick of a group without waiting
+        for its getters still running, and report them.
+        """
+        batch = group.batch
+        group.batch = None
+        if batch is not None:
+            with batch.lock:
+                batch.expired = True
+            self._deliver(batch)
+        late = [connection for connection in group.connections
+                if connection in self._busy]
+        if not late:
+            return
+        self.overrun_count += len(late)
+        for connection in late:
+            connection.overrun_count += 1
+        logger.warning("%d getters of the local plugin overran their %s s "
+                       "period: %s", len(late), group.period,
+                       ", ".join(sorted(c.address for c in late)))
+
+    def _deadlines(self):
+        """
+        Times at which the getters still running time out.
+        """
+        if config.LOCAL_TIMEOUT <= 0:
+            return []
+        return [(started + config.LOCAL_TIMEOUT, connection)
+                for connection, started in self._busy.items()
+                if connection not in self._timed_out]
+
+    def _time_out(self, now):
+        """
+        Mark the connections whose getter is running for too long as
+        disconnected.
+        """
+        late = [connection for deadline, connection in self._deadlines()
+                if deadline <= now]
+        if not late:
+            return
+        self._timed_out.update(late)
+        self.timeout_count += len(late)
+        logger.warning("%d getters of the local plugin did not return within "
+                       "%s s: %s", len(late), config.LOCAL_TIMEOUT,
+                       ", ".join(sorted(c.address for c in late)))
+        for connection in late:
+            if connection.closed:
+                continue
+            try:
+                connection.receive(False, None)
+            except Exception:
+                logger.exception("Error while updating %s",
+                                 connection.address)
+
+    def _arm(self):
+        due = [group.due for group in self._groups.values()]
+        due.extend(deadline for deadline, _ in self._deadlines())
+        if not due:
+            self._timer.stop()
+            return
+        self._timer.start(max(int((min(due) - time.time()) * 1000), 0))
+
+    @Slot()
+    def _tick(self):
+        now = time.time()
+        self._time_out(now)
+        for group in list(self._groups.values()):
+            if group.due > now:
+                continue
+            self._expire(group)
+            group.batch = self._submit(group.connections)
+            # Skip the polls which are late by more than a period
+            group.due = max(group.due + group.period, now)
+        self._arm()
+
 
 class LocalPlugin(PyDMPlugin):
     """
@@ -16,7 +289,8 @@ class LocalPlugin(PyDMPlugin):
     The user must:
     1. self-define protocol to talk to their object
     2. make sure all attributes and function calls exist and work
-    3. make sure their obj code is not slow or resource-intensive
+    3. make sure their obj code is not resource-intensive and can be called
+       from a worker thread, getters are not evaluated in the GUI thread
     4. call add_widgets or include widgets in the constructor that already
        have valid channel addresses with this new protocol
 
@@ -53,8 +327,7 @@ class LocalPlugin(PyDMPlugin):
         :type refresh:  float or int
         """
         super(LocalPlugin, self).__init__()
-        app = QCoreApplication.instance()
-        standard_protocol = app.plugins.keys()
+        standard_protocol = data_plugins.registered_protocols()
         if protocol in standard_protocol:
             err = "Protocol {} invalid, same as a standard protocol"
             raise Exception(err.format(protocol))
@@ -115,7 +388,7 @@ def connection_class_factory(obj, refresh=1.0):
         Class that manages object attribute access.
         """
 
-        def __init__(self, channel, address, parent=None):
+        def __init__(self, channel, address, protocol=None, parent=None):
             """
             Parse address, apply options, and add the first listener.
             Start polling the field/method if applicable.
@@ -127,12 +400,18 @@ def connection_class_factory(obj, refresh=1.0):
                             e.g. field?t=3, func(name)?t=4, are both valid.
                             Additional args must be primitives.
             :type address:  QString
+            :param protocol: Protocol of the plugin.
+            :type protocol:  str
             :param parent: PyQt widget that this widget is inside of.
             :type parent:  QWidget
             """
-            super(Connection, self).__init__(channel, address, parent)
+            super(Connection, self).__init__(channel, address, protocol,
+                                             parent)
             self.obj = obj
             self.refresh = refresh
+            self.closed = False
+            # Number of times the getter did not return within the period
+            self.overrun_count = 0
             # remove all whitespace from address and convert to str
             address = "".join(str(address).split())
             # separate attr/func calls from settings (opts)
@@ -186,14 +465,13 @@ def connection_class_factory(obj, refresh=1.0):
             except:
                 self.nargs = None
             if self.refresh > 0:
-                self.update_timer = QTimer()
-                self.update_timer.timeout.connect(self.update)
-                self.update_timer.start(1000.0 * self.refresh)
+                scheduler().add(self, self.refresh)
             self.add_listener(channel)
 
         def get_value(self):
             """
-            Return the current value of this connection.
+            Return the current value of this connection. This is called from
+            the worker threads of the :class:`PollScheduler`.
 
             :rtyp: Can be any type, user defined.
             """
@@ -208,16 +486,25 @@ def connection_class_factory(obj, refresh=1.0):
         @Slot()
         def update(self):
             """
-            Get a new value from the object and send it to all listeners.
+            Get a new value from the object in a worker thread and send it to
+            all listeners once it is available.
+            """
+            scheduler().poll([self])
+
+        def receive(self, ok, value):
+            """
+            Send the result of the getter to all listeners.
             If an exception was thrown, send a disconnected signal.
+
+            :param ok: False if the getter raised an exception.
+            :type ok:  bool
+            :param value: Value returned by the getter.
             """
-            try:
-                value = self.get_value()
-            except:
-                self.send_connection_state(False)
-                return
-            self.send_connection_state(True)
-            self.send_new_value(value)
+            if ok != self.connected:
+                self.connected = ok
+                self.send_connection_state(ok)
+            if ok:
+                self.send_new_value(value)
 
         def send_new_value(self, value=None):
             """
@@ -226,14 +513,7 @@ def connection_class_factory(obj, refresh=1.0):
             :param value: Value to emit to our listeners.
             :type value:  int, float, str, or np.ndarray.
             """
-            if isinstance(value, np.generic):
-                value = np.asscalar(value)
-            if isinstance(value, np.ndarray):
-                self.new_waveform_signal.emit(value)
-            elif isinstance(value, (int, float, str)):
-                self.new_value_signal[type(value)].emit(value)
-            else:
-                self.new_value_signal[str].emit(str(value))
+            self.publish('value', value)
 
         def send_connection_state(self, conn=None):
             """
@@ -246,13 +526,9 @@ def connection_class_factory(obj, refresh=1.0):
 
         def is_connected(self):
             """
-            Return True if we can get a value.
+            Return True if the last attempt to get a value succeeded.
             """
-            try:
-                self.get_value()
-                return True
-            except:
-                return False
+            return bool(self.connected)
 
         @Slot(int)
         @Slot(float)
@@ -292,6 +568,7 @@ def connection_class_factory(obj, refresh=1.0):
                     return
             else:
                 return
+            self.put_count += 1
             # If we set a value, update now.
             self.update()
 
@@ -315,9 +592,10 @@ def connection_class_factory(obj, refresh=1.0):
             :type channel:  :class:`PyDMChannel`
             """
             super(Connection, self).add_listener(channel)
-            if self.is_connected():
-                self.send_connection_state(conn=True)
+            if self.listener_count == 1:
                 self.update()
+            else:
+                self.replay(channel)
             try:
                 channel.value_signal[str].connect(self.put_value, Qt.QueuedConnection)
                 channel.value_signal[int].connect(self.put_value, Qt.QueuedConnection)
@@ -329,4 +607,8 @@ def connection_class_factory(obj, refresh=1.0):
             except:
                 pass
 
+        def close(self):
+            self.closed = True
+            scheduler().remove(self)
+
     return Connection
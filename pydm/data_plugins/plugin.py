@@ -1,17 +1,791 @@
+import re
+import time
+import logging
 import weakref
 import threading
+import six
+from collections import OrderedDict, namedtuple
 
-from numpy import ndarray
+import numpy as np
+from numpy import ndarray, generic
 
 from ..utilities.remove_protocol import protocol_and_address
-from qtpy.QtCore import Signal, QObject, Qt
-from qtpy.QtWidgets import QApplication
+from .. import config
+from qtpy.QtCore import (Signal, Slot, QObject, Qt, QTimer, QRunnable,
+                         QThreadPool)
+from qtpy.QtWidgets import QApplication, QWidget
+
+logger = logging.getLogger(__name__)
+
+# Signal used to deliver each kind of update. The order here is also the order
+# in which coalesced updates are delivered, so that metadata reaches the
+# widgets before the value that depends on it.
+UPDATE_SIGNALS = OrderedDict([
+    ('enum_strings', 'enum_strings_signal'),
+    ('unit', 'unit_signal'),
+    ('prec', 'prec_signal'),
+    ('upper_ctrl_limit', 'upper_ctrl_limit_signal'),
+    ('lower_ctrl_limit', 'lower_ctrl_limit_signal'),
+    ('severity', 'new_severity_signal'),
+    ('timestamp', 'timestamp_signal'),
+    ('value', 'new_value_signal'),
+])
+
+
+class UpdateDispatcher(QObject):
+    """
+    Coalesce the updates published by PyDMConnections and deliver them to
+    the listeners once per GUI frame.
+
+    Only the newest value, severity and metadata of each connection is kept
+    in between frames (latest-wins), so a channel updating faster than the
+    frame rate costs a single delivery per frame instead of one queued event
+    per update.
+
+    Parameters
+    ----------
+    frame_rate : float
+        Number of times per second that the pending updates are delivered.
+    parent : QObject, optional
+    """
+
+    def __init__(self, frame_rate=30.0, parent=None):
+        super(UpdateDispatcher, self).__init__(parent)
+        self._lock = threading.Lock()
+        self._dirty = OrderedDict()
+        self.received_count = 0
+        self.delivered_count = 0
+        self.coalesced_count = 0
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self.frame_rate = frame_rate
+
+    @property
+    def frame_rate(self):
+        """
+        The number of deliveries per second.
+
+        Returns
+        -------
+        float
+        """
+        return self._frame_rate
+
+    @frame_rate.setter
+    def frame_rate(self, rate):
+        self._frame_rate = max(float(rate), 0.0)
+        if self._frame_rate > 0:
+            self._timer.start(max(int(1000.0 / self._frame_rate), 1))
+        else:
+            # Inactive, connections deliver their updates right away.
+            self._timer.stop()
+            self.flush()
+
+    @property
+    def active(self):
+        """
+        Whether or not updates are being coalesced.
+
+        Returns
+        -------
+        bool
+        """
+        return self._frame_rate > 0
+
+    @property
+    def backlog(self):
+        """
+        The number of connections with updates waiting for the next frame.
+
+        Returns
+        -------
+        int
+        """
+        with self._lock:
+            return len(self._dirty)
+
+    def queue(self, connection, kind, payload):
+        """
+        Store an update to be delivered on the next frame. If the connection
+        already has a pending update of the same kind it is replaced.
+
+        This method is safe to call from any thread.
+
+        Parameters
+        ----------
+        connection : PyDMConnection
+        kind : str
+            One of the keys in ``UPDATE_SIGNALS``.
+        payload : object
+        """
+        with self._lock:
+            self.received_count += 1
+            pending = self._dirty.get(connection)
+            if pending is None:
+                pending = self._dirty[connection] = {}
+            elif kind in pending:
+                self.coalesced_count += 1
+            pending[kind] = payload
+
+    def discard(self, connection):
+        """
+        Drop any pending update for the given connection.
+
+        Parameters
+        ----------
+        connection : PyDMConnection
+        """
+        with self._lock:
+            self._dirty.pop(connection, None)
+
+    def flush(self):
+        """
+        Deliver every pending update to the listeners.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            dirty = self._dirty
+            self._dirty = OrderedDict()
+        delivered = 0
+        for connection, pending in dirty.items():
+            for kind in UPDATE_SIGNALS:
+                if kind in pending:
+                    connection.deliver(kind, pending[kind])
+                    delivered += 1
+        with self._lock:
+            self.delivered_count += delivered
+
+    def statistics(self):
+        """
+        Counters describing the work done by the dispatcher.
+
+        Returns
+        -------
+        dict
+            With the keys ``received``, ``delivered`` and ``coalesced``.
+        """
+        with self._lock:
+            return dict(received=self.received_count,
+                        delivered=self.delivered_count,
+                        coalesced=self.coalesced_count)
+
+
+_dispatcher = None
+
+
+def update_dispatcher():
+    """
+    Return the application wide UpdateDispatcher, creating it on first use.
+
+    The dispatcher is only used if a frame rate was configured via the
+    ``PYDM_FRAME_RATE`` environment variable or :func:`set_frame_rate`.
+
+    Returns
+    -------
+    UpdateDispatcher or None
+        None if update coalescing is disabled.
+    """
+    global _dispatcher
+    if config.FRAME_RATE <= 0:
+        return None
+    if _dispatcher is None:
+        _dispatcher = UpdateDispatcher(frame_rate=config.FRAME_RATE)
+    return _dispatcher
+
+
+def set_frame_rate(rate):
+    """
+    Configure the rate at which coalesced updates are delivered.
+    Disabling the coalescing delivers the pending updates and makes the
+    existing connections bypass the dispatcher from then on.
+
+    Parameters
+    ----------
+    rate : float
+        Deliveries per second. Use 0 to disable update coalescing.
+    """
+    config.FRAME_RATE = max(float(rate), 0.0)
+    if _dispatcher is not None:
+        _dispatcher.frame_rate = config.FRAME_RATE
+
+
+# Weight of the connections whose listeners are all hidden, relative to the
+# visible ones, when the array budget is shared.
+HIDDEN_WEIGHT = 0.1
+
+
+class BandwidthGovernor(QObject):
+    """
+    Share an application wide budget between the connections delivering
+    arrays.
+
+    The budget is given in bytes per second and in frames, i.e. arrays, per
+    second. Every second the budget is split between the array connections
+    in proportion to their weight, which is their ``priority`` address
+    option, divided by 10 when none of their listeners is visible.
+    Connections updating slower than their share keep their rate and the
+    rest of the budget goes to the others. The rate allocated to a
+    connection is enforced like the ``maxrate`` address option, see
+    :attr:`PyDMConnection.governed_rate`.
+
+    Parameters
+    ----------
+    bandwidth : float
+        Bytes per second. Zero for no limit.
+    frame_rate : float
+        Arrays per second. Zero for no limit.
+    interval : float, optional
+        Seconds between the allocations.
+    parent : QObject, optional
+    """
+
+    def __init__(self, bandwidth=0.0, frame_rate=0.0, interval=1.0,
+                 parent=None):
+        super(BandwidthGovernor, self).__init__(parent)
+        self.bandwidth = bandwidth
+        self.frame_rate = frame_rate
+        self._lock = threading.Lock()
+        self._connections = weakref.WeakSet()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.allocate)
+        self._timer.start(int(interval * 1000))
+
+    @property
+    def active(self):
+        """
+        Whether or not a budget is set.
+
+        Returns
+        -------
+        bool
+        """
+        return self.bandwidth > 0 or self.frame_rate > 0
+
+    def add(self, connection):
+        """
+        Include a connection in the allocations. This method is safe to call
+        from any thread.
+
+        Parameters
+        ----------
+        connection : PyDMConnection
+        """
+        with self._lock:
+            self._connections.add(connection)
+
+    def discard(self, connection):
+        """
+        Stop governing a connection.
+
+        Parameters
+        ----------
+        connection : PyDMConnection
+        """
+        with self._lock:
+            self._connections.discard(connection)
+        connection._governed = False
+        connection.governed_rate = None
+
+    def connections(self):
+        """
+        The connections sharing the budget.
+
+        Returns
+        -------
+        list of PyDMConnection
+        """
+        with self._lock:
+            return list(self._connections)
+
+    @staticmethod
+    def weight(connection):
+        """
+        Weight of a connection in the allocations.
+
+        Parameters
+        ----------
+        connection : PyDMConnection
+
+        Returns
+        -------
+        float
+        """
+        weight = connection.priority if connection.priority else 1.0
+        if not connection.visible():
+            weight *= HIDDEN_WEIGHT
+        return max(weight, 1e-6)
+
+    def allocate(self):
+        """
+        Share the budget between the connections and apply their rates.
+
+        Returns
+        -------
+        dict
+            The rate allocated to each connection, None if its rate is not
+            limited.
+        """
+        frames = self.frame_rate if self.frame_rate > 0 else float('inf')
+        bandwidth = self.bandwidth if self.bandwidth > 0 else float('inf')
+        pending = [(connection, self.weight(connection))
+                   for connection in self.connections()]
+        allocation = {}
+        while pending:
+            total = sum(weight for _, weight in pending)
+            caps = []
+            for connection, weight in pending:
+                share = weight / total
+                cap = min(frames * share,
+                          bandwidth * share / max(connection.array_size, 1))
+                caps.append(cap)
+            satisfied = [i for i, (connection, _) in enumerate(pending)
+                         if connection.update_rate <= caps[i]]
+            if not satisfied:
+                for (connection, _), cap in zip(pending, caps):
+                    allocation[connection] = cap
+                break
+            # Connections within their share keep their rate, the budget
+            # they do not use is shared by the others.
+            for i in satisfied:
+                connection = pending[i][0]
+                allocation[connection] = None
+                frames -= connection.update_rate
+                bandwidth -= connection.update_rate * connection.array_size
+            pending = [item for i, item in enumerate(pending)
+                       if i not in satisfied]
+        for connection, rate in allocation.items():
+            connection.governed_rate = rate
+        return allocation
+
+
+_governor = None
+
+
+def bandwidth_governor():
+    """
+    Return the application wide BandwidthGovernor, creating it on first use.
+
+    The governor is only used if a budget was configured via the
+    ``PYDM_ARRAY_BANDWIDTH`` or ``PYDM_ARRAY_FRAME_RATE`` environment
+    variables or :func:`set_array_budget`.
+
+    Returns
+    -------
+    BandwidthGovernor or None
+        None if the array budget is disabled.
+    """
+    global _governor
+    if config.ARRAY_BANDWIDTH <= 0 and config.ARRAY_FRAME_RATE <= 0:
+        return None
+    if _governor is None:
+        _governor = BandwidthGovernor(bandwidth=config.ARRAY_BANDWIDTH,
+                                      frame_rate=config.ARRAY_FRAME_RATE)
+    return _governor
+
+
+def set_array_budget(bandwidth=0.0, frame_rate=0.0):
+    """
+    Configure the budget shared by the connections delivering arrays.
+    The connections created afterwards use the new budget, and the ones
+    already governed are allocated from it on the next allocation.
+
+    Parameters
+    ----------
+    bandwidth : float
+        Bytes per second. Zero for no limit.
+    frame_rate : float
+        Arrays per second. Zero for no limit.
+    """
+    config.ARRAY_BANDWIDTH = max(float(bandwidth), 0.0)
+    config.ARRAY_FRAME_RATE = max(float(frame_rate), 0.0)
+    if _governor is not None:
+        _governor.bandwidth = config.ARRAY_BANDWIDTH
+        _governor.frame_rate = config.ARRAY_FRAME_RATE
+        if config.ARRAY_BANDWIDTH <= 0 and config.ARRAY_FRAME_RATE <= 0:
+            for connection in _governor.connections():
+                _governor.discard(connection)
+
+
+_put_pool = None
+_put_timer = None
+_put_pool_lock = threading.Lock()
+
+
+def put_pool():
+    """
+    Get the pool of threads writing the values queued by the connections.
+
+    Returns
+    -------
+    QThreadPool
+    """
+    global _put_pool
+    with _put_pool_lock:
+        if _put_pool is None:
+            _put_pool = QThreadPool()
+            _put_pool.setMaxThreadCount(max(config.PUT_WORKERS, 1))
+        return _put_pool
+
+
+def put_timer():
+    """
+    Get the timer resuming the PutQueues waiting for their window.
+
+    Returns
+    -------
+    PutTimer
+    """
+    global _put_timer
+    with _put_pool_lock:
+        if _put_timer is None:
+            _put_timer = PutTimer()
+            app = QApplication.instance()
+            if app is not None:
+                _put_timer.moveToThread(app.thread())
+        return _put_timer
+
+
+class PutTimer(QObject):
+    """
+    Submit the PutQueues to the put pool again once their window is over,
+    from the thread of the application, so that no thread of the pool is
+    held while they wait.
+    """
+    _schedule_signal = Signal(object, int)
+
+    def __init__(self, parent=None):
+        super(PutTimer, self).__init__(parent)
+        self._schedule_signal.connect(self._schedule, Qt.QueuedConnection)
+
+    def schedule(self, queue, delay):
+        """
+        Resume a queue later. This method is safe to call from any thread.
+
+        Parameters
+        ----------
+        queue : PutQueue
+        delay : float
+            Seconds to wait.
+        """
+        self._schedule_signal.emit(queue, int(delay * 1000) + 1)
+
+    @Slot(object, int)
+    def _schedule(self, queue, msec):
+        QTimer.singleShot(msec, lambda: put_pool().start(PutTask(queue)))
+
+
+class PutTask(QRunnable):
+    """
+    Write the values pending in a PutQueue from a thread of the put pool.
+    """
+
+    def __init__(self, queue):
+        super(PutTask, self).__init__()
+        self.queue = queue
+
+    def run(self):
+        self.queue.drain()
+
+
+class PutQueue(object):
+    """
+    Write the values sent by the widgets to a connection without blocking
+    the GUI thread.
+
+    Values are written in order from the put pool, one at a time. A value
+    queued while another one is waiting replaces it (latest-wins), so a
+    burst of values, e.g. from dragging a slider, ends up as a few writes
+    of the newest one. After each write the queue waits until `window`
+    seconds have passed since its start before writing the next value,
+    which bounds the rate of the writes. The queue does not hold a thread
+    of the pool while it waits, it is submitted again by the
+    :class:`PutTimer`.
+
+    Parameters
+    ----------
+    connection : PyDMConnection
+        The values are written with its :meth:`PyDMConnection.put_value`.
+    window : float, optional
+        Minimum number of seconds between the start of two writes.
+    wait : bool, optional
+        Wait for the data source to complete each write before the next
+        one, if the connection supports it, see
+        :attr:`PyDMConnection.put_callback`.
+    """
+
+    def __init__(self, connection, window=0.0, wait=False):
+        self.connection = connection
+        self.window = window
+        self.wait = wait
+        self._lock = threading.Lock()
+        self._pending = False
+        self._value = None
+        self._queued_time = None
+        self._running = False
+        self._closed = False
+        self._last_put_time = None
+
+    def put(self, value):
+        """
+        Queue a value to be written. This method is safe to call from any
+        thread.
+
+        Parameters
+        ----------
+        value : object
+        """
+        with self._lock:
+            if self._closed:
+                return
+            if self._pending:
+                self.connection.put_dropped += 1
+            else:
+                self._queued_time = _now()
+            self._pending = True
+            self._value = value
+            if self._running:
+                return
+            self._running = True
+        put_pool().start(PutTask(self))
+
+    def drain(self):
+        """
+        Write the pending values until none is left, or until the next one
+        has to wait for the window. Called from the put pool.
+        """
+        while True:
+            with self._lock:
+                if not self._pending or self._closed:
+                    self._running = False
+                    return
+                delay = 0.0
+                if self._last_put_time is not None:
+                    delay = self._last_put_time + self.window - _now()
+                if delay <= 0:
+                    value = self._value
+                    queued_time = self._queued_time
+                    self._pending = False
+                    self._value = None
+                    self._last_put_time = _now()
+                else:
+                    # Still running, values queued meanwhile replace the
+                    # pending one.
+                    put_timer().schedule(self, delay)
+                    return
+            try:
+                if self.wait and self.connection.put_callback:
+                    self.connection.put_value(value, wait=True)
+                else:
+                    self.connection.put_value(value)
+            except Exception:
+                logger.exception("Unable to put %r to %s", value,
+                                 self.connection.address)
+            self.connection.put_latency = _now() - queued_time
+
+    def close(self):
+        """
+        Drop the pending value and stop writing.
+        """
+        with self._lock:
+            self._closed = True
+            self._pending = False
+            self._value = None
+
+
+def normalize_value(value):
+    """
+    Convert a value to one of the types carried by the value signals:
+    int, float, str or np.ndarray.
+
+    Parameters
+    ----------
+    value : object
+
+    Returns
+    -------
+    int, float, str or np.ndarray
+    """
+    if isinstance(value, ndarray):
+        return value
+    if isinstance(value, generic):
+        value = value.item()
+    if isinstance(value, (six.string_types, float)):
+        return value
+    if isinstance(value, six.integer_types):
+        # Also turns bool into int.
+        return int(value)
+    return six.text_type(value)
+
+
+class ChannelData(namedtuple('ChannelData', ['value', 'severity', 'timestamp'])):
+    """
+    Envelope delivered to the listeners' ``data_slot`` on every value update.
+
+    Attributes
+    ----------
+    value : int, float, str or np.ndarray
+        The new value.
+    severity : int or None
+        The latest alarm severity known for the channel.
+    timestamp : float or None
+        Time, in seconds since the epoch, given by the data source for the
+        value. For plugins which do not give one, the local time at which the
+        value was received.
+    """
+    __slots__ = ()
+
+
+CHANGE_DETECTION_STRATEGIES = ('compare', 'sampled', 'timestamp', 'always')
+# Number of elements checked by the "sampled" change detection.
+CHANGE_SAMPLE_SIZE = 1024
+
+
+class ChangeDetector(object):
+    """
+    Decide whether a value received from a data source differs from the
+    previous one.
+
+    Scalars and arrays with at most `size_threshold` elements are compared
+    in full. Larger arrays are handled according to `strategy`:
+
+    * ``compare``: every element is compared.
+    * ``sampled``: only evenly spaced elements, at most
+      ``CHANGE_SAMPLE_SIZE``, and the shape are compared.
+    * ``timestamp``: the value changed if the timestamp given by the data
+      source changed.
+    * ``always``: every update is a change.
+
+    Parameters
+    ----------
+    strategy : str, optional
+        Defaults to ``config.CHANGE_DETECTION``.
+    size_threshold : int, optional
+        Defaults to ``config.LARGE_ARRAY_SIZE``.
+    """
+    def __init__(self, strategy=None, size_threshold=None):
+        if strategy is None:
+            strategy = config.CHANGE_DETECTION
+        if strategy not in CHANGE_DETECTION_STRATEGIES:
+            logger.error("Unknown change detection %r, using 'compare'.",
+                         strategy)
+            strategy = 'compare'
+        if size_threshold is None:
+            size_threshold = config.LARGE_ARRAY_SIZE
+        self.strategy = strategy
+        self.size_threshold = size_threshold
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the previous value, the next one is always a change.
+        """
+        self._previous = None
+        self._timestamp = None
+
+    def changed(self, value, timestamp=None):
+        """
+        Check a new value against the previous one and remember it.
+
+        Parameters
+        ----------
+        value : object
+        timestamp : float, optional
+            Timestamp given by the data source for the value.
+
+        Returns
+        -------
+        bool
+        """
+        previous = self._previous
+        previous_timestamp = self._timestamp
+        self._timestamp = timestamp
+        if (not isinstance(value, ndarray) or
+                value.size <= self.size_threshold or
+                self.strategy == 'compare'):
+            self._previous = value
+            return previous is None or not np.array_equal(value, previous)
+        if self.strategy == 'always':
+            self._previous = value
+            return True
+        if self.strategy == 'timestamp':
+            self._previous = value
+            return (timestamp is None or previous is None or
+                    timestamp != previous_timestamp)
+        # Sampled: keep a small copy of the elements checked, the array
+        # itself may be reused by the data source.
+        stride = max(value.size // CHANGE_SAMPLE_SIZE, 1)
+        sample = (value.shape, value.dtype, value.ravel()[::stride].copy())
+        self._previous = sample
+        return (not isinstance(previous, tuple) or
+                previous[0] != sample[0] or previous[1] != sample[1] or
+                not np.array_equal(previous[2], sample[2]))
+
+
+# Options handled by PyDMConnection for every plugin, e.g. "ca://PV?maxrate=5",
+# and the type of their values.
+ADDRESS_OPTIONS = {
+    'maxrate': float,
+    'deadband': float,
+    'rdeadband': float,
+    'priority': float,
+    'putwindow': float,
+}
+
+
+def parse_address_options(address):
+    """
+    Separate the options handled by :class:`PyDMConnection` from an address.
+
+    Options follow a ``?`` at the end of the address and are separated by
+    commas or ampersands, e.g. ``PV?maxrate=5``. Options which are not listed
+    in ``ADDRESS_OPTIONS`` are left in the address for the plugin to use.
+
+    Parameters
+    ----------
+    address : str
+        The address, without the protocol.
+
+    Returns
+    -------
+    tuple
+        The address without the options and a dict with the options.
+    """
+    if '?' not in address:
+        return address, {}
+    base, query = address.split('?', 1)
+    options = {}
+    others = []
+    for item in re.split('[,&]', query):
+        key, sep, value = item.partition('=')
+        key = key.strip()
+        if not sep or key not in ADDRESS_OPTIONS:
+            others.append(item)
+            continue
+        try:
+            options[key] = ADDRESS_OPTIONS[key](value)
+        except ValueError:
+            logger.error("Invalid value %r for option %r of %r",
+                         value, key, address)
+    if others:
+        base = '?'.join((base, ','.join(others)))
+    return base, options
+
+
+# Period, in seconds, over which the update rate of a connection is measured.
+RATE_WINDOW = 1.0
+# Clock used for the traffic statistics.
+_now = time.time
 
 
 class PyDMConnection(QObject):
+    _replay_signal = Signal(object)
+    _throttle_signal = Signal(int)
+    new_data_signal = Signal(object)
     new_value_signal = Signal([float], [int], [str], [ndarray])
     connection_state_signal = Signal(bool)
     new_severity_signal = Signal(int)
+    timestamp_signal = Signal(float)
     write_access_signal = Signal(bool)
     enum_strings_signal = Signal(tuple)
     unit_signal = Signal(str)
@@ -19,6 +793,10 @@ class PyDMConnection(QObject):
     upper_ctrl_limit_signal = Signal([float], [int])
     lower_ctrl_limit_signal = Signal([float], [int])
 
+    # Whether or not `put_value` accepts wait=True, to return once the data
+    # source completed the write.
+    put_callback = False
+
     def __init__(self, channel, address, protocol=None, parent=None):
         super(PyDMConnection, self).__init__(parent)
         self.protocol = protocol
@@ -26,14 +804,423 @@ class PyDMConnection(QObject):
         self.connected = False
         self.value = None
         self.listener_count = 0
+        self.severity = None
+        self._value_timestamp = None
+        self.write_access = None
         self.app = QApplication.instance()
+        self.dispatcher = update_dispatcher()
+        self.governor = bandwidth_governor()
+        self._governed = False
+        self._listeners = weakref.WeakSet()
+        # Latest payload published for each kind of update, used to bring
+        # new listeners up to date.
+        self._last_updates = {}
+        self._pending_replays = set()
+        self._replay_signal.connect(self._replay, Qt.QueuedConnection)
+        # Rate limiting of the values, see `max_rate` and `governed_rate`
+        self.max_rate = None
+        self.priority = None
+        self.rate_limit = None
+        self._governed_rate = None
+        # Size, in bytes, of the last array received
+        self.array_size = 0
+        # Deadband filtering of the values, see `set_options`
+        self.deadband = None
+        self.rdeadband = None
+        self._deadband_reference = None
+        # Writes queued by the widgets, see `queue_put`
+        self.put_window = None
+        self.put_queue = None
+        self._throttle_lock = threading.Lock()
+        self._throttle_pending = False
+        self._throttled_value = None
+        self._throttled_timestamp = None
+        self._last_value_time = None
+        # Timestamp published for the next value, see `publish`
+        self._pending_timestamp = None
+        self._throttle_timer = QTimer(self)
+        self._throttle_timer.setSingleShot(True)
+        self._throttle_timer.timeout.connect(self._flush_throttled)
+        self._throttle_signal.connect(self._throttle_timer.start,
+                                      Qt.QueuedConnection)
+        # Traffic statistics
+        self.update_count = 0
+        self.put_count = 0
+        # Values replaced by a newer one before being written, and seconds
+        # between queuing the last value written and the end of its write.
+        self.put_dropped = 0
+        self.put_latency = None
+        self.bytes_received = 0
+        self.peak_update_rate = 0.0
+        self.last_update_time = None
+        # Seconds between the timestamp given by the data source for the
+        # last value and its delivery to the listeners.
+        self.latency = None
+        self._update_rate = 0.0
+        self._rate_window_start = _now()
+        self._rate_window_count = 0
+
+    @property
+    def update_rate(self):
+        """
+        The number of value updates per second received from the data source
+        over the last measurement window.
+
+        Returns
+        -------
+        float
+        """
+        elapsed = _now() - self._rate_window_start
+        if elapsed > RATE_WINDOW:
+            # No window closed recently, so the rate is decaying.
+            return self._rate_window_count / elapsed
+        return self._update_rate
+
+    @property
+    def time_since_last_update(self):
+        """
+        Seconds elapsed since the last value update.
+
+        Returns
+        -------
+        float or None
+            None if no value was received yet.
+        """
+        if self.last_update_time is None:
+            return None
+        return _now() - self.last_update_time
+
+    @property
+    def governed_rate(self):
+        """
+        The rate, in updates per second, allocated to this connection by the
+        :class:`BandwidthGovernor`. None if the rate is not limited.
+
+        Returns
+        -------
+        float or None
+        """
+        return self._governed_rate
+
+    @governed_rate.setter
+    def governed_rate(self, rate):
+        self._governed_rate = rate
+        self._update_rate_limit()
+
+    def _update_rate_limit(self):
+        limits = [rate for rate in (self.max_rate, self._governed_rate)
+                  if rate is not None]
+        self.rate_limit = min(limits) if limits else None
+
+    def visible(self):
+        """
+        Whether or not any of the widgets listening to this connection is
+        visible. Listeners which are not widgets count as visible.
+
+        Returns
+        -------
+        bool
+        """
+        for channel in list(self._listeners):
+            slot = channel.data_slot or channel.value_slot
+            widget = getattr(slot, '__self__', None)
+            if not isinstance(widget, QWidget) or widget.isVisible():
+                return True
+        return False
+
+    def record_update(self, value):
+        """
+        Account for a new value in the traffic statistics.
+
+        Parameters
+        ----------
+        value : object
+        """
+        now = _now()
+        self.update_count += 1
+        self.last_update_time = now
+        if isinstance(value, ndarray):
+            self.bytes_received += value.nbytes
+            self.array_size = value.nbytes
+            if not self._governed:
+                self.governor = bandwidth_governor()
+                if self.governor is not None:
+                    self._governed = True
+                    self.governor.add(self)
+        self._rate_window_count += 1
+        elapsed = now - self._rate_window_start
+        if elapsed >= RATE_WINDOW:
+            self._update_rate = self._rate_window_count / elapsed
+            if self._update_rate > self.peak_update_rate:
+                self.peak_update_rate = self._update_rate
+            self._rate_window_start = now
+            self._rate_window_count = 0
+
+    def publish(self, kind, payload):
+        """
+        Send an update to every listener of this connection.
+
+        If update coalescing is enabled the update is handed to the
+        :class:`UpdateDispatcher` and delivered on the next frame, otherwise
+        it is delivered right away.
+
+        Parameters
+        ----------
+        kind : str
+            One of the keys in ``UPDATE_SIGNALS``, e.g. 'value' or 'severity'.
+        payload : object
+        """
+        if kind == 'timestamp':
+            # Held until its value passes the deadband and the rate limit
+            self._pending_timestamp = payload
+            return
+        if kind != 'value':
+            self._last_updates[kind] = payload
+            self._dispatch(kind, payload)
+            return
+        timestamp = self._pending_timestamp
+        self._pending_timestamp = None
+        self.record_update(payload)
+        if self._in_deadband(payload):
+            return
+        self._last_updates['value'] = payload
+        if timestamp is not None:
+            self._last_updates['timestamp'] = timestamp
+        if self.rate_limit and self._throttle(payload, timestamp):
+            return
+        self._dispatch_value(payload, timestamp)
+
+    def _dispatch_value(self, payload, timestamp):
+        if timestamp is not None:
+            self._dispatch('timestamp', timestamp)
+        self._dispatch('value', payload)
+
+    def _dispatch(self, kind, payload):
+        dispatcher = self.dispatcher
+        if dispatcher is None or not dispatcher.active:
+            self.deliver(kind, payload)
+        else:
+            dispatcher.queue(self, kind, payload)
+
+    def set_options(self, options):
+        """
+        Apply the options given in the address of the connection.
+
+        Parameters
+        ----------
+        options : dict
+            Options returned by :func:`parse_address_options`.
+        """
+        max_rate = options.get('maxrate')
+        self.max_rate = max_rate if max_rate and max_rate > 0 else None
+        self.priority = options.get('priority')
+        self._update_rate_limit()
+        self.deadband = options.get('deadband')
+        self.rdeadband = options.get('rdeadband')
+        self.put_window = options.get('putwindow')
+
+    def _in_deadband(self, value):
+        """
+        Check whether a value is within the deadband of the last value let
+        through. The band is the largest of `deadband` and `rdeadband` times
+        the magnitude of that value, and is applied element-wise to arrays.
+        Values which are not numeric are never filtered.
+
+        Returns
+        -------
+        bool
+            True if the value should be dropped.
+        """
+        if self.deadband is None and self.rdeadband is None:
+            return False
+        reference = self._deadband_reference
+        inside = False
+        if (reference is not None and
+                not isinstance(value, six.string_types) and
+                np.shape(value) == np.shape(reference)):
+            try:
+                band = np.maximum(self.deadband or 0.0,
+                                  (self.rdeadband or 0.0) * np.abs(reference))
+                inside = bool(np.all(np.abs(np.subtract(value, reference))
+                                     <= band))
+            except TypeError:
+                # Not numeric
+                inside = False
+        if not inside:
+            if isinstance(value, ndarray):
+                # Plugins may reuse the buffer of the array they publish
+                value = value.copy()
+            self._deadband_reference = value
+        return inside
+
+    def _throttle(self, payload, timestamp=None):
+        """
+        Hold a value back if it arrives less than 1 / `rate_limit` seconds after
+        the previous one. Only the latest value held back is delivered, when
+        the interval is over.
+
+        Returns
+        -------
+        bool
+            True if the value was held back.
+        """
+        interval = 1.0 / self.rate_limit
+        with self._throttle_lock:
+            if self._throttle_pending:
+                self._throttled_value = payload
+                self._throttled_timestamp = timestamp
+                return True
+            now = _now()
+            if (self._last_value_time is None or
+                    now - self._last_value_time >= interval):
+                self._last_value_time = now
+                return False
+            self._throttled_value = payload
+            self._throttled_timestamp = timestamp
+            self._throttle_pending = True
+            remaining = interval - (now - self._last_value_time)
+        # The timer lives in the main thread, while publish may be called
+        # from the thread of the data source.
+        self._throttle_signal.emit(max(int(remaining * 1000), 1))
+        return True
+
+    def _flush_throttled(self):
+        with self._throttle_lock:
+            if not self._throttle_pending:
+                return
+            payload = self._throttled_value
+            timestamp = self._throttled_timestamp
+            self._throttle_pending = False
+            self._throttled_value = None
+            self._throttled_timestamp = None
+            self._last_value_time = _now()
+        self._dispatch_value(payload, timestamp)
+
+    def deliver(self, kind, payload):
+        """
+        Emit the signal associated with an update.
+
+        Parameters
+        ----------
+        kind : str
+            One of the keys in ``UPDATE_SIGNALS``.
+        payload : object
+        """
+        if kind == 'value':
+            payload = normalize_value(payload)
+            timestamp = self._value_timestamp
+            self._value_timestamp = None
+            if timestamp is None:
+                timestamp = self.last_update_time
+            else:
+                self.latency = _now() - timestamp
+            self.new_data_signal.emit(ChannelData(payload, self.severity,
+                                                  timestamp))
+            self.emit_value(payload)
+        else:
+            if kind == 'severity':
+                self.severity = payload
+            elif kind == 'timestamp':
+                self._value_timestamp = payload
+            getattr(self, UPDATE_SIGNALS[kind]).emit(payload)
+
+    def emit_value(self, value):
+        """
+        Emit a value using the overload of `new_value_signal` that matches
+        its type. Nothing is emitted if no slot is connected to the overload,
+        which is the case when every listener uses the `new_data_signal`.
+
+        Parameters
+        ----------
+        value : int, float, str or np.ndarray
+        """
+        value = normalize_value(value)
+        if isinstance(value, ndarray):
+            signal = self.new_value_signal[ndarray]
+        elif isinstance(value, six.string_types):
+            signal = self.new_value_signal[str]
+        elif isinstance(value, float):
+            signal = self.new_value_signal[float]
+        else:
+            signal = self.new_value_signal[int]
+        if self.receivers(signal) > 0:
+            signal.emit(value)
+
+    def replay(self, channel):
+        """
+        Send the current state of this connection to a single listener.
+
+        Plugins call this when a listener joins a connection which already
+        received its data, instead of re-sending the data to every listener.
+        Like the regular updates, the replay is delivered from the event loop.
+
+        Parameters
+        ----------
+        channel : PyDMChannel
+        """
+        self._pending_replays.add(channel)
+        self._replay_signal.emit(channel)
+
+    def _replay(self, channel):
+        if channel not in self._pending_replays:
+            # The listener was removed in the meantime
+            return
+        self._pending_replays.discard(channel)
+        if channel.connection_slot is not None:
+            channel.connection_slot(bool(self.connected))
+        if (channel.write_access_slot is not None and
+                self.write_access is not None):
+            channel.write_access_slot(self.write_access)
+        for kind in UPDATE_SIGNALS:
+            if kind not in self._last_updates:
+                continue
+            payload = self._last_updates[kind]
+            if kind == 'value':
+                payload = normalize_value(payload)
+                if channel.data_slot is not None:
+                    severity = self._last_updates.get('severity')
+                    timestamp = self._last_updates.get('timestamp',
+                                                       self.last_update_time)
+                    channel.data_slot(ChannelData(payload, severity,
+                                                  timestamp))
+                elif channel.value_slot is not None:
+                    channel.value_slot(payload)
+                continue
+            slot = getattr(channel, kind + '_slot')
+            if slot is not None:
+                slot(payload)
+
+    @Slot(int)
+    @Slot(float)
+    @Slot(str)
+    @Slot(ndarray)
+    def queue_put(self, value):
+        """
+        Queue a value sent by a widget, to be written by `put_value` from the
+        put pool. See :class:`PutQueue`.
+
+        Parameters
+        ----------
+        value : int, float, str or np.ndarray
+        """
+        if self.put_queue is None:
+            window = self.put_window
+            if window is None:
+                window = config.PUT_WINDOW
+            self.put_queue = PutQueue(self, window=max(window, 0.0),
+                                      wait=config.PUT_CALLBACK)
+        self.put_queue.put(value)
 
     def add_listener(self, channel):
         self.listener_count = self.listener_count + 1
+        self._listeners.add(channel)
         if channel.connection_slot is not None:
             self.connection_state_signal.connect(channel.connection_slot, Qt.QueuedConnection)
 
-        if channel.value_slot is not None:
+        if channel.data_slot is not None:
+            self.new_data_signal.connect(channel.data_slot, Qt.QueuedConnection)
+        elif channel.value_slot is not None:
+            # Compatibility path for listeners without a data_slot.
             try:
                 self.new_value_signal[int].connect(channel.value_slot, Qt.QueuedConnection)
             except TypeError:
@@ -54,6 +1241,9 @@ class PyDMConnection(QObject):
         if channel.severity_slot is not None:
             self.new_severity_signal.connect(channel.severity_slot, Qt.QueuedConnection)
 
+        if channel.timestamp_slot is not None:
+            self.timestamp_signal.connect(channel.timestamp_slot, Qt.QueuedConnection)
+
         if channel.write_access_slot is not None:
             self.write_access_signal.connect(channel.write_access_slot, Qt.QueuedConnection)
 
@@ -73,6 +1263,8 @@ class PyDMConnection(QObject):
             self.prec_signal.connect(channel.prec_slot, Qt.QueuedConnection)
 
     def remove_listener(self, channel, destroying=False):
+        self._pending_replays.discard(channel)
+        self._listeners.discard(channel)
         if not destroying:
             if channel.connection_slot is not None:
                 try:
@@ -80,7 +1272,12 @@ class PyDMConnection(QObject):
                 except TypeError:
                     pass
 
-            if channel.value_slot is not None:
+            if channel.data_slot is not None:
+                try:
+                    self.new_data_signal.disconnect(channel.data_slot)
+                except TypeError:
+                    pass
+            elif channel.value_slot is not None:
                 try:
                     self.new_value_signal[int].disconnect(channel.value_slot)
                 except TypeError:
@@ -104,6 +1301,12 @@ class PyDMConnection(QObject):
                 except (KeyError, TypeError):
                     pass
 
+            if channel.timestamp_slot is not None:
+                try:
+                    self.timestamp_signal.disconnect(channel.timestamp_slot)
+                except (KeyError, TypeError):
+                    pass
+
             if channel.write_access_slot is not None:
                 try:
                     self.write_access_signal.disconnect(channel.write_access_slot)
@@ -144,6 +1347,49 @@ class PyDMConnection(QObject):
         if self.listener_count < 1:
             self.close()
 
+    def remove_listeners(self, channels, destroying=False):
+        """
+        Remove several listeners at once.
+
+        Disconnecting a slot from a signal is linear in the number of slots
+        connected to it. When every listener of the connection is removed,
+        which is the case when a display is closed, each signal is
+        disconnected from all of its slots in a single call instead.
+
+        Parameters
+        ----------
+        channels : list of PyDMChannel
+        destroying : bool, optional
+            True if the listeners are being destroyed, in which case their
+            slots are already disconnected.
+        """
+        if len(channels) < self.listener_count:
+            for channel in channels:
+                self.remove_listener(channel, destroying=destroying)
+            return
+        self._pending_replays.clear()
+        self._listeners.clear()
+        if not destroying:
+            signals = [self.connection_state_signal, self.new_data_signal,
+                       self.new_severity_signal, self.timestamp_signal,
+                       self.write_access_signal,
+                       self.enum_strings_signal, self.unit_signal,
+                       self.prec_signal]
+            signals.extend(self.new_value_signal[t]
+                           for t in (int, float, str, ndarray))
+            for limit_signal in (self.upper_ctrl_limit_signal,
+                                 self.lower_ctrl_limit_signal):
+                signals.extend(limit_signal[t] for t in (float, int))
+            for signal in signals:
+                try:
+                    signal.disconnect()
+                except TypeError:
+                    # Nothing was connected to this signal
+                    pass
+        self.listener_count = self.listener_count - len(channels)
+        if self.listener_count < 1:
+            self.close()
+
     def close(self):
         pass
 
@@ -162,24 +1408,104 @@ class PyDMPlugin(object):
         return protocol_and_address(channel.address)[1]
 
     def add_connection(self, channel):
+        self.add_connections([channel])
+
+    def add_connections(self, channels):
+        """
+        Connect several channels to this plugin at once.
+
+        The plugin lock is taken a single time and every connection that
+        needs to be opened is handed to :meth:`create_connections` in one
+        batch, which lets plugins group the work done with the data source.
+
+        Parameters
+        ----------
+        channels : iterable of PyDMChannel
+        """
         with self.lock:
-            address = self.get_address(channel)
-            # If this channel is already connected to this plugin lets ignore
-            if channel in self.channels:
-                return
-            self.channels.add(channel)
-            if address in self.connections:
-                self.connections[address].add_listener(channel)
-            else:
-                self.connections[address] = self.connection_class(channel, address,
-                                                                  self.protocol)
+            pending = OrderedDict()
+            for channel in channels:
+                # If this channel is already connected to this plugin lets ignore
+                if channel in self.channels:
+                    continue
+                self.channels.add(channel)
+                address = self.get_address(channel)
+                if address in self.connections:
+                    self.connections[address].add_listener(channel)
+                else:
+                    pending.setdefault(address, []).append(channel)
+            if pending:
+                self.create_connections(pending)
+
+    def create_connections(self, pending):
+        """
+        Open the connections for addresses that are not connected yet.
+
+        Subclasses can reimplement this method to batch the requests sent
+        to the data source, e.g. to issue every search request before
+        waiting for any of them. This is called with the plugin lock held.
+
+        Parameters
+        ----------
+        pending : OrderedDict
+            Maps each new address, including its options, to the list of
+            channels listening to it. Use :func:`parse_address_options` to
+            get the address of the data source.
+        """
+        for address, channels in pending.items():
+            # The options are handled here, the connection gets the plain
+            # address of the data source.
+            source, options = parse_address_options(address)
+            try:
+                connection = self.connection_class(channels[0], source,
+                                                   self.protocol)
+            except Exception:
+                # Do not let one bad address prevent the others from
+                # connecting.
+                logger.exception("Unable to connect to %r", address)
+                for channel in channels:
+                    self.channels.discard(channel)
+                continue
+            connection.set_options(options)
+            for channel in channels[1:]:
+                connection.add_listener(channel)
+            self.connections[address] = connection
 
     def remove_connection(self, channel, destroying=False):
+        self.remove_connections([channel], destroying=destroying)
+
+    def remove_connections(self, channels, destroying=False):
+        """
+        Disconnect several channels from this plugin at once.
+
+        The listeners of each connection are removed together and the
+        connections left without listeners are closed.
+
+        Parameters
+        ----------
+        channels : iterable of PyDMChannel
+        destroying : bool, optional
+            True if the channels are being destroyed.
+        """
         with self.lock:
-            address = self.get_address(channel)
-            if address in self.connections and channel in self.channels:
-                self.connections[address].remove_listener(channel,
-                                                          destroying=destroying)
+            listeners = OrderedDict()
+            for channel in channels:
+                if channel not in self.channels:
+                    continue
+                address = self.get_address(channel)
+                if address not in self.connections:
+                    continue
                 self.channels.remove(channel)
-                if self.connections[address].listener_count < 1:
-                    del self.connections[address]
\ No newline at end of file
+                listeners.setdefault(address, []).append(channel)
+            for address, address_channels in listeners.items():
+                connection = self.connections[address]
+                connection.remove_listeners(address_channels,
+                                            destroying=destroying)
+                if connection.listener_count < 1:
+                    self.connections.pop(address)
+                    if connection.dispatcher is not None:
+                        connection.dispatcher.discard(connection)
+                    if connection.governor is not None:
+                        connection.governor.discard(connection)
+                    if connection.put_queue is not None:
+                        connection.put_queue.close()
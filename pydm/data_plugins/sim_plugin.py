@@ -0,0 +1,271 @@
+"""
+Plugin generating synthetic data, to exercise displays at realistic rates
+without a control system.
+
+Addresses have the form ``sim://<waveform>[:<name>]?<options>``, where
+waveform is one of ``sine``, ``noise``, ``ramp`` or ``step`` and the optional
+name makes otherwise identical channels independent, e.g.
+``sim://noise:3?rate=200,n=100000,dtype=float32``. The options are:
+
+=========  ==================================================================
+Option     Description
+=========  ==================================================================
+rate       Updates per second. Default: 1.
+n          Number of elements, 1 gives a scalar. Default: 1.
+shape      Shape of an image, e.g. ``2000x2000``, instead of ``n``.
+dtype      Numpy type of the values. Default: float64.
+amplitude  Amplitude of the waveform. Default: 1.
+period     Period, in seconds, of the sine, ramp and step waveforms.
+           Default: 10.
+alarm      Period, in seconds, at which the severity cycles through
+           NO_ALARM, MINOR and MAJOR. Default: 0, always NO_ALARM.
+flap       Period, in seconds, at which the channel disconnects and
+           reconnects. Default: 0, always connected.
+=========  ==================================================================
+
+All of the connections are driven by a single timer.
+"""
+import re
+import time
+import heapq
+import logging
+import itertools
+
+import numpy as np
+from qtpy.QtCore import QObject, QTimer, Qt, Slot
+
+from pydm.data_plugins.plugin import PyDMPlugin, PyDMConnection
+
+logger = logging.getLogger(__name__)
+
+WAVEFORMS = ('sine', 'noise', 'ramp', 'step')
+
+_scheduler = None
+
+
+def scheduler():
+    """
+    Get the timer shared by every sim:// connection.
+
+    Returns
+    -------
+    SimScheduler
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = SimScheduler()
+    return _scheduler
+
+
+class SimScheduler(QObject):
+    """
+    Single timer waking up the sim:// connections when they are due.
+
+    The connections are kept in a heap ordered by the time of their next
+    update, and the timer is always armed for the earliest one.
+    """
+    def __init__(self, parent=None):
+        super(SimScheduler, self).__init__(parent)
+        self._heap = []
+        self._periods = {}
+        # Tie breaker, so that connections are never compared in the heap
+        self._counter = itertools.count()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+
+    def add(self, connection, period):
+        """
+        Call ``connection.tick()`` every `period` seconds.
+
+        Parameters
+        ----------
+        connection : Connection
+        period : float
+        """
+        self._periods[connection] = period
+        heapq.heappush(self._heap, (time.time() + period,
+                                    next(self._counter), connection))
+        self._arm()
+
+    def remove(self, connection):
+        """
+        Stop updating a connection.
+
+        Parameters
+        ----------
+        connection : Connection
+        """
+        self._periods.pop(connection, None)
+
+    def __len__(self):
+        return len(self._periods)
+
+    def _arm(self):
+        # Drop the connections removed in the meantime
+        while self._heap and self._heap[0][2] not in self._periods:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            self._timer.stop()
+            return
+        delay = self._heap[0][0] - time.time()
+        self._timer.start(max(int(delay * 1000), 0))
+
+    @Slot()
+    def _tick(self):
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            due, _, connection = heapq.heappop(self._heap)
+            period = self._periods.get(connection)
+            if period is None:
+                continue
+            try:
+                connection.tick(now)
+            except Exception:
+                logger.exception("Error while updating %s", connection.address)
+            # Skip the updates which are late by more than a period
+            due = max(due + period, now)
+            heapq.heappush(self._heap, (due, next(self._counter), connection))
+        self._arm()
+
+
+def parse_sim_address(address):
+    """
+    Split a sim:// address into its waveform and options.
+
+    Parameters
+    ----------
+    address : str
+        The address, without the protocol.
+
+    Returns
+    -------
+    tuple
+        The waveform name and a dict with the options.
+    """
+    source, _, query = address.partition('?')
+    waveform = source.split(':')[0].strip().lower()
+    if waveform not in WAVEFORMS:
+        raise ValueError("Unknown waveform {!r}, expected one of {}".format(
+            waveform, ", ".join(WAVEFORMS)))
+    options = dict(rate=1.0, n=1, shape=None, dtype='float64', amplitude=1.0,
+                   period=10.0, alarm=0.0, flap=0.0)
+    for item in re.split('[,&]', query):
+        if not item.strip():
+            continue
+        key, _, value = item.partition('=')
+        key = key.strip()
+        value = value.strip()
+        if key not in options:
+            raise ValueError("Unknown option {!r}".format(key))
+        if key == 'shape':
+            options[key] = tuple(int(dim) for dim in value.lower().split('x'))
+        elif key == 'dtype':
+            options[key] = str(np.dtype(value))
+        elif key == 'n':
+            options[key] = int(value)
+        else:
+            options[key] = float(value)
+    if options['rate'] <= 0:
+        raise ValueError("The rate must be positive")
+    return waveform, options
+
+
+class Connection(PyDMConnection):
+
+    def __init__(self, channel, address, protocol=None, parent=None):
+        super(Connection, self).__init__(channel, address, protocol, parent)
+        self.waveform, self.options = parse_sim_address(address)
+        self.dtype = np.dtype(self.options['dtype'])
+        if self.options['shape'] is not None:
+            self.shape = self.options['shape']
+        else:
+            self.shape = (max(self.options['n'], 1),)
+        self.size = int(np.prod(self.shape))
+        self.start_time = time.time()
+        self._alarm_state = 0
+        self._noise = None
+        # Phase of each element of the sine, made on first use
+        self._phases = None
+        self.connected = True
+        self.write_access = False
+        self.add_listener(channel)
+        scheduler().add(self, 1.0 / self.options['rate'])
+
+    def generate(self, elapsed):
+        """
+        Compute the value of the waveform.
+
+        Parameters
+        ----------
+        elapsed : float
+            Seconds since the connection was opened.
+
+        Returns
+        -------
+        np.ndarray
+        """
+        amplitude = self.options['amplitude']
+        period = self.options['period']
+        if self.waveform == 'sine':
+            if self._phases is None:
+                self._phases = np.linspace(0, 2 * np.pi, self.size,
+                                           endpoint=False)
+            data = amplitude * np.sin(2 * np.pi * elapsed / period +
+                                      self._phases)
+        elif self.waveform == 'ramp':
+            data = np.full(self.size, amplitude * (elapsed % period) / period)
+        elif self.waveform == 'step':
+            level = amplitude if int(elapsed // period) % 2 else 0.0
+            data = np.full(self.size, level)
+        else:
+            if self._noise is None:
+                # Generating random numbers is slow, slice a pool instead.
+                self._noise = (amplitude * np.random.random(2 * self.size)
+                               ).astype(self.dtype)
+            offset = np.random.randint(self.size + 1)
+            return self._noise[offset:offset + self.size].reshape(self.shape)
+        return data.astype(self.dtype, copy=False).reshape(self.shape)
+
+    def tick(self, now):
+        """
+        Publish the next value, called by the :class:`SimScheduler`.
+
+        Parameters
+        ----------
+        now : float
+        """
+        elapsed = now - self.start_time
+        flap = self.options['flap']
+        if flap > 0:
+            connected = int(elapsed // flap) % 2 == 0
+            if connected != self.connected:
+                self.connected = connected
+                self.connection_state_signal.emit(connected)
+            if not connected:
+                return
+        alarm = self.options['alarm']
+        if alarm > 0:
+            severity = int(elapsed // alarm) % 3
+            if severity != self._alarm_state:
+                self._alarm_state = severity
+                self.publish('severity', severity)
+        value = self.generate(elapsed)
+        self.publish('timestamp', now)
+        if self.size == 1 and self.options['shape'] is None:
+            self.publish('value', value[0].item())
+        else:
+            self.publish('value', value)
+
+    def add_listener(self, channel):
+        super(Connection, self).add_listener(channel)
+        self.replay(channel)
+
+    def close(self):
+        scheduler().remove(self)
+
+
+class SimPlugin(PyDMPlugin):
+    protocol = "sim"
+    connection_class = Connection
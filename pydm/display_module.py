@@ -1,8 +1,7 @@
 import sys
 from os import path
-from qtpy import uic
 from qtpy.QtWidgets import QWidget
-from .utilities import macro
+from .utilities import ui_cache
 
 
 class Display(QWidget):
@@ -35,8 +34,5 @@ class Display(QWidget):
         if self.ui:
             return self.ui
         if self.ui_filepath() is not None and self.ui_filepath() != "":
-            if macros is not None:
-                f = macro.substitute_in_file(self.ui_filepath(), macros)
-            else:
-                f = self.ui_filepath()
-            self.ui = uic.loadUi(f, baseinstance=self)
+            self.ui = ui_cache.load_ui(self.ui_filepath(), macros,
+                                       baseinstance=self)
@@ -0,0 +1,13 @@
+"""
+Gateway shared by the PyDM processes of a host.
+
+The gateway is a daemon holding a single upstream connection per channel,
+through the regular data plugins, and fanning the updates out to the PyDM
+processes connected to its local socket. Large arrays are handed over in
+shared memory. The processes use it through the ``gw://`` data plugin,
+either explicitly, e.g. ``gw://ca://MTEST:Float``, or for every channel of
+the protocols listed in ``PYDM_GATEWAY_PROTOCOLS``.
+
+Run it with ``pydm-gateway`` or let the first PyDM process needing it start
+it, see ``PYDM_GATEWAY_AUTOSTART``.
+"""
@@ -0,0 +1,338 @@
+"""
+The gateway daemon.
+
+Usage::
+
+    pydm-gateway [--socket PATH] [--linger SECONDS]
+
+The gateway exits once it has had no client for ``--linger`` seconds.
+"""
+import sys
+import logging
+import argparse
+from functools import partial
+
+import numpy as np
+from qtpy.QtCore import QObject, QTimer, Signal, QCoreApplication
+from qtpy.QtNetwork import QLocalServer, QLocalSocket
+
+from .. import config
+from ..data_plugins.plugin import UPDATE_SIGNALS
+from .protocol import (MessageReader, SharedArray, encode, pack_value,
+                       unpack_value, shareable, socket_path)
+
+logger = logging.getLogger(__name__)
+
+# Order in which the state of a channel is sent to a new subscriber.
+STATE_KINDS = ('connection', 'write_access') + tuple(UPDATE_SIGNALS)
+# Bytes waiting to be sent to a client above which its value updates are
+# dropped until it catches up.
+MAX_BACKLOG = 64 * 1024 * 1024
+
+
+class Upstream(QObject):
+    """
+    The connection of the gateway to a channel, shared by its subscribers.
+
+    Parameters
+    ----------
+    address : str
+        The channel address, including its protocol.
+    parent : QObject, optional
+    """
+    value_signal = Signal([int], [float], [str], [np.ndarray])
+
+    def __init__(self, address, parent=None):
+        super(Upstream, self).__init__(parent)
+        # Imported here so that the gateway module does not need a display
+        from ..widgets.channel import PyDMChannel
+        self.address = address
+        self.subscribers = set()
+        self.state = {}
+        self.shared = None
+        slots = dict((kind + '_slot', partial(self.send, kind))
+                     for kind in STATE_KINDS)
+        self.channel = PyDMChannel(address=address,
+                                   value_signal=self.value_signal, **slots)
+        self.channel.connect()
+
+    def send(self, kind, value):
+        """
+        Forward an update of the channel to the subscribers.
+
+        Parameters
+        ----------
+        kind : str
+        value : object
+        """
+        self.state[kind] = value
+        shared = None
+        if kind == 'value' and shareable(value, config.GATEWAY_SHM_SIZE):
+            if self.shared is None:
+                self.shared = SharedArray()
+            shared = self.shared
+        message = self.message(kind, value, shared)
+        for link in self.subscribers:
+            link.write(message, droppable=kind == 'value')
+
+    def message(self, kind, value, shared=None):
+        header, payload = pack_value(value, shared)
+        header.update(op='update', address=self.address, kind=kind)
+        return encode(header, payload)
+
+    def replay(self, link):
+        """
+        Send the current state of the channel to a new subscriber.
+
+        Parameters
+        ----------
+        link : ClientLink
+        """
+        for kind in STATE_KINDS:
+            if kind in self.state:
+                # Sent over the socket, the shared array may be replaced
+                # before the subscriber reads it.
+                link.write(self.message(kind, self.state[kind]))
+
+    def put(self, value):
+        """
+        Write a value to the channel.
+
+        Parameters
+        ----------
+        value : int, float, str or np.ndarray
+        """
+        if isinstance(value, np.ndarray):
+            self.value_signal[np.ndarray].emit(value)
+        elif isinstance(value, bool):
+            self.value_signal[int].emit(int(value))
+        elif isinstance(value, (int, float, str)):
+            self.value_signal[type(value)].emit(value)
+        else:
+            logger.warning("Unable to put %r to %s", value, self.address)
+
+    def close(self):
+        self.channel.disconnect()
+        if self.shared is not None:
+            self.shared.close()
+
+
+class ClientLink(QObject):
+    """
+    Socket to a PyDM process.
+
+    Parameters
+    ----------
+    broker : Broker
+    socket : QLocalSocket
+    """
+
+    def __init__(self, broker, socket):
+        super(ClientLink, self).__init__(broker)
+        self.broker = broker
+        self.socket = socket
+        self.reader = MessageReader()
+        self.subscriptions = set()
+        self.dropped = 0
+        socket.readyRead.connect(self._read)
+        socket.disconnected.connect(self._disconnected)
+
+    def write(self, message, droppable=False):
+        """
+        Send a message to the process.
+
+        Parameters
+        ----------
+        message : bytes
+        droppable : bool, optional
+            Whether or not the message can be dropped if the process does
+            not keep up.
+        """
+        if droppable and self.socket.bytesToWrite() > MAX_BACKLOG:
+            self.dropped += 1
+            return
+        self.socket.write(message)
+
+    def _read(self):
+        data = bytes(self.socket.readAll())
+        for header, payload in self.reader.feed(data):
+            try:
+                self.broker.handle(self, header, payload)
+            except Exception:
+                logger.exception("Invalid message %r", header)
+
+    def _disconnected(self):
+        self.broker.drop(self)
+        self.socket.deleteLater()
+
+
+class Broker(QObject):
+    """
+    Serve the channels to the PyDM processes connected to a local socket,
+    with a single upstream connection per channel.
+
+    Parameters
+    ----------
+    path : str, optional
+        Path of the socket, see :func:`pydm.gateway.protocol.socket_path`.
+    linger : float, optional
+        Seconds without any client after which the application quits. Zero
+        or less to run until interrupted.
+    parent : QObject, optional
+    """
+
+    def __init__(self, path=None, linger=0.0, parent=None):
+        super(Broker, self).__init__(parent)
+        self.path = path
+        self.linger = linger
+        self.upstreams = {}
+        self.links = set()
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._accept)
+        self._idle_timer = QTimer(self)
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.timeout.connect(self._idle)
+
+    def listen(self):
+        """
+        Start serving, unless another gateway already serves the socket.
+        Only the user can connect to the socket.
+
+        Returns
+        -------
+        bool
+        """
+        if self.path is None:
+            try:
+                self.path = socket_path()
+            except OSError:
+                logger.exception("Unable to find the gateway socket")
+                return False
+        probe = QLocalSocket()
+        probe.connectToServer(self.path)
+        if probe.waitForConnected(500):
+            probe.disconnectFromServer()
+            logger.info("A gateway is already serving %s", self.path)
+            return False
+        # Left over by a gateway which did not exit cleanly
+        QLocalServer.removeServer(self.path)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        if not self.server.listen(self.path):
+            logger.error("Unable to listen on %s: %s", self.path,
+                         self.server.errorString())
+            return False
+        self._arm_idle_timer()
+        return True
+
+    def _accept(self):
+        while self.server.hasPendingConnections():
+            link = ClientLink(self, self.server.nextPendingConnection())
+            self.links.add(link)
+        self._idle_timer.stop()
+
+    def handle(self, link, header, payload):
+        """
+        Process a message from a client.
+
+        Parameters
+        ----------
+        link : ClientLink
+        header : dict
+        payload : bytearray
+        """
+        op = header['op']
+        address = header['address']
+        if op == 'sub':
+            if address in link.subscriptions:
+                return
+            upstream = self.upstreams.get(address)
+            if upstream is None:
+                upstream = Upstream(address, self)
+                self.upstreams[address] = upstream
+            upstream.subscribers.add(link)
+            link.subscriptions.add(address)
+            upstream.replay(link)
+        elif op == 'unsub':
+            self.unsubscribe(link, address)
+        elif op == 'put':
+            upstream = self.upstreams.get(address)
+            if upstream is not None:
+                upstream.put(unpack_value(header, payload))
+        else:
+            logger.warning("Unknown operation %r", op)
+
+    def unsubscribe(self, link, address):
+        """
+        Remove a subscriber from a channel, closing the channel once it has
+        no subscriber left.
+
+        Parameters
+        ----------
+        link : ClientLink
+        address : str
+        """
+        link.subscriptions.discard(address)
+        upstream = self.upstreams.get(address)
+        if upstream is None:
+            return
+        upstream.subscribers.discard(link)
+        if not upstream.subscribers:
+            del self.upstreams[address]
+            upstream.close()
+            upstream.deleteLater()
+
+    def drop(self, link):
+        """
+        Forget a client which disconnected.
+
+        Parameters
+        ----------
+        link : ClientLink
+        """
+        for address in list(link.subscriptions):
+            self.unsubscribe(link, address)
+        self.links.discard(link)
+        link.deleteLater()
+        self._arm_idle_timer()
+
+    def _arm_idle_timer(self):
+        if self.linger > 0 and not self.links:
+            self._idle_timer.start(int(self.linger * 1000))
+
+    def _idle(self):
+        if not self.links:
+            logger.info("No client left, exiting")
+            self.close()
+            QCoreApplication.quit()
+
+    def close(self):
+        for upstream in list(self.upstreams.values()):
+            upstream.close()
+        self.upstreams.clear()
+        self.server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--socket', default=None,
+                        help='Path of the socket to serve, in the private '
+                             'runtime directory of the user by default.')
+    parser.add_argument('--linger', type=float, default=10.0,
+                        help='Seconds without any client before exiting, '
+                             'zero to run until interrupted.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    # The gateway connects to the channels itself.
+    config.GATEWAY_PROTOCOLS = ()
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    broker = Broker(args.socket, linger=args.linger)
+    if not broker.listen():
+        return
+    try:
+        app.exec_()
+    finally:
+        broker.close()
+
+
+if __name__ == '__main__':
+    main()
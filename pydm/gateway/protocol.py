@@ -0,0 +1,331 @@
+"""
+Messages exchanged between the gateway and the PyDM processes.
+
+Every message is a JSON header, optionally followed by the raw data of an
+array::
+
+    uint32 header size | uint32 payload size | header | payload
+
+The header holds the operation, ``sub``, ``unsub`` or ``put`` from the
+clients and ``update`` from the gateway, the address of the channel and,
+for the updates, the kind of update as used by
+:meth:`pydm.data_plugins.plugin.PyDMConnection.publish`, plus
+``connection`` and ``write_access``. Arrays are either sent as payload or
+written in a shared memory segment whose name is given in the header.
+"""
+import os
+import json
+import struct
+import logging
+
+import numpy as np
+from pydm_launcher.runtime import runtime_dir
+
+from .. import config
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+logger = logging.getLogger(__name__)
+
+FRAME = struct.Struct('!II')
+# Sequence number at the start of the shared memory segments, odd while the
+# array is being written.
+SEQUENCE = struct.Struct('=Q')
+
+
+def socket_path():
+    """
+    The path of the gateway socket, ``PYDM_GATEWAY_SOCKET`` if set, or
+    ``gateway`` in the private runtime directory of the user.
+
+    Returns
+    -------
+    str
+
+    Raises
+    ------
+    OSError
+        If the runtime directory is not private to the user.
+    """
+    return config.GATEWAY_SOCKET or os.path.join(runtime_dir(), 'gateway')
+
+
+def encode(header, payload=b''):
+    """
+    Build a message.
+
+    Parameters
+    ----------
+    header : dict
+    payload : bytes, optional
+
+    Returns
+    -------
+    bytes
+    """
+    data = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return FRAME.pack(len(data), len(payload)) + data + payload
+
+
+class MessageReader(object):
+    """
+    Split the data received from a socket into messages.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        """
+        Add the data received and return the messages completed.
+
+        Parameters
+        ----------
+        data : bytes
+
+        Returns
+        -------
+        list of tuple
+            The header and the payload of each message.
+        """
+        self._buffer.extend(data)
+        messages = []
+        while len(self._buffer) >= FRAME.size:
+            header_size, payload_size = FRAME.unpack_from(self._buffer)
+            start = FRAME.size + header_size
+            end = start + payload_size
+            if len(self._buffer) < end:
+                break
+            header = json.loads(
+                bytes(self._buffer[FRAME.size:start]).decode('utf-8'))
+            # A bytearray, so that the arrays built on it are writable.
+            payload = self._buffer[start:end]
+            del self._buffer[:end]
+            messages.append((header, payload))
+        return messages
+
+    def reset(self):
+        """
+        Drop the partial message received, e.g. after a disconnection.
+        """
+        del self._buffer[:]
+
+
+def shareable(value, threshold):
+    """
+    Whether or not a value is handed over in shared memory.
+
+    Parameters
+    ----------
+    value : object
+    threshold : int
+        Minimum number of bytes. Zero disables the shared memory.
+
+    Returns
+    -------
+    bool
+    """
+    return (shared_memory is not None and threshold > 0 and
+            isinstance(value, np.ndarray) and not value.dtype.hasobject and
+            value.nbytes >= threshold)
+
+
+def pack_value(value, shared=None):
+    """
+    Describe a value in a message header.
+
+    Parameters
+    ----------
+    value : object
+        A value published by a connection.
+    shared : SharedArray, optional
+        Segment in which to write the value, which must be an array.
+
+    Returns
+    -------
+    tuple
+        The fields to add to the header and the payload.
+    """
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            return {'list': value.tolist()}, b''
+        array = {'dtype': value.dtype.str, 'shape': list(value.shape)}
+        if shared is not None:
+            array.update(shared.write(value))
+            return {'array': array}, b''
+        return {'array': array}, np.ascontiguousarray(value).tobytes()
+    if isinstance(value, tuple):
+        return {'tuple': list(value)}, b''
+    if isinstance(value, np.generic):
+        value = value.item()
+    return {'value': value}, b''
+
+
+def unpack_value(header, payload, arrays=None):
+    """
+    Rebuild a value described by :func:`pack_value`.
+
+    Parameters
+    ----------
+    header : dict
+    payload : bytearray
+    arrays : SharedArrayReader, optional
+        Needed for the arrays handed over in shared memory.
+
+    Returns
+    -------
+    object
+        None if the array in shared memory was already replaced by a newer
+        one, which is sent in a message of its own.
+    """
+    if 'array' in header:
+        array = header['array']
+        dtype = np.dtype(array['dtype'])
+        shape = tuple(array['shape'])
+        if 'shm' in array:
+            return arrays.read(header['address'], array['shm'], array['seq'],
+                               dtype, shape)
+        return np.frombuffer(payload, dtype=dtype).reshape(shape)
+    if 'list' in header:
+        return np.array(header['list'])
+    if 'tuple' in header:
+        return tuple(header['tuple'])
+    return header.get('value')
+
+
+class SharedArray(object):
+    """
+    Shared memory segment holding the latest array of a channel.
+
+    The segment starts with a sequence number, which is odd while the array
+    is written, so that the readers can tell a torn copy.
+    """
+
+    def __init__(self):
+        self.segment = None
+        self.sequence = 0
+
+    def write(self, array):
+        """
+        Copy an array into the segment, growing it if needed.
+
+        Parameters
+        ----------
+        array : np.ndarray
+
+        Returns
+        -------
+        dict
+            The name of the segment and the sequence number of the array.
+        """
+        size = SEQUENCE.size + array.nbytes
+        if self.segment is None or self.segment.size < size:
+            self.close()
+            self.segment = shared_memory.SharedMemory(create=True, size=size)
+        buf = self.segment.buf
+        self.sequence += 1
+        SEQUENCE.pack_into(buf, 0, self.sequence)
+        target = np.ndarray(array.shape, dtype=array.dtype, buffer=buf,
+                            offset=SEQUENCE.size)
+        target[...] = array
+        del target
+        self.sequence += 1
+        SEQUENCE.pack_into(buf, 0, self.sequence)
+        return {'shm': self.segment.name, 'seq': self.sequence}
+
+    def close(self):
+        """
+        Release the segment. The readers keep their mapping until they
+        switch to a new segment.
+        """
+        if self.segment is None:
+            return
+        self.segment.close()
+        try:
+            self.segment.unlink()
+        except OSError:
+            pass
+        self.segment = None
+
+
+def _untrack(segment):
+    # The segments belong to the gateway, do not let the resource tracker of
+    # a client unlink them when it exits.
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    except Exception:
+        pass
+
+
+class SharedArrayReader(object):
+    """
+    Copy the arrays written by the gateway in shared memory.
+    """
+
+    def __init__(self):
+        self._segments = {}
+
+    def read(self, address, name, sequence, dtype, shape):
+        """
+        Copy an array out of a segment.
+
+        Parameters
+        ----------
+        address : str
+            The channel, which uses a single segment at a time.
+        name : str
+            The name of the segment.
+        sequence : int
+            Sequence number of the array.
+        dtype : np.dtype
+        shape : tuple
+
+        Returns
+        -------
+        np.ndarray or None
+            None if the array was replaced in the meantime.
+        """
+        current = self._segments.get(address)
+        if current is None or current.name != name:
+            self.discard(address)
+            try:
+                current = shared_memory.SharedMemory(name=name)
+            except (OSError, ValueError):
+                logger.debug("Shared memory segment %s is gone", name)
+                return None
+            _untrack(current)
+            self._segments[address] = current
+        buf = current.buf
+        if SEQUENCE.unpack_from(buf, 0)[0] != sequence:
+            return None
+        count = int(np.prod(shape))
+        view = np.frombuffer(buf, dtype=dtype, count=count,
+                             offset=SEQUENCE.size)
+        array = view.reshape(shape).copy()
+        del view
+        if SEQUENCE.unpack_from(buf, 0)[0] != sequence:
+            return None
+        return array
+
+    def discard(self, address):
+        """
+        Unmap the segment of a channel.
+
+        Parameters
+        ----------
+        address : str
+        """
+        segment = self._segments.pop(address, None)
+        if segment is not None:
+            segment.close()
+
+    def close(self):
+        """
+        Unmap every segment.
+        """
+        for address in list(self._segments):
+            self.discard(address)
@@ -39,6 +39,10 @@ class PyDMMainWindow(QMainWindow):
         self.ui.actionHome.triggered.connect(self.home)
         self.ui.actionHome.setIcon(self.iconFont.icon("home"))
         self.home_file = None
+        # Directory and macro stacks of the displays loaded in this window,
+        # see PyDMApplication.loading_window.
+        self.directory_stack = ['']
+        self.macro_stack = [{}]
         self.back_stack = []
         self.forward_stack = []
         self.ui.actionBack.triggered.connect(self.back)
@@ -140,7 +144,9 @@ class PyDMMainWindow(QMainWindow):
         if command_line_args is None:
             command_line_args = []
         merged_macros = self.merge_with_current_macros(macros)
-        widget = self.app.open_file(filename, merged_macros, command_line_args)
+        with self.app.loading_window(self):
+            widget = self.app.open_file(filename, merged_macros,
+                                        command_line_args)
         if (len(self.back_stack) == 0) or (self.current_file() != filename):
             self.back_stack.append((filename, merged_macros, command_line_args))
         self.set_display_widget(widget)
@@ -0,0 +1,114 @@
+# Unit Tests for the cache of the archiver:// data plugin
+import os
+import time
+
+import pytest
+import numpy as np
+
+from ... import config
+from ...data_plugins import archiver_cache
+from ...data_plugins.archiver_cache import (ArchiverCache, request_key,
+                                            missing_intervals)
+
+
+@pytest.mark.parametrize("covered, expected", [
+    ([], [(0, 100)]),
+    ([(0, 100)], []),
+    ([(-10, 40)], [(40, 100)]),
+    ([(60, 200)], [(0, 60)]),
+    ([(20, 40), (30, 50), (70, 80)], [(0, 20), (50, 70), (80, 100)]),
+    ([(200, 300)], [(0, 100)]),
+])
+def test_missing_intervals(covered, expected):
+    assert missing_intervals(covered, 0, 100) == expected
+
+
+def test_request_key():
+    key = request_key([('pv', 'A'), ('from', 'x'), ('to', 'y')])
+    assert key == request_key([('to', 'z'), ('pv', 'A')])
+    assert key != request_key([('pv', 'B')])
+
+
+def test_cache_disabled(monkeypatch, tmpdir):
+    monkeypatch.setattr(config, 'ARCHIVER_CACHE_DIR', str(tmpdir))
+    monkeypatch.setattr(config, 'ARCHIVER_CACHE_SIZE', 0)
+    assert archiver_cache.cache() is None
+    monkeypatch.setattr(config, 'ARCHIVER_CACHE_SIZE', 1)
+    assert archiver_cache.cache().max_size == 1024 * 1024
+
+
+def test_store_and_lookup(tmpdir):
+    """
+    Test that cached segments are found by time range.
+
+    Expectations:
+    1. The pieces include the sample preceding the requested range
+    2. Only the uncovered part of the range is reported missing
+    3. A segment including others replaces them
+    """
+    cache = ArchiverCache(str(tmpdir), 1024 * 1024)
+    times = np.arange(0.0, 101.0, 10.0)
+    cache.store('A', 0.0, 100.0, times, times * 2)
+    cache.store('A', 200.0, 300.0, times + 200, times)
+
+    pieces, missing = cache.lookup('A', 55.0, 250.0)
+    assert missing == [(100.0, 200.0)]
+    assert [piece[0] for piece in pieces] == [55.0, 200.0]
+    np.testing.assert_array_equal(pieces[0][1], [50.0, 60.0, 70.0, 80.0,
+                                                 90.0, 100.0])
+    np.testing.assert_array_equal(pieces[0][2], pieces[0][1] * 2)
+    np.testing.assert_array_equal(pieces[1][1], [200.0, 210.0, 220.0,
+                                                 230.0, 240.0, 250.0])
+
+    assert cache.lookup('B', 0.0, 100.0) == ([], [(0.0, 100.0)])
+
+    cache.store('A', 0.0, 300.0, np.arange(0.0, 301.0), np.arange(301.0))
+    assert [segment[:2] for segment in cache.segments('A')] == [(0.0, 300.0)]
+
+
+def test_recent_data_not_cached(tmpdir):
+    cache = ArchiverCache(str(tmpdir), 1024 * 1024)
+    now = time.time()
+    cache.store('A', now - 10, now, np.array([now - 5]), np.array([1.0]))
+    assert cache.segments('A') == []
+
+
+def test_eviction(tmpdir):
+    """
+    Test that the least recently used segments are evicted first.
+    """
+    cache = ArchiverCache(str(tmpdir), 1024 * 1024)
+    times = np.arange(0.0, 1000.0)
+    for key in ('A', 'B', 'C'):
+        cache.store(key, 0.0, 1000.0, times, times)
+    # Make A the most recently used segment
+    for index, key in enumerate(('B', 'C', 'A')):
+        path = cache.segments(key)[0][2]
+        os.utime(path, (1000 + index, 1000 + index))
+    segment_size = cache.size() // 3
+
+    cache.max_size = 2 * segment_size
+    cache.evict()
+    assert cache.segments('B') == []
+    assert cache.segments('C') and cache.segments('A')
+    assert cache.size() <= cache.max_size
+
+
+def test_store_object_values(tmpdir):
+    """
+    Test that string values stored as objects are read back from the cache,
+    and that values which need pickling are not cached.
+    """
+    cache = ArchiverCache(str(tmpdir), 1024 * 1024)
+    times = np.array([0.0, 10.0, 20.0])
+    strings = np.array(['a', 'bc', 'def'], dtype=object)
+    cache.store('S', 0.0, 20.0, times, strings)
+    pieces, missing = cache.lookup('S', 0.0, 20.0)
+    assert missing == []
+    assert list(pieces[0][2]) == ['a', 'bc', 'def']
+
+    waveforms = np.empty(3, dtype=object)
+    waveforms[:] = [np.arange(1), np.arange(2), np.arange(3)]
+    cache.store('W', 0.0, 20.0, times, waveforms)
+    assert cache.lookup('W', 0.0, 20.0) == ([], [(0.0, 20.0)])
+
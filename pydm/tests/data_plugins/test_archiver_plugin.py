@@ -0,0 +1,203 @@
+# Unit Tests for the archiver:// data plugin
+import json
+import threading
+
+import pytest
+import numpy as np
+from six.moves import BaseHTTPServer
+from six.moves.urllib.parse import urlparse, parse_qsl
+
+from ... import config
+from ...data_plugins import archiver_plugin
+from ...data_plugins.archiver_plugin import (ArchiverPlugin, parse_time,
+                                             format_time, split_request,
+                                             decode_samples, join_samples)
+from ...widgets.channel import PyDMChannel
+
+# Seconds between the samples served by the stand-in appliance.
+SAMPLE_PERIOD = 600
+
+
+class ArchiverHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Stand-in for the retrieval service of an Archiver Appliance. It answers
+    with a sample every SAMPLE_PERIOD seconds, whose value is its time, plus
+    the sample preceding the start of the range, like the appliance does.
+    """
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = dict(parse_qsl(url.query))
+        self.server.requests.append(params)
+        if (url.path != '/retrieval/data/getData.json' or
+                params.get('pv') == 'MISSING'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        start = parse_time(params['from'])
+        end = parse_time(params['to'])
+        secs = (int(start) // SAMPLE_PERIOD) * SAMPLE_PERIOD
+        samples = []
+        while secs <= end:
+            samples.append(dict(secs=secs, nanos=0, val=float(secs),
+                                severity=0, status=0))
+            secs += SAMPLE_PERIOD
+        body = json.dumps([dict(meta=dict(name=params['pv']),
+                                data=samples)]).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="function")
+def appliance(monkeypatch, tmpdir):
+    monkeypatch.setattr(config, 'ARCHIVER_CACHE_DIR', str(tmpdir))
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), ArchiverHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    monkeypatch.setenv('PYDM_ARCHIVER_URL',
+                       'http://127.0.0.1:{}'.format(server.server_port))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_time_conversions():
+    assert parse_time('2018-01-01T00:00:00Z') == 1514764800.0
+    assert parse_time('2018-01-01T00:00:00.250Z') == 1514764800.25
+    assert parse_time('2017-12-31T16:00:00-08:00') == 1514764800.0
+    assert format_time(1514764800.25) == '2018-01-01T00:00:00.250Z'
+
+
+def test_split_request():
+    """
+    Test that long time ranges are split into consecutive chunks.
+
+    Expectations:
+    1. Requests without a time range or shorter than a chunk are kept
+    2. The chunks cover the whole range and keep the other parameters
+    """
+    assert split_request('pv=A', 3600) == ['pv=A']
+    short = 'pv=A&from=2018-01-01T00:00:00Z&to=2018-01-01T00:30:00Z'
+    assert split_request(short, 3600) == [short]
+    assert split_request(short, 0) == [short]
+
+    chunks = split_request(
+        'pv=A&from=2018-01-01T00:00:00Z&to=2018-01-01T02:30:00Z', 3600)
+    ranges = [dict(parse_qsl(chunk)) for chunk in chunks]
+    assert [r['pv'] for r in ranges] == ['A'] * 3
+    assert [(parse_time(r['from']), parse_time(r['to'])) for r in ranges] == [
+        (1514764800.0, 1514768400.0),
+        (1514768400.0, 1514772000.0),
+        (1514772000.0, 1514773800.0)]
+
+
+def test_decode_and_join_samples():
+    """
+    Test that the samples are decoded into arrays and joined without the
+    duplicates found at the chunk boundaries.
+    """
+    first = decode_samples([dict(secs=10, nanos=500000000, val=1),
+                            dict(secs=20, nanos=0, val=2)])
+    np.testing.assert_allclose(first[0], [10.5, 20.0])
+    np.testing.assert_array_equal(first[1], [1.0, 2.0])
+    second = decode_samples([dict(secs=20, nanos=0, val=2),
+                             dict(secs=30, nanos=0, val=3)])
+    times, values = join_samples([first, second, decode_samples([])])
+    np.testing.assert_allclose(times, [10.5, 20.0, 30.0])
+    np.testing.assert_array_equal(values, [1.0, 2.0, 3.0])
+
+    waveforms = decode_samples([dict(secs=1, val=[1, 2]),
+                                dict(secs=2, val=[3, 4])])
+    assert waveforms[1].shape == (2, 2)
+
+
+def test_archiver_connection(qtbot, appliance, monkeypatch):
+    """
+    Test that a long history is retrieved in chunks from the worker pool
+    and published as a single array.
+
+    Expectations:
+    1. The connection is created without waiting for the appliance
+    2. One request is sent per chunk
+    3. The values are delivered in order, without duplicates, with the
+       timestamp of the last sample
+    """
+    monkeypatch.setattr(config, 'ARCHIVER_CHUNK_SIZE', 86400.0)
+    received = []
+    states = []
+    channel = PyDMChannel(
+        address='archiver://pv=MTEST:Float&from=2018-01-01T00:00:00Z'
+                '&to=2018-01-04T00:00:00Z',
+        data_slot=received.append, connection_slot=states.append)
+    plugin = ArchiverPlugin()
+    plugin.add_connection(channel)
+
+    qtbot.waitUntil(lambda: bool(received), timeout=5000)
+    assert states == [True]
+    assert len(appliance.requests) == 3
+    start, end = 1514764800, 1515024000
+    expected = np.arange(start, end + 1, SAMPLE_PERIOD, dtype=float)
+    np.testing.assert_array_equal(received[0].value, expected)
+    assert received[0].timestamp == end
+    connection = plugin.connections[plugin.get_address(channel)]
+    np.testing.assert_array_equal(connection.timestamps, expected)
+    plugin.remove_connection(channel)
+
+
+def test_archiver_connection_cache(qtbot, appliance, monkeypatch):
+    """
+    Test that the data retrieved is cached and that a request overlapping
+    the cache only retrieves the part which is not cached.
+
+    Expectations:
+    1. The same request is answered from the cache
+    2. A longer request only asks the appliance for the new part
+    3. The data is the same as if it was retrieved from the appliance
+    """
+    monkeypatch.setattr(config, 'ARCHIVER_CHUNK_SIZE', 0.0)
+    plugin = ArchiverPlugin()
+
+    def retrieve(end):
+        received = []
+        channel = PyDMChannel(
+            address='archiver://pv=MTEST:Float&from=2018-01-01T00:00:00Z'
+                    '&to={}'.format(end),
+            data_slot=received.append)
+        plugin.add_connection(channel)
+        qtbot.waitUntil(lambda: bool(received), timeout=5000)
+        plugin.remove_connection(channel)
+        return received[0].value
+
+    first = retrieve('2018-01-02T00:00:00Z')
+    assert len(appliance.requests) == 1
+    assert np.array_equal(retrieve('2018-01-02T00:00:00Z'), first)
+    assert len(appliance.requests) == 1
+
+    longer = retrieve('2018-01-03T00:00:00Z')
+    assert len(appliance.requests) == 2
+    assert parse_time(appliance.requests[1]['from']) == 1514851200
+    start, end = 1514764800, 1514937600
+    np.testing.assert_array_equal(
+        longer, np.arange(start, end + 1, SAMPLE_PERIOD, dtype=float))
+
+
+def test_archiver_connection_failure(qtbot, appliance):
+    """
+    Test that a failed request reports the channel as disconnected.
+    """
+    states = []
+    channel = PyDMChannel(address='archiver://pv=MISSING',
+                          connection_slot=states.append)
+    plugin = ArchiverPlugin()
+    plugin.add_connection(channel)
+    qtbot.waitUntil(lambda: bool(states), timeout=5000)
+    assert states == [False]
+    archiver_plugin.worker_pool().waitForDone(5000)
+    plugin.remove_connection(channel)
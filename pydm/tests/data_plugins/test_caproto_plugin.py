@@ -0,0 +1,80 @@
+# Unit Tests for the caproto data plugin
+import pytest
+
+caproto = pytest.importorskip('caproto')
+
+from caproto import AccessRights
+
+from ...data_plugins.epics_plugins.caproto_plugin_component import Connection
+from ...widgets.channel import PyDMChannel
+
+
+class Callbacks(object):
+    """Stand-in for the callback registries of a caproto PV."""
+    def __init__(self):
+        self.callbacks = []
+
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+        return callback
+
+    def remove_callback(self, callback):
+        self.callbacks.remove(callback)
+
+    def clear(self):
+        self.callbacks = []
+
+    def fire(self, *args):
+        for callback in self.callbacks:
+            callback(*args)
+
+
+class FakePV(object):
+    """Stand-in for a caproto threading client PV."""
+    connected = False
+
+    def __init__(self):
+        self.connection_state_callback = Callbacks()
+        self.access_rights_callback = Callbacks()
+        self.idle = False
+
+    def go_idle(self):
+        self.idle = True
+
+    def subscribe(self, *args, **kwargs):
+        return Callbacks()
+
+
+def test_access_rights_callback(qapp):
+    """
+    Test that the write access follows the access rights reported by
+    caproto, which calls its callbacks with the PV and the rights.
+    """
+    pv = FakePV()
+    channel = PyDMChannel(address='ca://MTEST:Float')
+    connection = Connection(channel, 'MTEST:Float', caproto_pv=pv)
+    pv.access_rights_callback.fire(pv, AccessRights.READ | AccessRights.WRITE)
+    assert connection.write_access is True
+    pv.access_rights_callback.fire(pv, AccessRights.READ)
+    assert connection.write_access is False
+
+
+def test_shared_pv(qapp):
+    """
+    Test the connections sharing a PV which is not connected yet.
+
+    Expectations:
+    1. Their first listener is told that the PV is disconnected
+    2. The PV is only idled once no connection uses it
+    """
+    pv = FakePV()
+    states = []
+    connections = [
+        Connection(PyDMChannel(address=address, connection_slot=states.append),
+                   'MTEST:Float', caproto_pv=pv)
+        for address in ('ca://MTEST:Float', 'ca://MTEST:Float?rate=5')]
+    assert states == [False, False]
+    connections[0].close()
+    assert not pv.idle
+    connections[1].close()
+    assert pv.idle
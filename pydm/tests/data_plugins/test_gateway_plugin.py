@@ -0,0 +1,168 @@
+# Unit Tests for the gateway and its gw:// data plugin
+import os
+
+import pytest
+import numpy as np
+
+from ... import config
+from ...data_plugins import plugin_for_address, gateway_plugin
+from ...data_plugins.gateway_plugin import GatewayPlugin, GatewayClient
+from ...gateway.broker import Broker
+from ...gateway.protocol import (MessageReader, SharedArray,
+                                 SharedArrayReader, encode, pack_value,
+                                 unpack_value, shared_memory, socket_path)
+from ...widgets.channel import PyDMChannel
+
+
+@pytest.fixture(scope="function")
+def gateway(qapp, tmpdir):
+    broker = Broker(path=os.path.join(str(tmpdir), 'gateway'))
+    assert broker.listen()
+    yield broker
+    broker.close()
+
+
+@pytest.mark.parametrize("value", [
+    1, 2.5, 'text', ('a', 'b'), np.arange(6, dtype=np.int16).reshape(2, 3),
+])
+def test_messages(value):
+    """
+    Test that the values survive a message split in arbitrary pieces.
+    """
+    header, payload = pack_value(value)
+    header.update(op='update', address='sim://sine', kind='value')
+    data = encode(header, payload) * 2
+    reader = MessageReader()
+    messages = reader.feed(data[:5]) + reader.feed(data[5:-3])
+    messages += reader.feed(data[-3:])
+    assert len(messages) == 2
+    for header, payload in messages:
+        assert header['address'] == 'sim://sine'
+        np.testing.assert_array_equal(unpack_value(header, payload), value)
+
+
+@pytest.mark.skipif(shared_memory is None, reason="No shared memory")
+def test_shared_array():
+    """
+    Test that arrays are read back from shared memory and that a reader
+    holding an outdated sequence number gets nothing.
+    """
+    shared = SharedArray()
+    reader = SharedArrayReader()
+    try:
+        first = shared.write(np.arange(10.0))
+        value = reader.read('sim://sine', first['shm'], first['seq'],
+                            np.dtype(float), (10,))
+        np.testing.assert_array_equal(value, np.arange(10.0))
+        shared.write(np.ones(10))
+        assert reader.read('sim://sine', first['shm'], first['seq'],
+                           np.dtype(float), (10,)) is None
+        # Growing the array moves it to a new segment
+        larger = shared.write(np.ones(1000))
+        assert larger['shm'] != first['shm']
+        value = reader.read('sim://sine', larger['shm'], larger['seq'],
+                            np.dtype(float), (1000,))
+        assert value.sum() == 1000
+    finally:
+        reader.close()
+        shared.close()
+
+
+def test_gateway_shares_upstream(qtbot, gateway, monkeypatch):
+    """
+    Test that the processes connected to the gateway share the upstream
+    connection of a channel.
+
+    Expectations:
+    1. Two clients of the same channel use a single upstream connection
+    2. Both receive the arrays, handed over in shared memory
+    3. The upstream connection is closed with the last subscriber
+    """
+    monkeypatch.setattr(config, 'GATEWAY_SHM_SIZE', 1024)
+    address = 'gw://sim://sine?rate=20,n=1000'
+    received = ([], [])
+    states = ([], [])
+    plugins = []
+    channels = []
+    for index in range(2):
+        # One client per process
+        monkeypatch.setattr(gateway_plugin, '_client',
+                            GatewayClient(gateway.path, autostart=False))
+        plugin = GatewayPlugin()
+        channel = PyDMChannel(address=address,
+                              value_slot=received[index].append,
+                              connection_slot=states[index].append)
+        plugin.add_connection(channel)
+        plugins.append(plugin)
+        channels.append(channel)
+
+    qtbot.waitUntil(lambda: all(received), timeout=5000)
+    assert len(gateway.links) == 2
+    assert list(gateway.upstreams) == ['sim://sine?rate=20,n=1000']
+    assert states == ([True], [True])
+    for values in received:
+        assert isinstance(values[-1], np.ndarray)
+        assert values[-1].shape == (1000,)
+
+    for plugin, channel in zip(plugins, channels):
+        plugin.remove_connection(channel)
+    qtbot.waitUntil(lambda: not gateway.upstreams, timeout=5000)
+
+
+def test_gateway_routing(monkeypatch):
+    """
+    Test that the protocols listed in GATEWAY_PROTOCOLS go to the gateway
+    plugin, which keeps their protocol in the address.
+    """
+    monkeypatch.setattr(config, 'GATEWAY_PROTOCOLS', ('sim',))
+    assert isinstance(plugin_for_address('sim://sine'), GatewayPlugin)
+    channel = PyDMChannel(address='sim://sine?maxrate=5')
+    assert GatewayPlugin.get_address(channel) == 'sim://sine?maxrate=5'
+    channel = PyDMChannel(address='gw://ca://MTEST:Float')
+    assert GatewayPlugin.get_address(channel) == 'ca://MTEST:Float'
+
+
+def test_gateway_options(qtbot, gateway, monkeypatch):
+    """
+    Test that the connections to a channel differing by their options share
+    the subscription to the gateway.
+
+    Expectations:
+    1. Both connections receive the values
+    2. The channel stays subscribed until the last connection is closed
+    """
+    monkeypatch.setattr(gateway_plugin, '_client',
+                        GatewayClient(gateway.path, autostart=False))
+    plugin = GatewayPlugin()
+    addresses = ('gw://sim://sine?rate=20', 'gw://sim://sine?rate=20,maxrate=5')
+    received = ([], [])
+    channels = [PyDMChannel(address=address, value_slot=values.append)
+                for address, values in zip(addresses, received)]
+    for channel in channels:
+        plugin.add_connection(channel)
+    qtbot.waitUntil(lambda: all(received), timeout=5000)
+    assert list(gateway.upstreams) == ['sim://sine?rate=20']
+
+    plugin.remove_connection(channels[1])
+    del received[0][:]
+    qtbot.waitUntil(lambda: received[0], timeout=5000)
+    assert list(gateway.upstreams) == ['sim://sine?rate=20']
+    plugin.remove_connection(channels[0])
+    qtbot.waitUntil(lambda: not gateway.upstreams, timeout=5000)
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason="No user ids")
+def test_private_socket(tmpdir, monkeypatch):
+    """
+    Test that the gateway socket is in a directory private to the user, and
+    that a directory open to other users is refused.
+    """
+    monkeypatch.setattr(config, 'GATEWAY_SOCKET', None)
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmpdir))
+    path = socket_path()
+    assert path == os.path.join(str(tmpdir), 'pydm', 'gateway')
+    assert os.stat(os.path.dirname(path)).st_mode & 0o777 == 0o700
+
+    os.chmod(os.path.dirname(path), 0o755)
+    with pytest.raises(OSError):
+        socket_path()
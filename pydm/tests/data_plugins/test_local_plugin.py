@@ -0,0 +1,130 @@
+# Unit Tests for the LocalPlugin and its poll scheduler
+import time
+import logging
+import threading
+
+from ... import config
+from ...data_plugins import local_plugin
+from ...data_plugins.local_plugin import LocalPlugin
+from ...widgets.channel import PyDMChannel
+
+
+class Device(object):
+    def __init__(self):
+        self.value = 1.0
+        self.calls = 0
+        self.slow_calls = 0
+        self.release = threading.Event()
+
+    def counter(self):
+        self.calls += 1
+        return self.calls
+
+    def slow(self):
+        self.slow_calls += 1
+        self.release.wait(5)
+        return 'done'
+
+    def broken(self):
+        raise RuntimeError("broken")
+
+
+def test_local_plugin_polling(qtbot):
+    """
+    Test that the connections are polled by the shared scheduler.
+
+    Expectations:
+    1. Connections with the same period share a group
+    2. Values are delivered to the listeners and polled again
+    3. Getters raising an exception report a disconnection
+    4. Closing the connections removes them from the scheduler
+    """
+    device = Device()
+    plugin = LocalPlugin('dev', device)
+    values = []
+    states = []
+    channels = [
+        PyDMChannel(address='dev://value?t=0.05', value_slot=values.append),
+        PyDMChannel(address='dev://counter()?t=0.05',
+                    value_slot=values.append),
+        PyDMChannel(address='dev://broken()?t=0.1',
+                    connection_slot=states.append),
+    ]
+    plugin.add_connections(channels)
+    scheduler = local_plugin.scheduler()
+    assert len(scheduler) == 3
+    assert sorted(scheduler._groups) == [0.05, 0.1]
+
+    qtbot.waitUntil(lambda: device.calls >= 3, timeout=2000)
+    assert 1.0 in values
+    assert states == []
+    connection = plugin.connections['broken()?t=0.1']
+    assert not connection.is_connected()
+
+    plugin.remove_connections(channels)
+    assert len(scheduler) == 0
+
+
+def test_local_plugin_overrun(qtbot, caplog):
+    """
+    Test that a slow getter neither blocks the GUI nor the other getters
+    of its group, and that it is reported as overrunning its period.
+    """
+    device = Device()
+    plugin = LocalPlugin('slw', device)
+    values = []
+    channels = [
+        PyDMChannel(address='slw://slow()?t=0.05', value_slot=values.append),
+        PyDMChannel(address='slw://counter()?t=0.05',
+                    value_slot=values.append),
+    ]
+    start = time.time()
+    with caplog.at_level(logging.WARNING):
+        plugin.add_connections(channels)
+        assert time.time() - start < 1
+        qtbot.waitUntil(lambda: device.calls >= 3, timeout=2000)
+    connection = plugin.connections['slow()?t=0.05']
+    assert connection.overrun_count > 0
+    assert 'slow()?t=0.05' in caplog.text
+    assert 'done' not in values
+
+    device.release.set()
+    qtbot.waitUntil(lambda: 'done' in values, timeout=2000)
+    plugin.remove_connections(channels)
+
+
+def test_local_plugin_timeout(qtbot, monkeypatch):
+    """
+    Test that a getter which blocks times out.
+
+    Expectations:
+    1. The connection is reported as disconnected once the getter runs for
+       longer than the timeout
+    2. The getter is not called again while it is still running
+    3. The connection is reported as connected again once it returns
+    """
+    monkeypatch.setattr(config, 'LOCAL_TIMEOUT', 0.1)
+    device = Device()
+    device.release.set()
+    plugin = LocalPlugin('blk', device)
+    values = []
+    states = []
+    channel = PyDMChannel(address='blk://slow()?t=0', value_slot=values.append,
+                          connection_slot=states.append)
+    plugin.add_connections([channel])
+    qtbot.waitUntil(lambda: values == ['done'], timeout=2000)
+    assert states == [True]
+
+    device.release.clear()
+    connection = plugin.connections['slow()?t=0']
+    connection.update()
+    qtbot.waitUntil(lambda: states == [True, False], timeout=2000)
+    assert local_plugin.scheduler().timeout_count >= 1
+    connection.update()
+    qtbot.wait(200)
+    assert device.slow_calls == 2
+
+    device.release.set()
+    qtbot.waitUntil(lambda: states == [True, False, True], timeout=2000)
+    assert values == ['done', 'done']
+    plugin.remove_connections([channel])
@@ -0,0 +1,636 @@
+# Unit Tests for the base PyDMConnection and PyDMPlugin classes
+import time
+import threading
+
+import pytest
+import numpy as np
+
+from ...data_plugins import plugin
+from ...data_plugins.plugin import (PyDMConnection, PyDMPlugin,
+                                     UpdateDispatcher, ChannelData,
+                                     ChangeDetector)
+from ...widgets.channel import PyDMChannel
+
+
+@pytest.fixture(scope="function")
+def dispatcher(qapp):
+    dispatcher = UpdateDispatcher(frame_rate=1.0)
+    yield dispatcher
+    dispatcher.deleteLater()
+
+
+def test_dispatcher_coalesces_latest_value(qtbot, signals, dispatcher):
+    """
+    Test that only the newest value published in between two frames is
+    delivered to the listeners.
+
+    Expectations:
+    1. Nothing is delivered before the dispatcher is flushed
+    2. The last value published is the one delivered
+    3. The counters report the coalesced updates
+    """
+    channel = PyDMChannel(address='tst://coalesce', value_slot=signals.receiveValue)
+    connection = PyDMConnection(channel, 'coalesce')
+    connection.dispatcher = dispatcher
+    connection.new_value_signal[float].connect(signals.receiveValue)
+
+    for val in (1.0, 2.0, 3.0):
+        connection.publish('value', val)
+    assert signals.value is None
+
+    dispatcher.flush()
+    assert signals.value == 3.0
+    assert dispatcher.statistics() == dict(received=3, delivered=1,
+                                           coalesced=2)
+
+
+def test_dispatcher_discard(qtbot, signals, dispatcher):
+    """
+    Test that discarding a connection drops its pending updates.
+    """
+    channel = PyDMChannel(address='tst://discard')
+    connection = PyDMConnection(channel, 'discard')
+    connection.dispatcher = dispatcher
+    connection.new_severity_signal.connect(signals.receiveValue)
+
+    connection.publish('severity', 2)
+    dispatcher.discard(connection)
+    dispatcher.flush()
+    assert signals.value is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    (1, 1),
+    (1.5, 1.5),
+    ("abc", "abc"),
+    (np.float64(2.5), 2.5),
+    (np.int32(7), 7),
+])
+def test_publish_without_dispatcher(qtbot, signals, value, expected):
+    """
+    Test that without a dispatcher a published value is delivered right away
+    using the signal overload matching its type.
+    """
+    channel = PyDMChannel(address='tst://direct')
+    connection = PyDMConnection(channel, 'direct')
+    connection.dispatcher = None
+    connection.new_value_signal[type(expected)].connect(signals.receiveValue)
+
+    connection.publish('value', value)
+    assert signals.value == expected
+    assert type(signals.value) == type(expected)
+
+
+def test_traffic_statistics(qtbot, monkeypatch):
+    """
+    Test the traffic counters kept by the connection.
+
+    Expectations:
+    1. Every published value is counted, even if coalesced later
+    2. The bytes of array values are accounted
+    3. The update rate is measured once the window closes and the peak is kept
+    """
+    channel = PyDMChannel(address='tst://stats')
+    connection = PyDMConnection(channel, 'stats')
+    connection.dispatcher = None
+    assert connection.update_count == 0
+    assert connection.time_since_last_update is None
+
+    now = [1000.0]
+    monkeypatch.setattr(plugin, '_now', lambda: now[0])
+    connection._rate_window_start = now[0]
+    for i in range(1, 11):
+        # The last update lands exactly on the end of the window
+        now[0] = 1000.0 + i * plugin.RATE_WINDOW / 10
+        connection.publish('value', np.zeros(8, dtype=np.float64))
+    connection.publish('severity', 0)
+
+    assert connection.update_count == 10
+    assert connection.bytes_received == 10 * 64
+    assert connection.update_rate == pytest.approx(10.0)
+    assert connection.peak_update_rate == pytest.approx(10.0)
+    now[0] = 1000.0 + plugin.RATE_WINDOW + 0.5
+    assert connection.time_since_last_update == pytest.approx(0.5)
+    # With no further updates the rate decays
+    now[0] = 1000.0 + plugin.RATE_WINDOW + 5.0
+    assert connection.update_rate == 0.0
+
+
+def test_dispatcher_disable(qtbot, signals, monkeypatch):
+    """
+    Test that disabling the coalescing with set_frame_rate(0) delivers the
+    pending updates and makes the existing connections bypass the dispatcher.
+    """
+    monkeypatch.setattr(plugin.config, 'FRAME_RATE', 30.0)
+    monkeypatch.setattr(plugin, '_dispatcher', None)
+    channel = PyDMChannel(address='tst://disable')
+    connection = PyDMConnection(channel, 'disable')
+    dispatcher = connection.dispatcher
+    assert dispatcher is plugin.update_dispatcher()
+    connection.new_value_signal[float].connect(signals.receiveValue)
+
+    connection.publish('value', 1.0)
+    plugin.set_frame_rate(0)
+    assert signals.value == 1.0
+    assert not dispatcher.active
+    assert plugin.update_dispatcher() is None
+
+    connection.publish('value', 2.0)
+    assert signals.value == 2.0
+    dispatcher.deleteLater()
+
+
+@pytest.mark.parametrize("rate", [0, -5])
+def test_dispatcher_invalid_rate(qapp, rate):
+    """
+    Test that non-positive frame rates leave the dispatcher inactive.
+    """
+    dispatcher = UpdateDispatcher(frame_rate=rate)
+    assert dispatcher.frame_rate == 0
+    assert not dispatcher.active
+    dispatcher.deleteLater()
+
+
+@pytest.mark.parametrize("value, expected", [
+    (4.5, 4.5),
+    (np.float64(2.5), 2.5),
+    (np.int32(7), 7),
+    (True, 1),
+    ("abc", "abc"),
+])
+def test_data_slot_envelope(qtbot, value, expected):
+    """
+    Test that listeners with a data_slot receive a single envelope with the
+    normalized value, the latest severity and the time of the update.
+    """
+    received = []
+    channel = PyDMChannel(address='tst://envelope', data_slot=received.append)
+    connection = PyDMConnection(channel, 'envelope')
+    connection.dispatcher = None
+    connection.add_listener(channel)
+    # The legacy overloads have no listener and are not emitted
+    assert connection.receivers(connection.new_value_signal[float]) == 0
+
+    connection.publish('severity', 1)
+    connection.publish('value', value)
+    qtbot.waitUntil(lambda: len(received) == 1, timeout=1000)
+    data = received[0]
+    assert isinstance(data, ChannelData)
+    assert data.value == expected
+    assert type(data.value) == type(expected)
+    assert data.severity == 1
+    assert data.timestamp == connection.last_update_time
+
+    connection.remove_listener(channel)
+    assert connection.receivers(connection.new_data_signal) == 0
+
+
+class ListeningConnection(PyDMConnection):
+    def __init__(self, channel, address, protocol=None, parent=None):
+        super(ListeningConnection, self).__init__(channel, address, protocol,
+                                                  parent)
+        self.add_listener(channel)
+
+
+class BatchPlugin(PyDMPlugin):
+    protocol = 'batch'
+    connection_class = ListeningConnection
+
+    def __init__(self):
+        super(BatchPlugin, self).__init__()
+        self.batches = []
+
+    def create_connections(self, pending):
+        self.batches.append(list(pending))
+        super(BatchPlugin, self).create_connections(pending)
+
+
+def test_add_connections_batches_new_addresses(qapp):
+    """
+    Test that connecting several channels opens every new connection in a
+    single batch.
+
+    Expectations:
+    1. Channels sharing an address share a connection
+    2. Channels already connected are ignored
+    3. Only addresses without a connection are handed to create_connections
+    """
+    plugin = BatchPlugin()
+    first = PyDMChannel(address='batch://a')
+    second = PyDMChannel(address='batch://a')
+    third = PyDMChannel(address='batch://b')
+    plugin.add_connections([first, second, third, first])
+    assert plugin.batches == [['a', 'b']]
+    assert plugin.connections['a'].listener_count == 2
+    assert plugin.connections['b'].listener_count == 1
+
+    fourth = PyDMChannel(address='batch://b')
+    plugin.add_connection(fourth)
+    assert plugin.batches == [['a', 'b']]
+    assert plugin.connections['b'].listener_count == 2
+
+
+def test_replay_targets_new_listener(qtbot):
+    """
+    Test that replaying the state of a connection only reaches the listener
+    being replayed to.
+
+    Expectations:
+    1. The new listener receives the connection state, metadata and value
+    2. The existing listener receives nothing
+    3. A replay is dropped if the listener is removed before it is delivered
+    """
+    old_values = []
+    new_values = []
+    new_units = []
+    new_states = []
+    old_channel = PyDMChannel(address='tst://replay',
+                              value_slot=old_values.append)
+    new_channel = PyDMChannel(address='tst://replay',
+                              connection_slot=new_states.append,
+                              unit_slot=new_units.append,
+                              data_slot=new_values.append)
+    connection = ListeningConnection(old_channel, 'replay')
+    connection.dispatcher = None
+    connection.connected = True
+    connection.publish('unit', 'mm')
+    connection.publish('severity', 2)
+    connection.publish('value', np.float32(1.5))
+    qtbot.waitUntil(lambda: len(old_values) == 1, timeout=1000)
+
+    connection.add_listener(new_channel)
+    connection.replay(new_channel)
+    qtbot.waitUntil(lambda: len(new_values) == 1, timeout=1000)
+    assert new_states == [True]
+    assert new_units == ['mm']
+    assert new_values[0].value == 1.5
+    assert new_values[0].severity == 2
+    qtbot.wait(10)
+    assert old_values == [1.5]
+
+    late_channel = PyDMChannel(address='tst://replay',
+                               unit_slot=new_units.append)
+    connection.add_listener(late_channel)
+    connection.replay(late_channel)
+    connection.remove_listener(late_channel)
+    qtbot.wait(10)
+    assert new_units == ['mm']
+
+
+def test_remove_connections_in_bulk(qapp):
+    """
+    Test that removing several channels at once disconnects their slots and
+    closes the connections left without listeners.
+    """
+    plugin = BatchPlugin()
+    received = [[] for _ in range(4)]
+    channels = [PyDMChannel(address='batch://a', value_slot=values.append)
+                for values in received[:3]]
+    channels.append(PyDMChannel(address='batch://b',
+                                unit_slot=received[3].append))
+    plugin.add_connections(channels)
+    connection = plugin.connections['a']
+    value_signal = connection.new_value_signal[float]
+    assert connection.receivers(value_signal) == 3
+
+    plugin.remove_connections(channels[:1])
+    assert connection.listener_count == 2
+    assert connection.receivers(value_signal) == 2
+
+    plugin.remove_connections(channels)
+    assert plugin.connections == {}
+    assert connection.listener_count == 0
+    assert connection.receivers(value_signal) == 0
+    assert len(plugin.channels) == 0
+
+
+@pytest.mark.parametrize("address, expected_address, expected_options", [
+    ('PV', 'PV', {}),
+    ('PV?maxrate=5', 'PV', {'maxrate': 5.0}),
+    ('PV?maxrate=oops', 'PV', {}),
+    ('wm()?t=1,maxrate=2.5', 'wm()?t=1', {'maxrate': 2.5}),
+    ('field?t=1&gds=text', 'field?t=1,gds=text', {}),
+    ('PV?deadband=0.5,rdeadband=1e-3', 'PV', {'deadband': 0.5,
+                                             'rdeadband': 0.001}),
+])
+def test_parse_address_options(address, expected_address, expected_options):
+    assert plugin.parse_address_options(address) == (expected_address,
+                                                      expected_options)
+
+
+def test_max_rate(qtbot, monkeypatch):
+    """
+    Test that a connection with a maximum rate holds back the values arriving
+    too fast and only delivers the latest one once the interval is over.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(plugin, '_now', lambda: now[0])
+    received = []
+    pv = BatchPlugin()
+    channel = PyDMChannel(address='batch://fast?maxrate=10',
+                          value_slot=received.append)
+    pv.add_connection(channel)
+    connection = pv.connections['fast?maxrate=10']
+    assert connection.address == 'fast'
+    assert connection.max_rate == 10.0
+    connection.dispatcher = None
+
+    connection.publish('value', 1.0)
+    now[0] += 0.01
+    connection.publish('value', 2.0)
+    now[0] += 0.01
+    connection.publish('value', 3.0)
+    qtbot.waitUntil(lambda: received == [1.0, 3.0], timeout=1000)
+    assert connection.update_count == 3
+
+    # Past the interval values are delivered right away
+    now[0] += 1.0
+    connection.publish('value', 4.0)
+    qtbot.waitUntil(lambda: received == [1.0, 3.0, 4.0], timeout=1000)
+
+
+@pytest.mark.parametrize("options, values, expected", [
+    ({'deadband': 0.5}, [1.0, 1.2, 1.5, 1.6, 0.9], [1.0, 1.6, 0.9]),
+    ({'rdeadband': 0.1}, [100, 105, 111, 120], [100, 111]),
+    ({'deadband': 1.0, 'rdeadband': 0.01}, [10.0, 10.9, 200.0, 201.5, 203.0],
+     [10.0, 200.0, 203.0]),
+    ({'deadband': 0.5}, ["a", "a", "b"], ["a", "a", "b"]),
+    ({'deadband': 0.5},
+     [np.array([1.0, 2.0]), np.array([1.1, 2.4]), np.array([1.1, 2.6]),
+      np.array([1.1, 2.6, 3.0])],
+     [[1.0, 2.0], [1.1, 2.6], [1.1, 2.6, 3.0]]),
+])
+def test_deadband(qtbot, options, values, expected):
+    """
+    Test that values within the deadband of the last value delivered are
+    dropped, element-wise for arrays.
+    """
+    received = []
+    channel = PyDMChannel(address='tst://deadband',
+                          data_slot=lambda data: received.append(data.value))
+    connection = ListeningConnection(channel, 'deadband')
+    connection.dispatcher = None
+    connection.set_options(options)
+    for value in values:
+        connection.publish('value', value)
+    qtbot.waitUntil(lambda: len(received) == len(expected), timeout=1000)
+    qtbot.wait(10)
+    assert [np.ndarray.tolist(v) if isinstance(v, np.ndarray) else v
+            for v in received] == expected
+    assert connection.update_count == len(values)
+
+
+@pytest.mark.parametrize("strategy, expected", [
+    ('compare', [True, False, True, False, True]),
+    ('sampled', [True, False, False, False, True]),
+    ('timestamp', [True, False, True, True, True]),
+    ('always', [True, True, True, True, True]),
+])
+def test_change_detection(strategy, expected):
+    """
+    Test the strategies used to decide whether a large array changed.
+
+    The updates are: a first array, the same array with the same timestamp,
+    a change of an element outside of the sample, the same array with a
+    new timestamp and an array with a new shape.
+    """
+    detector = ChangeDetector(strategy=strategy, size_threshold=100)
+    first = np.zeros(10000)
+    changed = first.copy()
+    changed[1] = 1.0
+    updates = [(first, 1.0), (first.copy(), 1.0), (changed, 2.0),
+               (changed, 3.0), (np.zeros(20000), 4.0)]
+    assert [detector.changed(value, timestamp)
+            for value, timestamp in updates] == expected
+
+    detector.reset()
+    assert detector.changed(np.zeros(20000), 4.0)
+
+
+def test_change_detection_default():
+    """
+    Test that by default a change of a large array between the elements
+    a sample would check is still reported.
+    """
+    detector = ChangeDetector(size_threshold=100)
+    first = np.zeros(10000)
+    changed = first.copy()
+    changed[1] = 1.0
+    assert detector.changed(first, 1.0)
+    assert detector.changed(changed, 2.0)
+
+
+def test_change_detection_small_values():
+    """
+    Test that scalars and small arrays are always compared in full.
+    """
+    detector = ChangeDetector(strategy='always', size_threshold=100)
+    assert detector.changed(1.0)
+    assert not detector.changed(1.0)
+    assert detector.changed(np.arange(10))
+    assert not detector.changed(np.arange(10))
+    assert detector.changed(np.arange(10) * 2)
+
+
+def test_source_timestamp(qtbot, monkeypatch):
+    """
+    Test that the timestamp published by a plugin reaches the listeners with
+    the value it belongs to and is used to measure the delivery latency.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(plugin, '_now', lambda: now[0])
+    received = []
+    timestamps = []
+    channel = PyDMChannel(address='tst://stamped', data_slot=received.append,
+                          timestamp_slot=timestamps.append)
+    connection = ListeningConnection(channel, 'stamped')
+    connection.dispatcher = None
+
+    connection.publish('timestamp', 999.5)
+    connection.publish('value', 1.0)
+    # Without a timestamp the local time of arrival is used
+    now[0] = 1001.0
+    connection.publish('value', 2.0)
+    qtbot.waitUntil(lambda: len(received) == 2, timeout=1000)
+    assert timestamps == [999.5]
+    assert [data.timestamp for data in received] == [999.5, 1001.0]
+    assert connection.latency == pytest.approx(0.5)
+
+
+def test_timestamp_filtered_with_value(qtbot):
+    """
+    Test that the timestamps of the values dropped by the deadband are not
+    delivered either.
+    """
+    received = []
+    timestamps = []
+    channel = PyDMChannel(address='tst://stamped', data_slot=received.append,
+                          timestamp_slot=timestamps.append)
+    connection = ListeningConnection(channel, 'stamped')
+    connection.dispatcher = None
+    connection.set_options({'deadband': 0.5})
+
+    for timestamp, value in ((10.0, 1.0), (11.0, 1.2), (12.0, 2.0)):
+        connection.publish('timestamp', timestamp)
+        connection.publish('value', value)
+    qtbot.waitUntil(lambda: len(received) == 2, timeout=1000)
+    assert timestamps == [10.0, 12.0]
+    assert [data.timestamp for data in received] == [10.0, 12.0]
+
+
+class GovernedConnection(object):
+    """Stand-in for the connections shared by the BandwidthGovernor."""
+    def __init__(self, update_rate, array_size, priority=None, visible=True):
+        self.update_rate = update_rate
+        self.array_size = array_size
+        self.priority = priority
+        self._visible = visible
+        self.governed_rate = None
+
+    def visible(self):
+        return self._visible
+
+
+def test_bandwidth_governor_allocation(qapp):
+    """
+    Test how the BandwidthGovernor shares the array budget.
+
+    Expectations:
+    1. Connections updating slower than their share keep their rate
+    2. The rest of the budget is shared according to the priorities
+    3. Hidden connections get a tenth of their share
+    4. The bandwidth limits the rate of the large arrays
+    """
+    governor = plugin.BandwidthGovernor(frame_rate=30.0)
+    slow = GovernedConnection(update_rate=2.0, array_size=100)
+    normal = GovernedConnection(update_rate=100.0, array_size=100)
+    important = GovernedConnection(update_rate=100.0, array_size=100,
+                                   priority=3.0)
+    for connection in (slow, normal, important):
+        governor.add(connection)
+    governor.allocate()
+    assert slow.governed_rate is None
+    assert normal.governed_rate == pytest.approx(7.0)
+    assert important.governed_rate == pytest.approx(21.0)
+
+    normal._visible = False
+    governor.allocate()
+    assert normal.governed_rate == pytest.approx(28.0 * 0.1 / 3.1)
+
+    governor.bandwidth = 1000.0
+    governor.frame_rate = 0.0
+    governor.discard(slow)
+    large = GovernedConnection(update_rate=100.0, array_size=1000)
+    governor.add(large)
+    normal._visible = True
+    governor.allocate()
+    assert slow.governed_rate is None
+    assert large.governed_rate == pytest.approx(1000.0 / 5 / 1000)
+    assert normal.governed_rate == pytest.approx(1000.0 / 5 / 100)
+    governor.deleteLater()
+
+
+def test_bandwidth_governor_limits_arrays(qtbot, monkeypatch):
+    """
+    Test that array connections join the budget once configured and are
+    throttled to the rate allocated to them.
+    """
+    monkeypatch.setattr(plugin, '_governor', None)
+    monkeypatch.setattr(plugin.config, 'ARRAY_BANDWIDTH', 0.0)
+    monkeypatch.setattr(plugin.config, 'ARRAY_FRAME_RATE', 0.0)
+    now = [1000.0]
+    monkeypatch.setattr(plugin, '_now', lambda: now[0])
+    channel = PyDMChannel(address='tst://array?priority=2')
+    connection = PyDMConnection(channel, 'array')
+    connection.set_options({'priority': 2.0})
+    connection.dispatcher = None
+    connection.publish('value', np.zeros(8))
+    assert connection.governor is None
+
+    plugin.set_array_budget(frame_rate=5.0)
+    connection.publish('value', np.zeros(8))
+    governor = plugin.bandwidth_governor()
+    assert governor.connections() == [connection]
+    assert connection.array_size == 64
+    connection.governed_rate = 5.0
+    assert connection.rate_limit == 5.0
+    connection.max_rate = 2.0
+    connection.governed_rate = 5.0
+    assert connection.rate_limit == 2.0
+
+    plugin.set_array_budget()
+    assert governor.connections() == []
+    assert connection.governed_rate is None
+    assert plugin.bandwidth_governor() is None
+
+
+class WritingConnection(PyDMConnection):
+    put_callback = True
+
+    def __init__(self, channel, address, protocol=None, parent=None):
+        super(WritingConnection, self).__init__(channel, address, protocol,
+                                                parent)
+        self.written = []
+        self.threads = set()
+        self.release = threading.Event()
+
+    def put_value(self, value, wait=False):
+        self.threads.add(threading.current_thread())
+        self.release.wait(5)
+        self.written.append((value, wait))
+        self.put_count += 1
+
+
+def test_put_queue(qtbot, monkeypatch):
+    """
+    Test that the values sent by the widgets are written from the put pool,
+    latest-wins.
+
+    Expectations:
+    1. Queuing a value does not wait for the write
+    2. The values queued during a write collapse into the latest one
+    3. The dropped values and the latency of the writes are accounted
+    4. The writes wait for completion if PUT_CALLBACK is set
+    """
+    monkeypatch.setattr(plugin.config, 'PUT_CALLBACK', True)
+    channel = PyDMChannel(address='tst://put?putwindow=0')
+    connection = WritingConnection(channel, 'put')
+    connection.set_options({'putwindow': 0.0})
+    connection.queue_put(0.0)
+    # Wait for the first write to start
+    qtbot.waitUntil(lambda: bool(connection.threads), timeout=2000)
+    for value in range(1, 5):
+        connection.queue_put(float(value))
+    assert connection.written == []
+    connection.release.set()
+    qtbot.waitUntil(lambda: connection.put_count == 2, timeout=2000)
+    assert connection.written == [(0.0, True), (4.0, True)]
+    assert connection.put_dropped == 3
+    assert connection.put_latency is not None
+    assert threading.current_thread() not in connection.threads
+
+    connection.put_queue.close()
+    connection.queue_put(5.0)
+    plugin.put_pool().waitForDone(2000)
+    assert connection.put_count == 2
+
+
+def test_put_window(qtbot):
+    """
+    Test that the writes are spaced by the window of the connection, and
+    that no thread of the put pool is held while waiting for it.
+    """
+    channel = PyDMChannel(address='tst://put?putwindow=0.3')
+    connection = WritingConnection(channel, 'put')
+    connection.set_options({'putwindow': 0.3})
+    connection.release.set()
+    connection.queue_put(0.0)
+    qtbot.waitUntil(lambda: connection.put_count == 1, timeout=2000)
+    start = time.time()
+    connection.queue_put(1.0)
+    qtbot.wait(100)
+    assert connection.put_count == 1
+    assert plugin.put_pool().activeThreadCount() == 0
+    qtbot.waitUntil(lambda: connection.put_count == 2, timeout=2000)
+    assert time.time() - start > 0.15
+    assert connection.written == [(0.0, False), (1.0, False)]
@@ -0,0 +1,77 @@
+# Unit Tests for the sim:// data plugin
+import pytest
+import numpy as np
+
+from ...data_plugins import sim_plugin
+from ...data_plugins.sim_plugin import SimPlugin, parse_sim_address
+from ...widgets.channel import PyDMChannel
+
+
+@pytest.mark.parametrize("address, waveform, expected", [
+    ('sine', 'sine', {}),
+    ('noise:3?rate=200,n=100000,dtype=float32', 'noise',
+     dict(rate=200.0, n=100000, dtype='float32')),
+    ('step?rate=5&alarm=2&flap=10', 'step',
+     dict(rate=5.0, alarm=2.0, flap=10.0)),
+    ('ramp?shape=20x30,dtype=uint16', 'ramp',
+     dict(shape=(20, 30), dtype='uint16')),
+])
+def test_parse_sim_address(address, waveform, expected):
+    parsed_waveform, options = parse_sim_address(address)
+    assert parsed_waveform == waveform
+    for key, value in expected.items():
+        assert options[key] == value
+
+
+@pytest.mark.parametrize("address", [
+    'square', 'sine?speed=3', 'sine?rate=0', 'sine?dtype=notatype',
+])
+def test_parse_sim_address_errors(address):
+    with pytest.raises((ValueError, TypeError)):
+        parse_sim_address(address)
+
+
+@pytest.fixture(scope="function")
+def fresh_scheduler(qapp, monkeypatch):
+    scheduler = sim_plugin.SimScheduler()
+    monkeypatch.setattr(sim_plugin, '_scheduler', scheduler)
+    return scheduler
+
+
+def test_sim_connection(qtbot, fresh_scheduler):
+    """
+    Test that sim:// channels are updated by the shared scheduler and
+    removed from it when closed.
+
+    Expectations:
+    1. Scalars are delivered as Python numbers, arrays keep their shape
+       and dtype
+    2. A bad address does not prevent the other channels from connecting
+    3. Closing the connections empties the scheduler
+    """
+    plugin = SimPlugin()
+    scalars = []
+    images = []
+    channels = [
+        PyDMChannel(address='sim://ramp?rate=100', value_slot=scalars.append),
+        PyDMChannel(address='sim://noise?rate=100,shape=4x8,dtype=float32',
+                    data_slot=images.append),
+        PyDMChannel(address='sim://square'),
+    ]
+    plugin.add_connections(channels)
+    assert len(plugin.connections) == 2
+    assert len(fresh_scheduler) == 2
+
+    qtbot.waitUntil(lambda: bool(scalars and images), timeout=2000)
+    assert isinstance(scalars[0], float)
+    image = images[0].value
+    assert image.shape == (4, 8)
+    assert image.dtype == np.float32
+    assert images[0].timestamp is not None
+    # Only the sine needs the phases of the elements
+    assert all(connection._phases is None
+               for connection in plugin.connections.values())
+
+    plugin.remove_connections(channels)
+    assert plugin.connections == {}
+    assert len(fresh_scheduler) == 0
@@ -0,0 +1,73 @@
+import os
+
+from pydm import data_plugins
+from pydm.main_window import PyDMMainWindow
+
+LABEL_UI = """<?xml version="1.0" encoding="UTF-8"?>
+<ui version="4.0">
+ <class>Form</class>
+ <widget class="QWidget" name="Form">
+  <layout class="QVBoxLayout" name="verticalLayout">
+   <item>
+    <widget class="PyDMLabel" name="label">
+     <property name="channel" stdset="0">
+      <string>sim://ramp:${name}?rate=5</string>
+     </property>
+    </widget>
+   </item>
+  </layout>
+ </widget>
+ <customwidgets>
+  <customwidget>
+   <class>PyDMLabel</class>
+   <extends>QLabel</extends>
+   <header>pydm.widgets.label</header>
+  </customwidget>
+ </customwidgets>
+</ui>
+"""
+
+
+def test_single_process_windows(qtbot, qapp, monkeypatch, tmpdir):
+    """
+    Test that new windows are opened in the same process when running
+    with single_process.
+
+    Expectations:
+    1. No process is spawned
+    2. Each window gets its display, with its own macros
+    3. The windows share the connections to the channels
+    """
+    ui_file = os.path.join(str(tmpdir), 'label.ui')
+    with open(ui_file, 'w') as f:
+        f.write(LABEL_UI)
+    spawned = []
+    monkeypatch.setattr(qapp, 'single_process', True)
+    monkeypatch.setattr(qapp, 'new_pydm_process',
+                        lambda *args, **kwargs: spawned.append(args))
+
+    windows = []
+    for _ in range(2):
+        qapp.new_window(ui_file, macros={'name': 'shared'})
+        new = [window for window in qapp.windows if window not in windows]
+        assert len(new) == 1
+        windows.extend(new)
+    assert spawned == []
+    for window in windows:
+        assert isinstance(window, PyDMMainWindow)
+        assert window.current_macros() == {'name': 'shared'}
+        assert window.centralWidget().base_macros == {'name': 'shared'}
+        assert window.directory_stack == ['']
+        assert window.macro_stack == [{}]
+
+    sim = data_plugins.plugin_for_protocol('sim')
+    connection = sim.connections['ramp:shared?rate=5']
+    assert connection.listener_count == 2
+
+    for window in windows:
+        window.close()
+    qtbot.waitUntil(lambda: 'ramp:shared?rate=5' not in sim.connections,
+                    timeout=2000)
+    # Forgotten once Qt has deleted them
+    qtbot.waitUntil(lambda: not any(window in qapp.windows
+                                    for window in windows), timeout=2000)
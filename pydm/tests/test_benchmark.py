@@ -0,0 +1,30 @@
+import pytest
+
+from pydm.benchmark import bench
+
+
+def test_percentiles():
+    assert bench.percentiles([]) == dict(samples=0, p50=None, p99=None)
+    summary = bench.percentiles([float(i) for i in range(101)])
+    assert summary == dict(samples=101, p50=50.0, p99=99.0)
+
+
+@pytest.mark.parametrize("name", bench.DISPLAYS)
+def test_benchmark_displays(qapp, qtbot, name):
+    """
+    Test that the bundled displays load and report their performance.
+
+    Expectations:
+    1. Every display opens with reduced sizes given as macros
+    2. The report has the updates, backlog, latency and CPU figures
+    """
+    macros = dict(COUNT='10', CURVES='2', SIZE='20', RATE='50')
+    display = qapp.open_file(bench.display_path(name), macros)
+    qtbot.addWidget(display)
+    display.show()
+    result = bench.measure(display, duration=0.5, warmup=0.2)
+    assert result['updates'] > 0
+    assert result['updates_per_second'] > 0
+    assert 'event_loop_lag' in result['backlog']
+    assert result['callback_to_paint_latency']['samples'] >= 0
+    assert result['cpu_percent_per_thread']
@@ -1,8 +1,11 @@
 import os
+import sys
+import pytest
 
 import pydm.data_plugins
 from pydm.data_plugins import (plugin_modules, load_plugins_from_path,
-                               plugin_for_address)
+                               plugin_for_address, register_plugin,
+                               registered_protocols)
 from pydm import config
 
 def test_data_plugin_add(qapp, test_plugin):
@@ -35,6 +38,48 @@ def test_plugin_for_address(test_plugin):
                       test_plugin)
 
 
+@pytest.fixture(scope='function')
+def clean_registry(monkeypatch):
+    # Restore the plugin registry once the test is done
+    monkeypatch.setattr(pydm.data_plugins, 'plugin_modules',
+                        dict(plugin_modules))
+    monkeypatch.setattr(pydm.data_plugins, '_registry',
+                        dict(pydm.data_plugins._registry))
+    monkeypatch.setattr(pydm.data_plugins, '_failed_protocols',
+                        set(pydm.data_plugins._failed_protocols))
+    return pydm.data_plugins
+
+
+def test_lazy_plugin_registration(clean_registry, tmpdir, monkeypatch):
+    # Register a plugin by reference, it should not be imported yet
+    tmpdir.join('lazy_foo_module.py').write(fake_file)
+    monkeypatch.syspath_prepend(str(tmpdir))
+    monkeypatch.delitem(sys.modules, 'lazy_foo_module', raising=False)
+    register_plugin('lzy', 'lazy_foo_module:TestPlugin1')
+    assert 'lzy' in registered_protocols()
+    assert 'lzy' not in clean_registry.plugin_modules
+    assert 'lazy_foo_module' not in sys.modules
+    # First use imports and instantiates it
+    plugin = plugin_for_address('lzy://tst:this')
+    monkeypatch.delitem(sys.modules, 'lazy_foo_module')
+    assert type(plugin).__name__ == 'TestPlugin1'
+    assert clean_registry.plugin_modules['lzy'] is plugin
+    assert plugin_for_address('lzy://other') is plugin
+    # Registering again replaces the loaded plugin
+    register_plugin('lzy', 'lazy_foo_module:TestPlugin2')
+    assert 'lzy' not in clean_registry.plugin_modules
+    assert type(plugin_for_address('lzy://tst:this')).__name__ == 'TestPlugin2'
+
+
+def test_lazy_plugin_failure(clean_registry):
+    # Broken references are reported once and yield no plugin
+    register_plugin('brk', 'pydm_nonexistent_module:Plugin')
+    assert plugin_for_address('brk://tst:this') is None
+    assert 'brk' in clean_registry._failed_protocols
+    assert plugin_for_address('brk://tst:this') is None
+    assert 'brk' not in clean_registry.plugin_modules
+
+
 fake_file = """\
 from pydm.data_plugins import PyDMPlugin
 
@@ -0,0 +1,57 @@
+import sys
+import subprocess
+
+import pytest
+
+# Seconds that `import pydm` may take, Qt and NumPy included.
+IMPORT_BUDGET = 3.0
+# Modules which must only be imported on first use.
+LAZY_MODULES = ('scipy', 'pyqtgraph', 'psutil', 'pydm.widgets.label',
+                'pydm.widgets.timeplot', 'pydm.widgets.colormaps')
+
+
+def run_python(*args):
+    process = subprocess.Popen([sys.executable] + list(args),
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    stdout, stderr = process.communicate()
+    assert process.returncode == 0, stderr
+    return stdout, stderr
+
+
+def test_lazy_modules():
+    """
+    Test that importing PyDM does not import the heavy modules.
+    """
+    stdout, _ = run_python(
+        '-c', 'import sys, pydm; print("\\n".join(sys.modules))')
+    imported = set(stdout.split())
+    assert 'pydm.application' in imported
+    for module in LAZY_MODULES:
+        assert module not in imported
+
+
+def test_lazy_widgets():
+    """
+    Test that the widgets are still available from pydm.widgets.
+    """
+    stdout, _ = run_python(
+        '-c', 'import sys; from pydm.widgets import PyDMLabel; '
+              'print(PyDMLabel.__module__, "pyqtgraph" in sys.modules)')
+    assert stdout.split() == ['pydm.widgets.label', 'False']
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="No -X importtime")
+def test_import_time():
+    """
+    Test that `python -c "import pydm"` stays within its budget.
+    """
+    _, stderr = run_python('-X', 'importtime', '-c', 'import pydm')
+    cumulative = None
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == 'pydm':
+            cumulative = int(fields[1]) / 1e6
+    assert cumulative is not None
+    assert cumulative < IMPORT_BUDGET
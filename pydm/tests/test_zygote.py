@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import signal
+import subprocess
+
+import pytest
+
+from pydm_launcher import zygote
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(os, 'fork') or not zygote.supported(),
+    reason="The launcher server needs fork and unix sockets")
+
+
+def record(argv):
+    """Target of the children forked by the test server."""
+    if argv and argv[0] == 'fail':
+        sys.exit(3)
+    with open(os.environ['ZYGOTE_TEST_OUTPUT'], 'w') as f:
+        json.dump(dict(argv=argv, cwd=os.getcwd(), child=zygote.in_child(),
+                       preloaded='pydm.widgets.label' in sys.modules), f)
+
+
+def start_server(path, *args):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'pydm_launcher.zygote', '--socket', path,
+         '--target', 'pydm.tests.test_zygote:record'] + list(args))
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        sock = zygote.connect(path)
+        if sock is not None:
+            sock.close()
+            break
+        time.sleep(0.1)
+    return process
+
+
+@pytest.fixture(scope="function")
+def server(tmpdir):
+    path = os.path.join(str(tmpdir), 'zygote')
+    process = start_server(path, '--preload')
+    yield path
+    process.terminate()
+    process.wait()
+
+
+def test_launch_without_server(tmpdir):
+    path = os.path.join(str(tmpdir), 'missing')
+    assert zygote.launch(['display.ui'], path=path) is None
+
+
+def test_launch(server, tmpdir, monkeypatch):
+    """
+    Test that the server forks a child running with the command line,
+    working directory and environment of the requester.
+
+    Expectations:
+    1. The child runs the target with the arguments
+    2. The exit status of the child is reported
+    """
+    output = os.path.join(str(tmpdir), 'output.json')
+    monkeypatch.setenv('ZYGOTE_TEST_OUTPUT', output)
+    monkeypatch.chdir(str(tmpdir))
+    handler = signal.getsignal(signal.SIGINT)
+    assert zygote.launch(['display.ui', '-m', 'A=1'], wait=True,
+                         path=server) == 0
+    with open(output) as f:
+        result = json.load(f)
+    assert result == dict(argv=['display.ui', '-m', 'A=1'],
+                          cwd=os.getcwd(), child=True, preloaded=False)
+    # The signals are only forwarded while waiting
+    assert signal.getsignal(signal.SIGINT) is handler
+
+    assert zygote.launch(['fail'], wait=True, path=server) == 3
+    pid = zygote.launch(['display.ui'], path=server)
+    assert pid > 0
+
+
+def test_socket_of_another_file(server, tmpdir):
+    """
+    Test that a socket reached through a symbolic link, which may belong to
+    someone else, is not used.
+    """
+    link = os.path.join(str(tmpdir), 'link')
+    os.symlink(server, link)
+    assert zygote.connect(link) is None
+
+
+def test_private_socket(server):
+    """
+    Test that only the user can connect to the server socket.
+    """
+    assert os.stat(server).st_mode & 0o077 == 0
+
+
+def test_preload(tmpdir, monkeypatch):
+    """
+    Test that the children of a server with the default preloading find
+    the widget modules, which PyDM imports on first use, already imported.
+    """
+    path = os.path.join(str(tmpdir), 'zygote')
+    output = os.path.join(str(tmpdir), 'output.json')
+    monkeypatch.setenv('ZYGOTE_TEST_OUTPUT', output)
+    process = start_server(path)
+    try:
+        assert zygote.launch([], wait=True, path=path) == 0
+    finally:
+        process.terminate()
+        process.wait()
+    with open(output) as f:
+        assert json.load(f)['preloaded']
@@ -0,0 +1,168 @@
+import os
+import stat
+
+import pytest
+from qtpy import uic
+from qtpy.QtWidgets import QWidget
+
+from ... import config
+from ...utilities import ui_cache
+from ...widgets.label import PyDMLabel
+
+LABEL_UI = """<?xml version="1.0" encoding="UTF-8"?>
+<ui version="4.0">
+ <class>Form</class>
+ <widget class="QWidget" name="Form">
+  <layout class="QVBoxLayout" name="verticalLayout">
+   <item>
+    <widget class="PyDMLabel" name="label">
+     <property name="toolTip">
+      <string>{tooltip}</string>
+     </property>
+     <property name="channel" stdset="0">
+      <string>sim://ramp:${{name}}?rate=5</string>
+     </property>
+    </widget>
+   </item>
+  </layout>
+ </widget>
+ <customwidgets>
+  <customwidget>
+   <class>PyDMLabel</class>
+   <extends>QLabel</extends>
+   <header>pydm.widgets.label</header>
+  </customwidget>
+ </customwidgets>
+</ui>
+"""
+
+pytestmark = pytest.mark.skipif(not hasattr(uic, 'compileUi'),
+                                reason="The Qt binding cannot compile .ui")
+
+
+@pytest.fixture(scope="function")
+def ui_file(tmpdir, monkeypatch):
+    monkeypatch.setattr(config, 'UI_CACHE_DIR', str(tmpdir.join('cache')))
+    path = str(tmpdir.join('label.ui'))
+    with open(path, 'w') as f:
+        f.write(LABEL_UI.format(tooltip='${name} on $$5'))
+    return path
+
+
+def test_load_ui(qtbot, ui_file):
+    """
+    Test that the compiled .ui files apply the macros as uic.loadUi does.
+
+    Expectations:
+    1. The compiled code is stored on disk, once for all the macros
+    2. The macros are substituted in the strings
+    3. The named widgets are attributes of the top level widget
+    """
+    widgets = []
+    for name in ('A', 'B'):
+        widget = ui_cache.load_ui(ui_file, {'name': name})
+        qtbot.addWidget(widget)
+        widgets.append(widget)
+    assert len(os.listdir(config.UI_CACHE_DIR)) == 1
+
+    for widget, name in zip(widgets, ('A', 'B')):
+        assert isinstance(widget, QWidget)
+        assert isinstance(widget.label, PyDMLabel)
+        assert widget.label.channel == 'sim://ramp:{}?rate=5'.format(name)
+        assert widget.label.toolTip() == '{} on $5'.format(name)
+
+    widget = ui_cache.load_ui(ui_file)
+    qtbot.addWidget(widget)
+    assert widget.label.channel == 'sim://ramp:${name}?rate=5'
+
+
+def test_cache_invalidation(qtbot, ui_file, monkeypatch):
+    """
+    Test that a modified .ui file is compiled again, and that the compiled
+    code is shared by the processes through the disk.
+    """
+    compiled = ui_cache.compiled_ui(ui_file)
+    assert ui_cache.compiled_ui(ui_file) is compiled
+
+    with open(ui_file, 'w') as f:
+        f.write(LABEL_UI.format(tooltip='changed'))
+    os.utime(ui_file, (0, 0))
+    widget = ui_cache.load_ui(ui_file, {'name': 'A'})
+    qtbot.addWidget(widget)
+    assert widget.label.toolTip() == 'changed'
+    assert len(os.listdir(config.UI_CACHE_DIR)) == 2
+
+    # Another process finds the code on disk
+    monkeypatch.setattr(ui_cache, '_compiled', {})
+    generated = []
+    monkeypatch.setattr(ui_cache, 'generate_code',
+                        lambda *args: generated.append(args))
+    assert ui_cache.compiled_ui(ui_file) is not None
+    assert generated == []
+
+
+def test_macros_outside_strings(qtbot, tmpdir, monkeypatch):
+    """
+    Test that the files using macros elsewhere than in strings are loaded
+    with uic.loadUi.
+    """
+    monkeypatch.setattr(config, 'UI_CACHE_DIR', str(tmpdir.join('cache')))
+    path = str(tmpdir.join('named.ui'))
+    with open(path, 'w') as f:
+        f.write(LABEL_UI.format(tooltip='').replace('name="label"',
+                                                    'name="${name}"'))
+    assert ui_cache.compiled_ui(path) is None
+    widget = ui_cache.load_ui(path, {'name': 'label'})
+    qtbot.addWidget(widget)
+    assert widget.label.channel == 'sim://ramp:label?rate=5'
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason="No file owners")
+def test_untrusted_cache(qtbot, ui_file, monkeypatch):
+    """
+    Test that the compiled files which other users could have written are
+    not executed.
+
+    Expectations:
+    1. The cache directory is created with mode 0700
+    2. A compiled file writable by other users is compiled again
+    3. Nothing is cached in a directory open to other users
+    """
+    ui_cache.compiled_ui(ui_file)
+    mode = os.stat(config.UI_CACHE_DIR).st_mode
+    assert stat.S_IMODE(mode) == 0o700
+    name, = os.listdir(config.UI_CACHE_DIR)
+    cache_path = os.path.join(config.UI_CACHE_DIR, name)
+    os.chmod(cache_path, 0o666)
+
+    monkeypatch.setattr(ui_cache, '_compiled', {})
+    generated = []
+    generate_code = ui_cache.generate_code
+    monkeypatch.setattr(ui_cache, 'generate_code',
+                        lambda *args: generated.append(args) or
+                        generate_code(*args))
+    widget = ui_cache.load_ui(ui_file, {'name': 'A'})
+    qtbot.addWidget(widget)
+    assert widget.label.channel == 'sim://ramp:A?rate=5'
+    assert len(generated) == 1
+    assert stat.S_IMODE(os.stat(cache_path).st_mode) & 0o022 == 0
+
+    os.remove(cache_path)
+    os.chmod(config.UI_CACHE_DIR, 0o777)
+    monkeypatch.setattr(ui_cache, '_compiled', {})
+    assert ui_cache.compiled_ui(ui_file) is not None
+    assert os.listdir(config.UI_CACHE_DIR) == []
+
+
+def test_evict(tmpdir):
+    """
+    Test that the least recently used compiled files are removed first.
+    """
+    directory = str(tmpdir)
+    for index, name in enumerate(('old', 'recent', 'new')):
+        path = os.path.join(directory, name + ui_cache.CODE_SUFFIX)
+        with open(path, 'w') as f:
+            f.write('#' * 100)
+        os.utime(path, (index, index))
+    ui_cache.evict(directory, 250)
+    assert sorted(os.listdir(directory)) == ['new.py', 'recent.py']
@@ -427,6 +427,7 @@ def test_pydmwidget_channels(qtbot):
     default_pydm_channels = PyDMChannel(address=pydm_label.channel,
                                         connection_slot=pydm_label.connectionStateChanged,
                                         value_slot=pydm_label.channelValueChanged,
+                                        data_slot=pydm_label.channelDataChanged,
                                         severity_slot=pydm_label.alarmSeverityChanged,
                                         enum_strings_slot=pydm_label.enumStringsChanged,
                                         unit_slot=pydm_label.unitChanged,
@@ -465,6 +466,7 @@ def test_pydmwritablewidget_channels(qtbot):
     default_pydm_channels = PyDMChannel(address=pydm_lineedit.channel,
                                         connection_slot=pydm_lineedit.connectionStateChanged,
                                         value_slot=pydm_lineedit.channelValueChanged,
+                                        data_slot=pydm_lineedit.channelDataChanged,
                                         severity_slot=pydm_lineedit.alarmSeverityChanged,
                                         enum_strings_slot=pydm_lineedit.enumStringsChanged,
                                         unit_slot=pydm_lineedit.unitChanged,
@@ -30,6 +30,7 @@ def test_construct(qtbot):
     assert pydm_channel.address is None and \
         pydm_channel.connection_slot is None and \
         pydm_channel.value_slot is None and \
+        pydm_channel.data_slot is None and \
         pydm_channel.severity_slot is None and \
         pydm_channel.enum_strings_slot is None and \
         pydm_channel.unit_slot is None and \
@@ -46,6 +47,7 @@ def test_construct(qtbot):
     default_pydm_label_channels = PyDMChannel(address=pydm_label.channel,
                                               connection_slot=pydm_label.connectionStateChanged,
                                               value_slot=pydm_label.channelValueChanged,
+                                              data_slot=pydm_label.channelDataChanged,
                                               severity_slot=pydm_label.alarmSeverityChanged,
                                               enum_strings_slot=pydm_label.enumStringsChanged,
                                               unit_slot=pydm_label.unitChanged,
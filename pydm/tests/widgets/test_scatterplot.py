@@ -0,0 +1,31 @@
+import numpy as np
+
+from ...widgets.scatterplot import ScatterPlotCurveItem
+from ...data_plugins.plugin import ChannelData
+
+
+def test_scatterplot_pairs_by_timestamp(qtbot):
+    """
+    Test that the x and y values with the same source timestamp make a
+    single point, placed at that timestamp.
+
+    Expectations:
+    1. A y value completes the point of the x value with its timestamp
+    2. Values with other timestamps add points
+    """
+    curve = ScatterPlotCurveItem(y_addr=None, x_addr=None)
+    curve.receiveXData(ChannelData(1.0, 0, 10.0))
+    curve.receiveYData(ChannelData(2.0, 0, 10.0))
+    assert curve.points_accumulated == 1
+
+    curve.receiveXData(ChannelData(3.0, 0, 11.0))
+    curve.receiveYData(ChannelData(4.0, 0, 11.0))
+    assert curve.points_accumulated == 2
+    np.testing.assert_array_equal(curve.data_buffer[:, -2:],
+                                  [[1.0, 3.0], [2.0, 4.0]])
+    np.testing.assert_array_equal(curve.timestamps(), [10.0, 11.0])
+
+    curve.receiveYData(ChannelData(5.0, 0, 12.0))
+    assert curve.points_accumulated == 3
+    np.testing.assert_array_equal(curve.data_buffer[:, -1], [3.0, 5.0])
+    assert curve.timestamps()[-1] == 12.0
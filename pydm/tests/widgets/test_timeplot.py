@@ -8,6 +8,7 @@ logger = logging.getLogger(__name__)
 import numpy as np
 from collections import OrderedDict
 from ...widgets.channel import PyDMChannel
+from ...data_plugins.plugin import ChannelData
 from ...utilities import remove_protocol
 
 
@@ -160,6 +161,21 @@ def test_timeplotcurveitem_async_update(qtbot, signals, async_update, new_data):
     else:
         assert pydm_timeplot_curve_item.points_accumulated == 2
 
+def test_timeplotcurveitem_source_timestamp(qtbot):
+    """
+    Test that a point received with a timestamp from the data source is
+    placed at that timestamp.
+    """
+    pydm_timeplot_curve_item = TimePlotCurveItem()
+    qtbot.addWidget(pydm_timeplot_curve_item)
+
+    pydm_timeplot_curve_item.receiveNewData(ChannelData(2.5, 0, 1234.5))
+    pydm_timeplot_curve_item.receiveNewData(ChannelData("text", 0, 1235.0))
+    assert pydm_timeplot_curve_item.points_accumulated == 1
+    assert pydm_timeplot_curve_item.data_buffer[0, -1] == 1234.5
+    assert pydm_timeplot_curve_item.data_buffer[1, -1] == 2.5
+
+
 def test_timeplotcurve_initialize_buffer(qtbot):
     pydm_timeplot_curve_item = TimePlotCurveItem()
     qtbot.addWidget(pydm_timeplot_curve_item)
@@ -1,23 +1,19 @@
 import logging
+from collections import OrderedDict
 
 from qtpy.QtWidgets import QWidget
 
 logger = logging.getLogger(__name__)
 
 
-def _change_connection_status(widget, status):
+def _widget_channels(widget):
     """
-    Connect or disconnect the inner channels of widgets on the
-    given widget based on the status parameter.
+    Iterate over the channels of the given widget and its children.
 
     Parameters
     ----------
     widget : QWidget
-        The widget which will be iterated over for channel connection.
-
-    status : bool
-        If True, will call connect on the channels otherwise it will call
-        disconnect.
+        The widget which will be iterated over.
     """
     widgets = [widget]
     widgets.extend(widget.findChildren(QWidget))
@@ -26,12 +22,52 @@ def _change_connection_status(widget, status):
             if child_widget.channels() is None:
                 continue
             for channel in child_widget.channels():
-                if channel is None:
-                    continue
-                if status:
-                    channel.connect()
-                else:
-                    channel.disconnect()
+                if channel is not None:
+                    yield channel
+
+
+def _change_connection_status(widget, status):
+    """
+    Connect or disconnect the inner channels of widgets on the
+    given widget based on the status parameter.
+
+    The channels are grouped per data plugin so that each plugin can
+    handle all of its channels in a single batch.
+
+    Parameters
+    ----------
+    widget : QWidget
+        The widget which will be iterated over for channel connection.
+
+    status : bool
+        If True, will connect the channels otherwise it will disconnect
+        them.
+    """
+    from .. import config, data_plugins
+    from . import is_qt_designer
+    if is_qt_designer() and not config.DESIGNER_ONLINE:
+        return
+    channels_per_plugin = OrderedDict()
+    for channel in _widget_channels(widget):
+        try:
+            plugin = data_plugins.plugin_for_address(channel.address)
+        except Exception:
+            logger.exception("Unable to find the plugin for %r", channel)
+            continue
+        if plugin is None:
+            continue
+        channels_per_plugin.setdefault(plugin, []).append(channel)
+    for plugin, channels in channels_per_plugin.items():
+        try:
+            if status:
+                plugin.add_connections(channels)
+            else:
+                plugin.remove_connections(channels)
+        except Exception:
+            logger.exception("Unable to %s %d channels of %r",
+                             "connect" if status else "disconnect",
+                             len(channels), plugin)
+
 
 def establish_widget_connections(widget):
     """
@@ -0,0 +1,405 @@
+"""
+Cache of the .ui files compiled to Python.
+
+A .ui file is compiled once, with ``uic.compileUi``, into the Python code
+building its widgets. The code is stored in ``config.UI_CACHE_DIR`` under
+the hash of the file content, so that it is shared by the PyDM processes and
+recompiled when the file changes, and kept in memory along with the
+modification time of the file. As the cached code is executed, the directory
+is private to the user and the files which could have been written by
+another user are ignored. The least recently used files are removed once
+the cache exceeds ``config.UI_CACHE_SIZE`` megabytes.
+
+The macros are not substituted in the text of the file: the strings of the
+code are substituted while the widgets are built, so the code of a file is
+the same whatever its macros. The files using macros elsewhere than in
+strings, or referring to pixmaps or resources, are loaded with
+``uic.loadUi`` after substituting the macros in their text, as are all
+files with the Qt bindings that cannot compile them.
+"""
+import io
+import os
+import errno
+import hashlib
+import logging
+import tempfile
+import threading
+import tokenize
+import functools
+import xml.etree.ElementTree as ElementTree
+from string import Template
+
+import six
+import qtpy
+from qtpy import uic, QtWidgets
+
+from pydm_launcher.runtime import check_private
+
+from .. import config
+from . import macro
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the generated code changes.
+CACHE_VERSION = 1
+CODE_SUFFIX = '.py'
+# Elements whose files are resolved differently by the compiled code.
+UNSUPPORTED_ELEMENTS = ('pixmap', 'iconset', 'resources')
+
+# Absolute path vs. modification time, size and compiled file
+_compiled = {}
+_lock = threading.Lock()
+
+
+def load_ui(path, macros=None, baseinstance=None):
+    """
+    Build the widgets of a .ui file.
+
+    Parameters
+    ----------
+    path : str
+        The path to the .ui file.
+    macros : dict, optional
+        The macros to substitute, None to leave the file as is.
+    baseinstance : QWidget, optional
+        The widget to set up. A new instance of the top level widget class
+        of the file by default.
+
+    Returns
+    -------
+    QWidget
+    """
+    compiled = compiled_ui(path)
+    if compiled is None:
+        if macros is not None:
+            f = macro.substitute_in_file(path, macros)
+        else:
+            f = path
+        return uic.loadUi(f, baseinstance=baseinstance)
+    return compiled.build(macros, baseinstance)
+
+
+def compiled_ui(path):
+    """
+    Get the compiled version of a .ui file.
+
+    Parameters
+    ----------
+    path : str
+
+    Returns
+    -------
+    CompiledUi or None
+        None if the file must be loaded with ``uic.loadUi``.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime, stat.st_size)
+    with _lock:
+        cached = _compiled.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        compiled = compile_ui(path, data)
+    except Exception:
+        logger.exception("Unable to compile %s, loading it with uic", path)
+        compiled = None
+    with _lock:
+        _compiled[path] = (version, compiled)
+    return compiled
+
+
+def compile_ui(path, data):
+    """
+    Compile the content of a .ui file, using the code cached on disk if
+    available.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file, used in the error messages.
+    data : bytes
+        The content of the file.
+
+    Returns
+    -------
+    CompiledUi or None
+        None if the file must be loaded with ``uic.loadUi``.
+    """
+    if not hasattr(uic, 'compileUi'):
+        return None
+    try:
+        root = ElementTree.fromstring(data)
+    except ElementTree.ParseError:
+        # Left to uic.loadUi to report
+        return None
+    if not is_compilable(root):
+        return None
+    top_level = root.find('widget')
+    base_class = getattr(QtWidgets, top_level.get('class', ''), None)
+    if base_class is None:
+        return None
+
+    digest = hashlib.sha1(data)
+    digest.update(u"{}:{}:{}:{}".format(CACHE_VERSION, qtpy.API_NAME,
+                                        qtpy.PYQT_VERSION,
+                                        qtpy.QT_VERSION).encode('utf-8'))
+    cache_path = None
+    directory = cache_directory()
+    if directory is not None:
+        cache_path = os.path.join(directory, digest.hexdigest() + CODE_SUFFIX)
+    source = _read_code(cache_path)
+    if source is None:
+        source = generate_code(data, path)
+        _write_code(cache_path, source)
+    return CompiledUi(compile(source, path, 'exec'), base_class)
+
+
+def is_compilable(root):
+    """
+    Whether or not the compiled code builds the same widgets as
+    ``uic.loadUi``, which is the case if the macros are only used in strings
+    and the file does not refer to any pixmap or resource.
+
+    Parameters
+    ----------
+    root : xml.etree.ElementTree.Element
+
+    Returns
+    -------
+    bool
+    """
+    for element in root.iter():
+        if element.tag in UNSUPPORTED_ELEMENTS:
+            return False
+        if any('$' in value for value in element.attrib.values()):
+            return False
+        if element.tag != 'string' and '$' in (element.text or ''):
+            return False
+        if '$' in (element.tail or ''):
+            return False
+    return True
+
+
+def generate_code(data, path):
+    """
+    Compile a .ui file to Python, with the strings containing a ``$`` passed
+    to a ``_macro`` function substituting the macros.
+
+    Parameters
+    ----------
+    data : bytes
+        The content of the file.
+    path : str
+
+    Returns
+    -------
+    str
+    """
+    ui_file = io.BytesIO(data)
+    ui_file.name = path
+    output = six.StringIO()
+    uic.compileUi(ui_file, output)
+    return wrap_strings(output.getvalue())
+
+
+def wrap_strings(source):
+    """
+    Pass the string literals of Python code which contain a ``$`` to
+    ``_macro``. Adjacent literals, which are concatenated, are passed
+    together.
+
+    Parameters
+    ----------
+    source : str
+
+    Returns
+    -------
+    str
+    """
+    lines = source.splitlines(True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+
+    def offset(position):
+        row, column = position
+        return offsets[row - 1] + column
+
+    runs = []
+    run = None
+    tokens = tokenize.generate_tokens(io.StringIO(six.text_type(source))
+                                      .readline)
+    for token_type, text, start, end, _ in tokens:
+        if token_type == tokenize.STRING:
+            if run is None:
+                run = [offset(start), offset(end), False]
+            run[1] = offset(end)
+            run[2] = run[2] or '$' in text
+        elif token_type in (tokenize.NL, tokenize.COMMENT) and run is not None:
+            continue
+        else:
+            if run is not None and run[2]:
+                runs.append(run)
+            run = None
+    for start, end, _ in reversed(runs):
+        source = (source[:start] + '_macro(' + source[start:end] + ')' +
+                  source[end:])
+    return source
+
+
+def cache_directory():
+    """
+    Get the directory of the compiled files, created with mode 0700 if
+    needed.
+
+    Returns
+    -------
+    str or None
+        None if the files are not cached on disk, or if the directory
+        belongs to another user or is open to other users.
+    """
+    directory = config.UI_CACHE_DIR
+    if not directory or config.UI_CACHE_SIZE <= 0:
+        return None
+    try:
+        try:
+            os.makedirs(directory, 0o700)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        check_private(directory)
+    except OSError as e:
+        logger.warning("Not caching the compiled .ui files in %s: %s",
+                       directory, e)
+        return None
+    return directory
+
+
+def evict(directory, max_size):
+    """
+    Remove the least recently used compiled files until the cache fits in
+    `max_size` bytes.
+
+    Parameters
+    ----------
+    directory : str
+    max_size : float
+    """
+    files = []
+    for name in os.listdir(directory):
+        if not name.endswith(CODE_SUFFIX):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+    total = sum(size for _, size, _ in files)
+    for _, size, path in files:
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def _read_code(cache_path):
+    if cache_path is None or not os.path.exists(cache_path):
+        return None
+    try:
+        check_private(cache_path)
+        with io.open(cache_path, encoding='utf-8') as f:
+            source = f.read()
+        # Used recently, evicted last
+        os.utime(cache_path, None)
+        return source
+    except (OSError, IOError) as e:
+        logger.warning("Not using the compiled .ui file %s: %s",
+                       cache_path, e)
+        return None
+
+
+def _write_code(cache_path, source):
+    if cache_path is None:
+        return
+    directory = os.path.dirname(cache_path)
+    try:
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with io.open(handle, 'w', encoding='utf-8') as f:
+            f.write(six.text_type(source))
+        os.rename(temp_path, cache_path)
+        evict(directory, config.UI_CACHE_SIZE * 1024 * 1024)
+    except (OSError, IOError):
+        logger.exception("Unable to cache the compiled .ui file in %s",
+                         directory)
+
+
+def substitute(macros, text):
+    """
+    Substitute the macros in a string of a compiled .ui file.
+
+    Parameters
+    ----------
+    macros : dict or None
+    text : str
+
+    Returns
+    -------
+    str
+    """
+    if macros is None:
+        return text
+    return Template(text).safe_substitute(macros)
+
+
+class CompiledUi(object):
+    """
+    The code building the widgets of a .ui file.
+
+    Parameters
+    ----------
+    code : code
+        The compiled code, defining the ``Ui_`` form class.
+    base_class : type
+        The class of the top level widget.
+    """
+
+    def __init__(self, code, base_class):
+        self.code = code
+        self.base_class = base_class
+
+    def build(self, macros=None, baseinstance=None):
+        """
+        Build the widgets, as ``uic.loadUi`` does.
+
+        Parameters
+        ----------
+        macros : dict, optional
+        baseinstance : QWidget, optional
+
+        Returns
+        -------
+        QWidget
+        """
+        namespace = {'__name__': 'pydm_compiled_ui',
+                     '_macro': functools.partial(substitute, macros)}
+        six.exec_(self.code, namespace)
+        form_class = [value for name, value in namespace.items()
+                      if name.startswith('Ui_') and
+                      hasattr(value, 'setupUi')][0]
+        widget = baseinstance
+        if widget is None:
+            widget = self.base_class()
+        form = form_class()
+        form.setupUi(widget)
+        # uic.loadUi makes the named widgets attributes of the top level one
+        for name, value in vars(form).items():
+            setattr(widget, name, value)
+        return widget
@@ -1,53 +1,82 @@
-from scipy import constants
-
-UNITS = {'length':   {'m': 1,
-                      'cm': constants.centi,
-                      'mm': constants.milli,
-                      'um': constants.micro,
-                      'nm': constants.nano,
-                      'pm': constants.pico,
-                      'in': constants.inch,
-                      'ft': constants.foot,
-                      'yds': constants.yard,
-                      },
-         'time':    {'s': 1,
-                     'ms': constants.milli,
-                     'us': constants.micro,
-                     'ns': constants.nano,
-                     'ps': constants.pico,
-                     'min': constants.minute,
-                     'hr': constants.hour,
-                     'weeks': constants.week,
-                     'days': constants.day,
-                     },
-         'frequency': {'Hz': 1,
-                       'kHz': constants.kilo,
-                       'MHz': constants.mega,
-                       'GHz': constants.giga,
-                       'THz': constants.tera,
-                       'mHz': constants.milli,
-                       },
-         'angle':   {'rad': 1,
-                     'mrad': constants.milli,
-                     'urad': constants.micro,
-                     'nrad': constants.nano,
-                     'degree': constants.degree,
-                     'turn': 2*constants.pi,
-                     },
-         'voltage': {'V': 1,
-                     'MV': constants.mega,
-                     'kV': constants.kilo,
-                     'mV': constants.milli,
-                     'uV': constants.micro,
-                     },
-         'current': {'A': 1,
-                     'MA': constants.mega,
-                     'kA': constants.kilo,
-                     'mA': constants.milli,
-                     'uA': constants.micro,
-                     'nA': constants.nano,
-                     }
-         }
+import sys
+
+_units = None
+
+
+def get_units():
+    """
+    The conversions of the units, by type of unit.
+
+    scipy is only imported on the first call, it is slow to import.
+
+    Returns
+    -------
+    dict
+        The values of the units of each type relative to the standard unit.
+    """
+    global _units
+    if _units is None:
+        _units = _build_units()
+    return _units
+
+
+def __getattr__(name):
+    if name == 'UNITS':
+        return get_units()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__,
+                                                                    name))
+
+
+def _build_units():
+    from scipy import constants
+    return {'length':   {'m': 1,
+                         'cm': constants.centi,
+                         'mm': constants.milli,
+                         'um': constants.micro,
+                         'nm': constants.nano,
+                         'pm': constants.pico,
+                         'in': constants.inch,
+                         'ft': constants.foot,
+                         'yds': constants.yard,
+                         },
+            'time':    {'s': 1,
+                        'ms': constants.milli,
+                        'us': constants.micro,
+                        'ns': constants.nano,
+                        'ps': constants.pico,
+                        'min': constants.minute,
+                        'hr': constants.hour,
+                        'weeks': constants.week,
+                        'days': constants.day,
+                        },
+            'frequency': {'Hz': 1,
+                          'kHz': constants.kilo,
+                          'MHz': constants.mega,
+                          'GHz': constants.giga,
+                          'THz': constants.tera,
+                          'mHz': constants.milli,
+                          },
+            'angle':   {'rad': 1,
+                        'mrad': constants.milli,
+                        'urad': constants.micro,
+                        'nrad': constants.nano,
+                        'degree': constants.degree,
+                        'turn': 2*constants.pi,
+                        },
+            'voltage': {'V': 1,
+                        'MV': constants.mega,
+                        'kV': constants.kilo,
+                        'mV': constants.milli,
+                        'uV': constants.micro,
+                        },
+            'current': {'A': 1,
+                        'MA': constants.mega,
+                        'kA': constants.kilo,
+                        'mA': constants.milli,
+                        'uA': constants.micro,
+                        'nA': constants.nano,
+                        }
+            }
 
 
 def find_unittype(unit):
@@ -64,8 +93,8 @@ def find_unittype(unit):
     tp : str
         The unit type name or None if not found.
     """
-    for tp in UNITS.keys():
-        if unit in UNITS[tp].keys():
+    for tp, units in get_units().items():
+        if unit in units:
             return tp
     return None
 
@@ -86,7 +115,7 @@ def find_unit(unit):
     """
     tp = find_unittype(unit)
     if tp:
-        return UNITS[tp][unit]
+        return get_units()[tp][unit]
     else:
         return None
 
@@ -134,7 +163,12 @@ def find_unit_options(unit):
     tp = find_unittype(unit)
     if tp:
         units = [choice for choice, _ in
-                 sorted(UNITS[tp].items(), key=lambda x: 1/x[1])]
+                 sorted(get_units()[tp].items(), key=lambda x: 1/x[1])]
         return units
     else:
         return None
+
+
+if sys.version_info < (3, 7):
+    # No module __getattr__
+    UNITS = get_units()
@@ -1,24 +1,75 @@
-from .byte import PyDMByteIndicator
-
-from .checkbox import PyDMCheckbox
-from .drawing import (PyDMDrawingLine, PyDMDrawingRectangle, PyDMDrawingTriangle,
-                      PyDMDrawingEllipse, PyDMDrawingCircle, PyDMDrawingArc,
-                      PyDMDrawingPie, PyDMDrawingChord, PyDMDrawingImage)
-
-from .embedded_display import PyDMEmbeddedDisplay
-from .enum_combo_box import PyDMEnumComboBox
-from .image import PyDMImageView
-from .label import PyDMLabel
-from .line_edit import PyDMLineEdit
-from .pushbutton import PyDMPushButton
-from .related_display_button import PyDMRelatedDisplayButton
-from .shell_command import PyDMShellCommand
-from .slider import PyDMSlider
-from .spinbox import PyDMSpinbox
-from .symbol import PyDMSymbol
-from .waveformtable import PyDMWaveformTable
-from .scale import PyDMScaleIndicator
-from .timeplot import PyDMTimePlot
-from .waveformplot import PyDMWaveformPlot
-from .scatterplot import PyDMScatterPlot
-from .tab_bar import PyDMTabWidget
\ No newline at end of file
+"""
+The PyDM widgets.
+
+The widget modules, some of which import pyqtgraph, are only imported when
+one of their widgets is first used, e.g. ``from pydm.widgets import
+PyDMLabel``, so that importing a single widget module or PyDM itself stays
+fast.
+"""
+import sys
+import importlib
+
+# Widgets vs. the module defining them.
+WIDGETS = {
+    'PyDMByteIndicator': '.byte',
+    'PyDMCheckbox': '.checkbox',
+    'PyDMDrawingLine': '.drawing',
+    'PyDMDrawingRectangle': '.drawing',
+    'PyDMDrawingTriangle': '.drawing',
+    'PyDMDrawingEllipse': '.drawing',
+    'PyDMDrawingCircle': '.drawing',
+    'PyDMDrawingArc': '.drawing',
+    'PyDMDrawingPie': '.drawing',
+    'PyDMDrawingChord': '.drawing',
+    'PyDMDrawingImage': '.drawing',
+    'PyDMEmbeddedDisplay': '.embedded_display',
+    'PyDMEnumComboBox': '.enum_combo_box',
+    'PyDMImageView': '.image',
+    'PyDMLabel': '.label',
+    'PyDMLineEdit': '.line_edit',
+    'PyDMPushButton': '.pushbutton',
+    'PyDMRelatedDisplayButton': '.related_display_button',
+    'PyDMShellCommand': '.shell_command',
+    'PyDMSlider': '.slider',
+    'PyDMSpinbox': '.spinbox',
+    'PyDMSymbol': '.symbol',
+    'PyDMWaveformTable': '.waveformtable',
+    'PyDMScaleIndicator': '.scale',
+    'PyDMTimePlot': '.timeplot',
+    'PyDMWaveformPlot': '.waveformplot',
+    'PyDMScatterPlot': '.scatterplot',
+    'PyDMTabWidget': '.tab_bar',
+}
+
+__all__ = sorted(WIDGETS)
+
+
+def _load(name):
+    widget = getattr(importlib.import_module(WIDGETS[name], __name__), name)
+    globals()[name] = widget
+    return widget
+
+
+def preload():
+    """
+    Import every widget module, e.g. before forking processes which will
+    need them.
+    """
+    for name in WIDGETS:
+        _load(name)
+
+
+def __getattr__(name):
+    if name in WIDGETS:
+        return _load(name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__,
+                                                                    name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(WIDGETS))
+
+
+if sys.version_info < (3, 7):
+    # No module __getattr__, import everything upfront
+    preload()
@@ -505,6 +505,20 @@ class PyDMWidget(PyDMPrimitiveWidget):
         """
         self.value_changed(new_val)
 
+    @Slot(object)
+    def channelDataChanged(self, data):
+        """
+        PyQT Slot for the value updates of the Channel.
+        This slot sends the value carried by the envelope to the
+        ```value_changed``` callback.
+
+        Parameters
+        ----------
+        data : ChannelData
+            Envelope with the value, severity and timestamp of the update.
+        """
+        self.value_changed(data.value)
+
     @Slot(int)
     def alarmSeverityChanged(self, new_alarm_severity):
         """
@@ -834,6 +848,7 @@ class PyDMWidget(PyDMPrimitiveWidget):
             channel = PyDMChannel(address=self._channel,
                                   connection_slot=self.connectionStateChanged,
                                   value_slot=self.channelValueChanged,
+                                  data_slot=self.channelDataChanged,
                                   severity_slot=self.alarmSeverityChanged,
                                   enum_strings_slot=self.enumStringsChanged,
                                   unit_slot=self.unitChanged,
@@ -58,9 +58,20 @@ class PyDMChannel(object):
     value_slot : Slot, optional
         A function to be run when the value updates
 
+    data_slot : Slot, optional
+        A function to be run when the value updates, receiving a
+        :class:`pydm.data_plugins.plugin.ChannelData` with the value, the
+        alarm severity and the timestamp. When given, it is used instead of
+        the ``value_slot``, saving the connection to every overload of the
+        value signal
+
     severity_slot : Slot, optional
         A function to be run when the severity changes
 
+    timestamp_slot : Slot, optional
+        A function to be run with the timestamp given by the data source,
+        right before the value it belongs to
+
     write_access_slot : Slot, optional
         A function to be run when the write access changes
 
@@ -82,13 +93,15 @@ class PyDMChannel(object):
                  severity_slot=None, write_access_slot=None,
                  enum_strings_slot=None, unit_slot=None, prec_slot=None,
                  upper_ctrl_limit_slot=None, lower_ctrl_limit_slot=None,
-                 value_signal=None):
+                 value_signal=None, data_slot=None, timestamp_slot=None):
         self._address = None
         self.address = address
 
         self.connection_slot = connection_slot
         self.value_slot = value_slot
+        self.data_slot = data_slot
         self.severity_slot = severity_slot
+        self.timestamp_slot = timestamp_slot
         self.write_access_slot = write_access_slot
         self.enum_strings_slot = enum_strings_slot
         self.unit_slot = unit_slot
@@ -142,7 +155,9 @@ class PyDMChannel(object):
             address_matched = self.address == other.address
             connection_slot_matched = self.connection_slot == other.connection_slot
             value_slot_matched = self.value_slot == other.value_slot
+            data_slot_matched = self.data_slot == other.data_slot
             severity_slot_matched = self.severity_slot == other.severity_slot
+            timestamp_slot_matched = self.timestamp_slot == other.timestamp_slot
             enum_strings_slot_matched = self.enum_strings_slot == other.enum_strings_slot
             unit_slot_matched = self.unit_slot == other.unit_slot
             prec_slot_matched = self.prec_slot == other.prec_slot
@@ -157,7 +172,9 @@ class PyDMChannel(object):
             return (address_matched and
                     connection_slot_matched and
                     value_slot_matched and
+                    data_slot_matched and
                     severity_slot_matched and
+                    timestamp_slot_matched and
                     enum_strings_slot_matched and
                     unit_slot_matched and
                     prec_slot_matched and
@@ -31,9 +31,15 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         self._bufferSize = 1200
         self.data_buffer = np.zeros((2, self._bufferSize),
                                     order='f', dtype=float)
+        # Source timestamp of each point, the newest of its x and y values.
+        self.time_buffer = np.zeros(self._bufferSize, dtype=float)
         self.points_accumulated = 0
         self.latest_x_value = None
         self.latest_y_value = None
+        self.latest_x_timestamp = None
+        self.latest_y_timestamp = None
+        # Axes updated at the timestamp of the last point, see update_buffer
+        self._last_point_axes = set()
         self.needs_new_x = True
         self.needs_new_y = True
         if 'symbol' not in kws.keys():
@@ -86,7 +92,7 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         self.x_channel = PyDMChannel(
             address=new_address,
             connection_slot=self.xConnectionStateChanged,
-            value_slot=self.receiveXValue)
+            data_slot=self.receiveXData)
 
     @property
     def y_address(self):
@@ -116,7 +122,7 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         self.y_channel = PyDMChannel(
             address=new_address,
             connection_slot=self.yConnectionStateChanged,
-            value_slot=self.receiveYValue)
+            data_slot=self.receiveYData)
 
     @Slot(bool)
     def xConnectionStateChanged(self, connected):
@@ -126,40 +132,86 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
     def yConnectionStateChanged(self, connected):
         self.y_connected = connected
 
+    @Slot(object)
+    def receiveXData(self, data):
+        """
+        Handler for new x data with its source timestamp.
+
+        Parameters
+        ----------
+        data : ChannelData
+        """
+        if isinstance(data.value, (int, float)):
+            self.receiveXValue(data.value, timestamp=data.timestamp)
+
+    @Slot(object)
+    def receiveYData(self, data):
+        """
+        Handler for new y data with its source timestamp.
+
+        Parameters
+        ----------
+        data : ChannelData
+        """
+        if isinstance(data.value, (int, float)):
+            self.receiveYValue(data.value, timestamp=data.timestamp)
+
     @Slot(int)
     @Slot(float)
-    def receiveXValue(self, new_x):
+    def receiveXValue(self, new_x, timestamp=None):
         """
         Handler for new x data.
         """
         if new_x is None:
             return
         self.latest_x_value = new_x
+        self.latest_x_timestamp = timestamp
         self.needs_new_x = False
-        self.update_buffer()
+        self.update_buffer(axis='x', timestamp=timestamp)
 
     @Slot(int)
     @Slot(float)
-    def receiveYValue(self, new_y):
+    def receiveYValue(self, new_y, timestamp=None):
         """
         Handler for new y data.
         """
         if new_y is None:
             return
         self.latest_y_value = new_y
+        self.latest_y_timestamp = timestamp
         self.needs_new_y = False
-        self.update_buffer()
+        self.update_buffer(axis='y', timestamp=timestamp)
 
-    def update_buffer(self):
+    def update_buffer(self, axis=None, timestamp=None):
         """
         This is called whenever new data is received for X or Y.
         Based on the value of the redraw_mode attribute, it decides whether
         we are ready to shift the data buffer by one and add the latest data.
+
+        An x and a y value with the same source timestamp are paired: the
+        second one completes the point added for the first one instead of
+        adding another point.
+
+        Parameters
+        ----------
+        axis : str, optional
+            'x' or 'y', the axis of the value received.
+        timestamp : float, optional
+            The source timestamp of the value received.
         """
         # If we haven't gotten values for X and Y yet, can't redraw.
         if self.latest_y_value is None or self.latest_x_value is None:
             return
 
+        if (timestamp is not None and self.points_accumulated > 0 and
+                axis not in self._last_point_axes and
+                timestamp == self.time_buffer[-1]):
+            self.data_buffer[0, -1] = self.latest_x_value
+            self.data_buffer[1, -1] = self.latest_y_value
+            self._last_point_axes.add(axis)
+            self.data_changed.emit()
+            return
+
         if self.redraw_mode == self.REDRAW_ON_EITHER:
             # no matter which channel updates, add a pair with the two most
             # recent values
@@ -183,6 +235,16 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         self.data_buffer = np.roll(self.data_buffer, -1)
         self.data_buffer[0, -1] = self.latest_x_value
         self.data_buffer[1, -1] = self.latest_y_value
+        timestamps = [t for t in (self.latest_x_timestamp,
+                                  self.latest_y_timestamp) if t is not None]
+        self.time_buffer = np.roll(self.time_buffer, -1)
+        self.time_buffer[-1] = max(timestamps) if timestamps else np.nan
+        self._last_point_axes = set()
+        for other, other_timestamp in (('x', self.latest_x_timestamp),
+                                       ('y', self.latest_y_timestamp)):
+            if (other_timestamp is not None and
+                    other_timestamp == self.time_buffer[-1]):
+                self._last_point_axes.add(other)
         if self.points_accumulated < self._bufferSize:
             self.points_accumulated = self.points_accumulated + 1
         self.data_changed.emit()
@@ -191,6 +253,19 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         self.points_accumulated = 0
         self.data_buffer = np.zeros((2, self._bufferSize),
                                     order='f', dtype=float)
+        self.time_buffer = np.zeros(self._bufferSize, dtype=float)
+        self._last_point_axes = set()
+
+    def timestamps(self):
+        """
+        The source timestamps of the points, the newest of the timestamps of
+        their x and y values, in the order of the points.
+
+        Returns
+        -------
+        np.ndarray
+        """
+        return self.time_buffer[self._bufferSize - self.points_accumulated:]
 
     def getBufferSize(self):
         return int(self._bufferSize)
@@ -210,8 +285,8 @@ class ScatterPlotCurveItem(BasePlotCurveItem):
         Called by the curve's parent plot whenever the curve needs to be
         re-drawn with new data.
         """
-        self.setData(x=self.data_buffer[0, -self.points_accumulated:].astype(np.float),
-                     y=self.data_buffer[1, -self.points_accumulated:].astype(np.float))
+        self.setData(x=self.data_buffer[0, -self.points_accumulated:].astype(float),
+                     y=self.data_buffer[1, -self.points_accumulated:].astype(float))
         self.needs_new_x = True
         self.needs_new_y = True
 
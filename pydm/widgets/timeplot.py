@@ -107,7 +107,8 @@ class TimePlotCurveItem(BasePlotCurveItem):
             return
         self.channel = PyDMChannel(address=new_address,
                                    connection_slot=self.connectionStateChanged,
-                                   value_slot=self.receiveNewValue)
+                                   value_slot=self.receiveNewValue,
+                                   data_slot=self.receiveNewData)
 
     @property
     def plotByTimeStamps(self):
@@ -150,9 +151,24 @@ class TimePlotCurveItem(BasePlotCurveItem):
         if not self.connected:
             self.latest_value = np.nan
 
+    @Slot(object)
+    def receiveNewData(self, data):
+        """
+        Receive a new value together with its timestamp.
+
+        In Synchronous mode the point is placed at the timestamp given by the
+        data source instead of the time at which it reaches the plot.
+
+        Parameters
+        ----------
+        data : ChannelData
+        """
+        if isinstance(data.value, (int, float)):
+            self.receiveNewValue(data.value, timestamp=data.timestamp)
+
     @Slot(float)
     @Slot(int)
-    def receiveNewValue(self, new_value):
+    def receiveNewValue(self, new_value, timestamp=None):
         """
         Rotate and fill the data buffer when a new value is available.
 
@@ -166,13 +182,17 @@ class TimePlotCurveItem(BasePlotCurveItem):
         ----------
         new_value : float
             The new y-value just available.
+        timestamp : float, optional
+            The time of the value. Defaults to the current time.
         """
         self.update_min_max_y_values(new_value)
 
         if self._update_mode == PyDMTimePlot.SynchronousMode:
             self.data_buffer = np.roll(self.data_buffer, -1)
             #The first array row is to record timestamps, when a new value arrives.
-            self.data_buffer[0, self._bufferSize - 1] = time.time()
+            if timestamp is None:
+                timestamp = time.time()
+            self.data_buffer[0, self._bufferSize - 1] = timestamp
             #The second array row is to record the actual values.
             self.data_buffer[1, self._bufferSize - 1] = new_value
 
@@ -252,8 +272,8 @@ class TimePlotCurveItem(BasePlotCurveItem):
         position on the x-axis.
         """
         try:
-            x = self.data_buffer[0, -self.points_accumulated:].astype(np.float)
-            y = self.data_buffer[1, -self.points_accumulated:].astype(np.float)
+            x = self.data_buffer[0, -self.points_accumulated:].astype(float)
+            y = self.data_buffer[1, -self.points_accumulated:].astype(float)
 
             if not self._plot_by_timestamps:
                 x -= time.time()
@@ -224,14 +224,14 @@ class WaveformCurveItem(BasePlotCurveItem):
         if self.y_waveform is None:
             return
         if self.x_waveform is None:
-            self.setData(y=self.y_waveform.astype(np.float))
+            self.setData(y=self.y_waveform.astype(float))
             return
         if self.x_waveform.shape[0] > self.y_waveform.shape[0]:
             self.x_waveform = self.x_waveform[:self.y_waveform.shape[0]]
         elif self.x_waveform.shape[0] < self.y_waveform.shape[0]:
             self.y_waveform = self.y_waveform[:self.x_waveform.shape[0]]
-        self.setData(x=self.x_waveform.astype(np.float),
-                     y=self.y_waveform.astype(np.float))
+        self.setData(x=self.x_waveform.astype(float),
+                     y=self.y_waveform.astype(float))
         self.needs_new_x = True
         self.needs_new_y = True
 
@@ -3,8 +3,21 @@ import argparse
 import json
 import logging
 
+from . import zygote
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    # Handled before importing PyDM, which is what the server saves.
+    if '--server' in args:
+        logging.basicConfig(level=logging.INFO)
+        sys.exit(zygote.serve())
+    if '--no-server' not in args and not zygote.in_child():
+        status = zygote.launch(args, wait=True)
+        if status is not None:
+            sys.exit(status)
 
-def main():
     logger = logging.getLogger('')
     handler = logging.StreamHandler()
     formatter = logging.Formatter('[%(asctime)s] [%(levelname)-8s] - %(message)s')
@@ -50,6 +63,26 @@ def main():
         action='store_true',
         help='Start PyDM in full screen mode.'
         )
+    parser.add_argument(
+        '--server',
+        action='store_true',
+        help='Run a launcher server keeping PyDM imported, which starts' +
+             ' the following pydm commands and new windows in a process' +
+             ' forked from it.'
+        )
+    parser.add_argument(
+        '--no-server',
+        action='store_true',
+        help='Start this display in a new process even if a launcher' +
+             ' server is running.'
+        )
+    parser.add_argument(
+        '--single-process',
+        action='store_true',
+        help='Open the new windows in this process, sharing the' +
+             ' connections, instead of starting a new PyDM process' +
+             ' for each of them.'
+        )
     parser.add_argument(
         '--read-only',
         action='store_true',
@@ -91,7 +124,7 @@ def main():
         default=None
         )
 
-    pydm_args = parser.parse_args()
+    pydm_args = parser.parse_args(args)
     macros = None
     if pydm_args.macro is not None:
         macros = parse_macro_string(pydm_args.macro)
@@ -110,7 +143,8 @@ def main():
         fullscreen=pydm_args.fullscreen,
         read_only=pydm_args.read_only,
         macros=macros,
-        stylesheet_path=pydm_args.stylesheet
+        stylesheet_path=pydm_args.stylesheet,
+        single_process=pydm_args.single_process
         )
 
     sys.exit(app.exec_())
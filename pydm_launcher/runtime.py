@@ -0,0 +1,78 @@
+"""
+Private directory of the user for the sockets of the PyDM daemons.
+
+Only the standard library is used, so that the launcher can find its server
+without importing PyDM.
+"""
+import os
+import stat
+import errno
+import getpass
+import tempfile
+
+
+def runtime_dir():
+    """
+    Get the directory holding the sockets of the user, ``pydm`` in
+    ``$XDG_RUNTIME_DIR`` or ``pydm-<uid>`` in the temporary directory. It is
+    created with mode 0700 if needed.
+
+    Returns
+    -------
+    str
+
+    Raises
+    ------
+    OSError
+        If the directory is owned by another user or open to other users,
+        in which case the sockets it holds cannot be trusted.
+    """
+    base = os.getenv("XDG_RUNTIME_DIR")
+    if base and os.path.isdir(base):
+        path = os.path.join(base, "pydm")
+    elif hasattr(os, 'getuid'):
+        path = os.path.join(tempfile.gettempdir(),
+                            "pydm-{}".format(os.getuid()))
+    else:
+        try:
+            user = getpass.getuser()
+        except Exception:
+            user = "pydm"
+        return os.path.join(tempfile.gettempdir(), "pydm-{}".format(user))
+    try:
+        os.mkdir(path, 0o700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    check_private(path)
+    return path
+
+
+def check_private(path):
+    """
+    Check that a file, or a directory, belongs to the user and is not a
+    symbolic link. Directories must not be accessible by other users, and
+    files must not be writable by them.
+
+    Parameters
+    ----------
+    path : str
+
+    Raises
+    ------
+    OSError
+    """
+    if not hasattr(os, 'getuid'):
+        return
+    info = os.lstat(path)
+    if info.st_uid != os.getuid():
+        raise OSError(errno.EPERM,
+                      "{} belongs to another user".format(path))
+    if stat.S_ISLNK(info.st_mode):
+        raise OSError(errno.EPERM, "{} is a symbolic link".format(path))
+    if stat.S_ISDIR(info.st_mode) and info.st_mode & 0o077:
+        raise OSError(errno.EPERM,
+                      "{} is accessible by other users".format(path))
+    if info.st_mode & 0o022:
+        raise OSError(errno.EPERM,
+                      "{} is writable by other users".format(path))
@@ -0,0 +1,454 @@
+"""
+Launcher server keeping a warm interpreter, with Qt, NumPy, pyqtgraph and
+PyDM already imported, which forks a child for every display to open.
+
+Start it with ``pydm --server``. While it runs, ``pydm`` and the new
+windows of PyDM hand their command line to it instead of starting a new
+interpreter: the child gets the working directory, the environment and the
+standard streams of the requester, runs the regular ``pydm`` launcher and
+reports its exit status back.
+
+The socket is in the private runtime directory of the user, see
+:mod:`pydm_launcher.runtime`, and both ends check that the other one runs
+as the same user. Passing the standard streams requires ``sendmsg``, so the
+server is not used with Python 2.
+
+This module only uses the standard library and six, so that asking the
+server to start a display does not import anything heavy.
+"""
+import os
+import sys
+import json
+import array
+import errno
+import select
+import signal
+import socket
+import struct
+import logging
+import argparse
+import importlib
+from contextlib import closing
+
+from six.moves import reload_module
+
+from .runtime import runtime_dir, check_private
+
+logger = logging.getLogger(__name__)
+
+LENGTH = struct.Struct('!I')
+# pid, uid and gid of the peer of a unix socket
+CREDENTIALS = struct.Struct('3i')
+# Modules imported by the server before forking the children, and
+# "module:function" called to import what PyDM loads on first use.
+PRELOAD = ('numpy', 'qtpy', 'qtpy.QtCore', 'qtpy.QtGui', 'qtpy.QtWidgets',
+           'qtpy.uic', 'pyqtgraph', 'pydm', 'pydm.data_plugins.plugin',
+           'pydm.widgets:preload', 'pydm.utilities.units:get_units')
+# Function run by the children, with the command line.
+TARGET = 'pydm_launcher.main:main'
+
+_child = False
+
+
+def in_child():
+    """
+    Whether or not this process was forked by the server, in which case it
+    must not ask the server for another child.
+
+    Returns
+    -------
+    bool
+    """
+    return _child
+
+
+def supported():
+    """
+    Whether or not the server can be used on this platform, which requires
+    unix sockets and passing file descriptors over them.
+
+    Returns
+    -------
+    bool
+    """
+    return (hasattr(socket, 'AF_UNIX') and hasattr(socket, 'SCM_RIGHTS') and
+            hasattr(socket.socket, 'sendmsg'))
+
+
+def socket_path():
+    """
+    The path of the server socket, ``PYDM_ZYGOTE_SOCKET`` if set, or
+    ``zygote`` in the private runtime directory of the user.
+
+    Returns
+    -------
+    str
+
+    Raises
+    ------
+    OSError
+        If the runtime directory is not private to the user.
+    """
+    return (os.getenv("PYDM_ZYGOTE_SOCKET") or
+            os.path.join(runtime_dir(), "zygote"))
+
+
+def peer_uid(sock):
+    """
+    The user id of the process at the other end of a unix socket.
+
+    Returns
+    -------
+    int or None
+        None if the platform does not tell.
+    """
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                  CREDENTIALS.size)
+    return CREDENTIALS.unpack(credentials)[1]
+
+
+def _send(sock, message, fds=None):
+    data = json.dumps(message).encode('utf-8')
+    header = LENGTH.pack(len(data))
+    if fds:
+        sock.sendmsg([header], [(socket.SOL_SOCKET, socket.SCM_RIGHTS,
+                                 array.array('i', fds))])
+    else:
+        sock.sendall(header)
+    sock.sendall(data)
+
+
+def _receive_exactly(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError("Connection closed")
+        data += chunk
+    return data
+
+
+def _receive(sock, with_fds=False):
+    fds = []
+    if with_fds:
+        fds_size = socket.CMSG_LEN(3 * array.array('i').itemsize)
+        header, ancillary, _, _ = sock.recvmsg(LENGTH.size, fds_size)
+        for level, kind, data in ancillary:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                received = array.array('i')
+                received.frombytes(data[:len(data) - len(data) %
+                                        received.itemsize])
+                fds.extend(received)
+        if len(header) < LENGTH.size:
+            header += _receive_exactly(sock, LENGTH.size - len(header))
+    else:
+        header = _receive_exactly(sock, LENGTH.size)
+    if not header:
+        raise EOFError("Connection closed")
+    size, = LENGTH.unpack(header)
+    return json.loads(_receive_exactly(sock, size).decode('utf-8')), fds
+
+
+def connect(path=None):
+    """
+    Connect to the server, making sure that it runs as the same user.
+
+    Parameters
+    ----------
+    path : str, optional
+
+    Returns
+    -------
+    socket.socket or None
+        None if no server of the user is running.
+    """
+    if not supported():
+        return None
+    try:
+        path = path or socket_path()
+    except OSError as e:
+        logger.warning("Not using the PyDM launcher server: %s", e)
+        return None
+    if not os.path.exists(path):
+        return None
+    try:
+        check_private(path)
+    except OSError as e:
+        logger.warning("Not using the PyDM launcher server: %s", e)
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        uid = peer_uid(sock)
+    except (OSError, IOError):
+        sock.close()
+        return None
+    if uid is not None and uid != os.getuid():
+        logger.warning("The PyDM launcher server on %s runs as another user",
+                       path)
+        sock.close()
+        return None
+    return sock
+
+
+def launch(argv, wait=False, path=None):
+    """
+    Ask the server to run ``pydm`` with a command line.
+
+    Parameters
+    ----------
+    argv : list of str
+        The arguments, without the program name.
+    wait : bool, optional
+        Wait for the display to exit, forwarding SIGINT and SIGTERM to it.
+    path : str, optional
+        Path of the server socket.
+
+    Returns
+    -------
+    int or None
+        The pid of the child if `wait` is False, its exit status otherwise.
+        None if no server is running, in which case the caller starts the
+        display itself.
+    """
+    sock = connect(path)
+    if sock is None:
+        return None
+    with closing(sock):
+        try:
+            _send(sock, {'argv': list(argv), 'cwd': os.getcwd(),
+                         'env': dict(os.environ)},
+                  fds=[0, 1, 2] if wait else None)
+            reply, _ = _receive(sock)
+        except (OSError, IOError, EOFError, ValueError):
+            logger.exception("The PyDM launcher server did not answer")
+            return None
+        pid = reply['pid']
+        if not wait:
+            return pid
+
+        def forward(signum, frame):
+            try:
+                os.kill(pid, signum)
+            except OSError:
+                pass
+
+        previous = dict((signum, signal.signal(signum, forward))
+                        for signum in (signal.SIGINT, signal.SIGTERM))
+        try:
+            reply, _ = _receive(sock)
+        except (OSError, IOError, EOFError, ValueError):
+            return 1
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        return reply.get('status', 1)
+
+
+def _resolve(reference):
+    module_name, _, function_name = reference.partition(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _run_child(request, fds, target):
+    """
+    Run the display in the forked child. Never returns.
+    """
+    global _child
+    _child = True
+    status = 1
+    try:
+        os.setsid()
+        # The launcher sets up its own logging
+        logging.getLogger().handlers = []
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGCHLD):
+            signal.signal(signum, signal.SIG_DFL)
+        for target_fd, fd in enumerate(fds[:3]):
+            os.dup2(fd, target_fd)
+        for fd in fds:
+            os.close(fd)
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        # The configuration was read with the environment of the server.
+        config = sys.modules.get('pydm.config')
+        if config is not None:
+            reload_module(config)
+        sys.argv = ['pydm'] + request['argv']
+        target(request['argv'])
+        status = 0
+    except SystemExit as e:
+        if e.code is None:
+            status = 0
+        elif isinstance(e.code, int):
+            status = e.code
+    except BaseException:
+        logger.exception("Error while running %r", request['argv'])
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(status)
+
+
+def _exit_status(wait_status):
+    if os.WIFSIGNALED(wait_status):
+        return 128 + os.WTERMSIG(wait_status)
+    return os.WEXITSTATUS(wait_status)
+
+
+def serve(path=None, preload=PRELOAD, target=TARGET):
+    """
+    Run the server until interrupted.
+
+    The server never creates a QApplication nor any thread, so that the
+    children start from a clean state.
+
+    Parameters
+    ----------
+    path : str, optional
+    preload : iterable of str, optional
+        Modules to import before forking, or "module:function" to call.
+    target : str, optional
+        The "module:function" run by the children with the command line.
+    """
+    if not supported():
+        logger.error("The PyDM launcher server is not supported here")
+        return 1
+    try:
+        path = path or socket_path()
+    except OSError:
+        logger.exception("Unable to find the PyDM launcher server socket")
+        return 1
+    for reference in preload:
+        try:
+            if ':' in reference:
+                _resolve(reference)()
+            else:
+                importlib.import_module(reference)
+        except Exception:
+            logger.warning("Unable to preload %s", reference, exc_info=True)
+    target = _resolve(target)
+
+    running = connect(path)
+    if running is not None:
+        running.close()
+        logger.error("A PyDM launcher server is already running on %s",
+                     path)
+        return 1
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # The socket must never be open to other users, even while binding.
+    umask = os.umask(0o177)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(umask)
+    server.listen(16)
+    logger.info("PyDM launcher server listening on %s", path)
+    # Children vs. the socket of the client waiting for them
+    waiting = {}
+    try:
+        while True:
+            try:
+                readable, _, _ = select.select([server], [], [], 0.5)
+            except (OSError, select.error) as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+            if readable:
+                client, _ = server.accept()
+                pid = _accept(server, client, target, waiting)
+                if pid is None:
+                    client.close()
+                else:
+                    waiting[pid] = client
+            _reap(waiting)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+    return 0
+
+
+def _accept(server, client, target, waiting):
+    """
+    Read a request and fork the child handling it.
+
+    Returns
+    -------
+    int or None
+        The pid of the child.
+    """
+    client.settimeout(5)
+    try:
+        uid = peer_uid(client)
+        if uid is not None and uid != os.getuid():
+            logger.warning("Refused a request from user %s", uid)
+            return None
+        request, fds = _receive(client, with_fds=True)
+    except (OSError, IOError, EOFError, ValueError):
+        logger.warning("Invalid request", exc_info=True)
+        return None
+    pid = os.fork()
+    if pid == 0:
+        server.close()
+        client.close()
+        for other in waiting.values():
+            other.close()
+        _run_child(request, fds, target)
+    for fd in fds:
+        os.close(fd)
+    logger.info("Started %s for %r", pid, request['argv'])
+    try:
+        _send(client, {'pid': pid})
+    except (OSError, IOError):
+        pass
+    return pid
+
+
+def _reap(waiting):
+    """
+    Report the exit status of the children which exited.
+    """
+    while True:
+        try:
+            pid, wait_status = os.waitpid(-1, os.WNOHANG)
+        except OSError:
+            return
+        if pid == 0:
+            return
+        client = waiting.pop(pid, None)
+        if client is None:
+            continue
+        try:
+            _send(client, {'status': _exit_status(wait_status)})
+        except (OSError, IOError):
+            pass
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--socket', default=None,
+                        help='Path of the socket, PYDM_ZYGOTE_SOCKET by '
+                             'default.')
+    parser.add_argument('--target', default=TARGET, help=argparse.SUPPRESS)
+    parser.add_argument('--preload', nargs='*', default=None,
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    preload = PRELOAD if args.preload is None else args.preload
+    sys.exit(serve(args.socket, preload=preload, target=args.target))
+
+
+if __name__ == '__main__':
+    # The children check the state of the imported module, not __main__
+    from pydm_launcher import zygote
+    zygote.main()
@@ -60,6 +60,10 @@ setup(
     entry_points={
         'gui_scripts': [
             'pydm=pydm_launcher.main:main'
+        ],
+        'console_scripts': [
+            'pydm-bench=pydm.benchmark.bench:main',
+            'pydm-gateway=pydm.gateway.broker:main'
         ]
     },
     license='BSD',